@@ -1,7 +1,7 @@
 #!/bin/bash
 
 # Routeur des commandes bench CPU/GPU via sous-scripts dans src/cmd/
-# Commandes: build | submit | submit_cpu | submit_gpu | top | status | list
+# Commandes: build | submit | submit_cpu | submit_gpu | top | regress | report | status | list | compact
 
 set -euo pipefail
 
@@ -11,7 +11,11 @@ CMD_DIR="$ROOT_DIR/src/cmd"
 # Valeurs par défaut (purement locales; on passera via arguments)
 BENCH_DURATION=3.0   # secondes par mesure
 BENCH_REPEATS=5      # répétitions pour moyenne/écart-type
-TOP_MODE=unique      # unique | unique-last | top10 | by-node-mean
+TOP_MODE=unique      # unique | unique-last | top10 | by-node-mean | by-build
+TOP_BUILD=""         # filtre top par build CPU (generic | native | unknown)
+TOP_MAX_CONTAM=""    # top/regress: runs dont la contamination dépasse ce % exclues
+REGRESS_THRESHOLD="" # regress: baisse minimale (%) par rapport à l'historique du nœud
+REGRESS_DAYS=""      # regress: historique limité aux N derniers jours
 INCLUDE_NODES=""    # liste séparée par virgules
 EXCLUDE_NODES=""    # liste séparée par virgules
 LIMIT_NODES=""      # limite numérique d'envoi
@@ -19,6 +23,24 @@ ONLY_NEW=0           # si 1, ne lance que sur nœuds sans résultats (CPU/GPU) (
 BENCH_VERBOSE=0      # si 1, verbosité accrue
 BENCH_VRAM_FRAC=""
 BENCH_WARMUP_STEPS=""
+MEM_KERNELS=""       # kernels mémoire CPU (copy,scale,add,triad | all | none)
+NO_LATENCY=0         # si 1, pas de courbe de latence CPU
+HUGEPAGES=0          # si 1, pages de 2 MiB pour la courbe de latence
+NO_FLOPS=0           # si 1, pas de mesure du débit crête FMA CPU
+NO_NUMA=0            # si 1, pas de matrice NUMA CPU
+WORKLOADS=""         # charges réalistes CPU (gemm,fft1d,fft2d,sort,spmv | all | none)
+CPU_AB=0             # si 1, mesure A/B binaire générique vs natif
+CPU_COUNTERS=0       # si 1, compteurs matériels perf sur les mesures CPU mono/multi
+SERIES_MS=""         # intervalle (ms) de la série temporelle intra-run CPU (0 = désactivée)
+SOAK=""              # durée (s) du run d'endurance CPU multi
+SLOW_CORE_PCT=""     # seuil (%) sous la médiane pour signaler un cœur lent
+SWEEP_KERNELS=""     # kernels des courbes de scaling CPU (events,triad | none)
+CPU_WARMUP=""        # répétitions CPU de chauffe écartées
+CPU_WORK=""          # travail fixe CPU par thread (itérations), sinon durée
+BATCH_SIZE=""        # nœuds de même forme par job (allocation fannée par srun)
+SCHEDULE_TOP=""      # ordonnanceur: K nœuds les plus prioritaires (0 = budget seul)
+BUDGET_NH=""         # ordonnanceur: budget de nœuds-heures par jour
+FORMULA_WALLTIME=0   # 1 = walltime de la formule, sans historique des durées
 LC_ALL=C; export LC_ALL
 
 usage() {
@@ -34,8 +56,11 @@ Commandes disponibles:
     submit_cpu    Soumet uniquement des jobs CPU
     submit_gpu    Soumet uniquement des jobs GPU
     top           Affiche les classements CPU/GPU
+    regress       Nœuds dégradés vs leur historique et leur flotte (code de sortie 1 si dégradation)
+    report        Rapport HTML statique (report/index.html), régénéré si les résultats ont changé
     status        Affiche l'état des jobs et un résumé des résultats
     list          Liste des nœuds et nombre de runs
+    compact       Fusionne le spool des jobs (results/spool/) dans les CSV
     help|-h|--help Cette aide
 
 Flags globaux (affectent submit/submit_cpu/submit_gpu):
@@ -46,6 +71,26 @@ Flags globaux (affectent submit/submit_cpu/submit_gpu):
     --limit N              Limiter le nombre total de nœuds ciblés
     --only-new             Ne lancer que sur nœuds sans résultats (CSV absent)
     --verbose              Sortie verbeuse (soumissions, détails GPU)
+    --batch-size N         Nœuds de même forme regroupés par job (un step srun par nœud, défaut: 16, 1 = un job par nœud)
+    --schedule K           Ne soumettre que les K nœuds les plus prioritaires (âge, IC des résultats, changement d'état, idle)
+    --budget H             Budget de l'ordonnanceur en nœuds-heures de walltime par 24 h (seul ou avec --schedule)
+    --formula-walltime     Walltime de la formule, sans apprentissage des durées des jobs passés
+
+Flags spécifiques CPU (submit / submit_cpu uniquement):
+    --mem-kernels K        Kernels bande passante mémoire: copy,scale,add,triad | all | none (défaut: triad)
+    --no-latency           Ne pas mesurer la courbe de latence mémoire (pointer chasing)
+    --hugepages            Pages de 2 MiB (hugetlbfs puis THP) pour la courbe de latence
+    --workloads W          Charges réalistes mono/multi: gemm,fft1d,fft2d,sort,spmv | all | none (défaut: all)
+    --no-numa              Ne pas mesurer la matrice NUMA (bande passante/latence domaine CPU x domaine mémoire)
+    --no-flops             Ne pas mesurer le débit crête FMA (GFLOP/s par ISA sse2/avx2/avx512)
+    --slow-core-pct X      Signaler les cœurs à plus de X % sous la médiane de leur type (défaut: 10)
+    --ab                   Mesure A/B: binaires générique et natif exécutés en alternance (une ligne CSV par build)
+    --counters             Compteurs matériels perf (IPC, MPKI cache/branches, fréquence effective, stalls) en mono/multi
+    --series-ms N          Débit relevé toutes les N ms pendant chaque run (série dans results/series/, défaut: 100, 0 = off)
+    --soak S               Run d'endurance multi de S secondes sans chauffe (détection du throttling thermique)
+    --sweep-kernels K      Courbes de scaling 1,2,4..N threads: events,copy,scale,add,triad | none (défaut: events)
+    --cpu-warmup N         Répétitions de chauffe écartées avant les mesures CPU (défaut: 1)
+    --cpu-work N           Travail fixe par thread (N itérations de 256 opérations) au lieu de --duration
 
 Flags spécifiques GPU (submit / submit_gpu uniquement):
     --vram-frac F          Fraction VRAM cible pour ajuster la taille des buffers (0.05..0.95, défaut 0.80)
@@ -56,6 +101,13 @@ Flags spécifiques top:
     --unique-last           Dernier run par nœud
     --top10                 Top 10 tous runs confondus
     --by-node-mean          Moyenne (± écart-type) agrégée par nœud
+    --by-build              Speedup binaire natif / générique par nœud (runs --ab)
+    --build B               Classements CPU restreints à un build: generic | native | unknown
+    --max-contam PCT        Exclure des classements les runs contaminées au-delà de PCT % (steal + CPU étranger, +100 si GPU partagé)
+
+Flags spécifiques regress (--max-contam s'applique aussi):
+    --threshold PCT         Baisse minimale vs médiane de l'historique du nœud (défaut: 5)
+    --days D                Historique limité aux D jours précédant le dernier run
 
 Comportement de 'submit':
     1. Tente submit_gpu (ignorer si aucun GPU ou échec bénin)
@@ -72,6 +124,12 @@ Exemples:
     # Classement top10
     ./main.sh --top10 top
 
+    # Couverture continue (cron horaire): 10 nœuds prioritaires, 24 nœuds-heures par jour
+    ./main.sh --schedule 10 --budget 24 submit_cpu
+
+    # Nœuds plus lents que leur historique du dernier mois (cron: code de sortie 1)
+    ./main.sh --days 30 regress
+
 EOF
 }
 
@@ -79,7 +137,7 @@ EOF
 cmd=""
 while [[ $# -gt 0 ]]; do
     case "$1" in
-        build|submit|submit_cpu|submit_gpu|top|status|list)
+        build|submit|submit_cpu|submit_gpu|top|regress|report|status|list|compact)
             cmd="$1"; shift ;;
         -r|--repeats)
             BENCH_REPEATS="${2:?valeur manquante pour --repeats}"; shift 2 ;;
@@ -95,10 +153,46 @@ while [[ $# -gt 0 ]]; do
             ONLY_NEW=1; shift ;;
         --verbose)
             BENCH_VERBOSE=1; shift ;;
+        --batch-size)
+            BATCH_SIZE="${2:?valeur manquante pour --batch-size}"; shift 2 ;;
+        --schedule)
+            SCHEDULE_TOP="${2:?valeur manquante pour --schedule}"; shift 2 ;;
+        --budget)
+            BUDGET_NH="${2:?valeur manquante pour --budget}"; shift 2 ;;
+        --formula-walltime)
+            FORMULA_WALLTIME=1; shift ;;
         --vram-frac)
             BENCH_VRAM_FRAC="${2:?valeur manquante pour --vram-frac}"; shift 2 ;;
         --warmup)
             BENCH_WARMUP_STEPS="${2:?valeur manquante pour --warmup}"; shift 2 ;;
+        --mem-kernels)
+            MEM_KERNELS="${2:?valeur manquante pour --mem-kernels}"; shift 2 ;;
+        --no-latency)
+            NO_LATENCY=1; shift ;;
+        --hugepages)
+            HUGEPAGES=1; shift ;;
+        --no-flops)
+            NO_FLOPS=1; shift ;;
+        --no-numa)
+            NO_NUMA=1; shift ;;
+        --workloads)
+            WORKLOADS="${2:?valeur manquante pour --workloads}"; shift 2 ;;
+        --ab)
+            CPU_AB=1; shift ;;
+        --counters)
+            CPU_COUNTERS=1; shift ;;
+        --series-ms)
+            SERIES_MS="${2:?valeur manquante pour --series-ms}"; shift 2 ;;
+        --soak)
+            SOAK="${2:?valeur manquante pour --soak}"; shift 2 ;;
+        --slow-core-pct)
+            SLOW_CORE_PCT="${2:?valeur manquante pour --slow-core-pct}"; shift 2 ;;
+        --sweep-kernels)
+            SWEEP_KERNELS="${2:?valeur manquante pour --sweep-kernels}"; shift 2 ;;
+        --cpu-warmup)
+            CPU_WARMUP="${2:?valeur manquante pour --cpu-warmup}"; shift 2 ;;
+        --cpu-work)
+            CPU_WORK="${2:?valeur manquante pour --cpu-work}"; shift 2 ;;
         --unique)
             TOP_MODE="unique"; shift ;;
         --unique-last)
@@ -107,6 +201,16 @@ while [[ $# -gt 0 ]]; do
             TOP_MODE="top10"; shift ;;
         --by-node-mean)
             TOP_MODE="by-node-mean"; shift ;;
+        --by-build)
+            TOP_MODE="by-build"; shift ;;
+        --build)
+            TOP_BUILD="${2:?valeur manquante pour --build}"; shift 2 ;;
+        --max-contam)
+            TOP_MAX_CONTAM="${2:?valeur manquante pour --max-contam}"; shift 2 ;;
+        --threshold)
+            REGRESS_THRESHOLD="${2:?valeur manquante pour --threshold}"; shift 2 ;;
+        --days)
+            REGRESS_DAYS="${2:?valeur manquante pour --days}"; shift 2 ;;
         -h|--help|help)
             usage; exit 0 ;;
         --)
@@ -123,12 +227,38 @@ COMMON_ARGS=( --duration "$BENCH_DURATION" --repeats "$BENCH_REPEATS" )
 [[ -n "$LIMIT_NODES" ]] && COMMON_ARGS+=( --limit "$LIMIT_NODES" )
 (( ONLY_NEW == 1 )) && COMMON_ARGS+=( --only-new )
 (( BENCH_VERBOSE == 1 )) && COMMON_ARGS+=( --verbose )
+[[ -n "$BATCH_SIZE" ]] && COMMON_ARGS+=( --batch-size "$BATCH_SIZE" )
+[[ -n "$SCHEDULE_TOP" ]] && COMMON_ARGS+=( --schedule "$SCHEDULE_TOP" )
+[[ -n "$BUDGET_NH" ]] && COMMON_ARGS+=( --budget "$BUDGET_NH" )
+(( FORMULA_WALLTIME == 1 )) && COMMON_ARGS+=( --formula-walltime )
 [[ -n "$BENCH_VRAM_FRAC" ]] && COMMON_ARGS+=( --vram-frac "$BENCH_VRAM_FRAC" )
 [[ -n "$BENCH_WARMUP_STEPS" ]] && COMMON_ARGS+=( --warmup "$BENCH_WARMUP_STEPS" )
+[[ -n "$MEM_KERNELS" ]] && COMMON_ARGS+=( --mem-kernels "$MEM_KERNELS" )
+(( NO_LATENCY == 1 )) && COMMON_ARGS+=( --no-latency )
+(( HUGEPAGES == 1 )) && COMMON_ARGS+=( --hugepages )
+(( NO_FLOPS == 1 )) && COMMON_ARGS+=( --no-flops )
+(( NO_NUMA == 1 )) && COMMON_ARGS+=( --no-numa )
+[[ -n "$WORKLOADS" ]] && COMMON_ARGS+=( --workloads "$WORKLOADS" )
+(( CPU_AB == 1 )) && COMMON_ARGS+=( --ab )
+(( CPU_COUNTERS == 1 )) && COMMON_ARGS+=( --counters )
+[[ -n "$SERIES_MS" ]] && COMMON_ARGS+=( --series-ms "$SERIES_MS" )
+[[ -n "$SOAK" ]] && COMMON_ARGS+=( --soak "$SOAK" )
+[[ -n "$SLOW_CORE_PCT" ]] && COMMON_ARGS+=( --slow-core-pct "$SLOW_CORE_PCT" )
+[[ -n "$SWEEP_KERNELS" ]] && COMMON_ARGS+=( --sweep-kernels "$SWEEP_KERNELS" )
+[[ -n "$CPU_WARMUP" ]] && COMMON_ARGS+=( --cpu-warmup "$CPU_WARMUP" )
+[[ -n "$CPU_WORK" ]] && COMMON_ARGS+=( --cpu-work "$CPU_WORK" )
 
 TOP_ARGS=( --mode "$TOP_MODE" )
+[[ -n "$TOP_BUILD" ]] && TOP_ARGS+=( --build "$TOP_BUILD" )
+[[ -n "$TOP_MAX_CONTAM" ]] && TOP_ARGS+=( --max-contam "$TOP_MAX_CONTAM" )
 (( BENCH_VERBOSE == 1 )) && TOP_ARGS+=( --verbose )
 
+REGRESS_ARGS=()
+[[ -n "$REGRESS_THRESHOLD" ]] && REGRESS_ARGS+=( --threshold "$REGRESS_THRESHOLD" )
+[[ -n "$REGRESS_DAYS" ]] && REGRESS_ARGS+=( --days "$REGRESS_DAYS" )
+[[ -n "$TOP_MAX_CONTAM" ]] && REGRESS_ARGS+=( --max-contam "$TOP_MAX_CONTAM" )
+(( BENCH_VERBOSE == 1 )) && REGRESS_ARGS+=( --verbose )
+
 case "$cmd" in
     build)
         bash "$CMD_DIR/build.sh" ;;
@@ -140,10 +270,19 @@ case "$cmd" in
         bash "$CMD_DIR/submit_gpu.sh" "${COMMON_ARGS[@]}" ;;
     top)
         bash "$CMD_DIR/top.sh" "${TOP_ARGS[@]}" ;;
+    regress)
+        bash "$CMD_DIR/regress.sh" "${REGRESS_ARGS[@]}" ;;
+    report)
+        REPORT_ARGS=()
+        [[ -n "$TOP_MAX_CONTAM" ]] && REPORT_ARGS+=( --max-contam "$TOP_MAX_CONTAM" )
+        (( BENCH_VERBOSE == 1 )) && REPORT_ARGS+=( --verbose )
+        bash "$CMD_DIR/report.sh" "${REPORT_ARGS[@]}" ;;
     status)
         bash "$CMD_DIR/status.sh" ;;
     list)
         bash "$CMD_DIR/list.sh" ;;
+    compact)
+        python3 "$ROOT_DIR/src/results_store.py" --results "$ROOT_DIR/results" compact --wait ;;
     *)
         usage; exit 1 ;;
 esac
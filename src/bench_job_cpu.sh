@@ -8,11 +8,26 @@ ROOT_DIR=${BENCH_ROOT:?BENCH_ROOT non défini}
 BIN_DIR="$ROOT_DIR/bin"
 RES_DIR="$ROOT_DIR/results"
 
-HOST=$(hostname -s)
+HOST=${BENCH_HOST:-$(hostname -s)}  # BENCH_HOST: nom du nœud imposé (simulateur local)
 CPUS=${SLURM_CPUS_ON_NODE:-$(nproc)}
 DUR=3.0
 REPEATS=5
 VERBOSE=0
+MEM_KERNELS="triad"   # kernels mémoire balayés (--mem-kernels copy,scale,add,triad | all | none)
+LATENCY=1             # courbe de latence pointer-chasing (désactivable via --no-latency)
+HUGEPAGES=0           # pages de 2 MiB pour la courbe de latence (--hugepages)
+CPU_WARMUP=1          # répétitions de chauffe écartées par mode (--cpu-warmup)
+CPU_WORK=""           # travail fixe par thread (itérations bench_kernel) au lieu d'une durée (--cpu-work)
+SLOW_CORE_PCT=10      # cœur signalé lent s'il est à plus de X % sous la médiane de son type (--slow-core-pct)
+AB=0                  # mesure A/B binaire générique vs natif, entrelacée (--ab)
+WORKLOADS="all"       # charges réalistes gemm,fft1d,fft2d,sort,spmv (--workloads ... | none)
+NUMA=1                # matrice NUMA bande passante/latence (désactivable via --no-numa)
+FLOPS=1               # débit crête FMA par ISA disponible (désactivable via --no-flops)
+COUNTERS=0            # compteurs matériels perf (IPC, MPKI, fréquence effective) en mono/multi (--counters)
+SERIES_MS=100         # série temporelle intra-run, débit relevé toutes les N ms (--series-ms, 0 = désactivée)
+SOAK=0                # run d'endurance multi de N secondes, sans chauffe (--soak)
+SOAK_PROGRESS_S=30    # intervalle (s) des débits du soak écrits au fil du run
+SWEEP_KERNELS="events"  # courbes de scaling 1..N threads (--sweep-kernels events,triad | none)
 
 # Parsing des arguments transmis par submit_cpu.sh
 while [[ $# -gt 0 ]]; do
@@ -21,6 +36,34 @@ while [[ $# -gt 0 ]]; do
             DUR="${2:?valeur manquante pour --duration}"; shift 2 ;;
         --repeats)
             REPEATS="${2:?valeur manquante pour --repeats}"; shift 2 ;;
+        --mem-kernels)
+            MEM_KERNELS="${2:?valeur manquante pour --mem-kernels}"; shift 2 ;;
+        --no-latency)
+            LATENCY=0; shift ;;
+        --hugepages)
+            HUGEPAGES=1; shift ;;
+        --no-flops)
+            FLOPS=0; shift ;;
+        --no-numa)
+            NUMA=0; shift ;;
+        --workloads)
+            WORKLOADS="${2:?valeur manquante pour --workloads}"; shift 2 ;;
+        --ab)
+            AB=1; shift ;;
+        --counters)
+            COUNTERS=1; shift ;;
+        --series-ms)
+            SERIES_MS="${2:?valeur manquante pour --series-ms}"; shift 2 ;;
+        --soak)
+            SOAK="${2:?valeur manquante pour --soak}"; shift 2 ;;
+        --slow-core-pct)
+            SLOW_CORE_PCT="${2:?valeur manquante pour --slow-core-pct}"; shift 2 ;;
+        --cpu-warmup)
+            CPU_WARMUP="${2:?valeur manquante pour --cpu-warmup}"; shift 2 ;;
+        --cpu-work)
+            CPU_WORK="${2:?valeur manquante pour --cpu-work}"; shift 2 ;;
+        --sweep-kernels)
+            SWEEP_KERNELS="${2:?valeur manquante pour --sweep-kernels}"; shift 2 ;;
         --verbose)
             VERBOSE=1; shift ;;
         --)
@@ -30,13 +73,20 @@ while [[ $# -gt 0 ]]; do
     esac
 done
 
+# Verrou par nœud (job Slurm, hôte, PID) et spool des résultats du job
+source "$ROOT_DIR/src/lib/job_common.sh"
+
 # Empêcher une exécution concurrente si le répertoire est partagé
 lockfile="$RES_DIR/.lock.$HOST"
-if ! ( set -o noclobber; : >"$lockfile" ) 2>/dev/null; then
+if ! acquire_lock "$lockfile"; then
     echo "Un bench est déjà en cours pour $HOST, on quitte." >&2
     exit 0
 fi
-trap 'rm -f "$lockfile"' EXIT
+ROWS_TMP=$(mktemp)
+# durée du job enregistrée à la sortie (walltime appris), y compris sur
+# SIGTERM envoyé par Slurm à l'échéance du walltime
+trap 'rc=$?; record_elapsed cpu "${HW_CLASS:--}" "$CPUS" "$rc"; rm -f "$lockfile" "$ROWS_TMP"' EXIT
+trap 'exit 143' TERM
 
 # Variables pour libs BLAS/OpenMP
 export OMP_PROC_BIND=close
@@ -44,16 +94,54 @@ export OMP_PLACES=cores
 
 # Prépare les binaires dans le dossier bin du projet
 GENERIC_BIN="$BIN_DIR/cpu_bench"
-NATIVE_BIN="$BIN_DIR/bench-$HOST"
+CC=${CC:-$(command -v gcc 2>/dev/null || command -v clang 2>/dev/null || true)}
+
+# Empreinte du binaire natif: modèle CPU, flags CPU et version du compilateur.
+# Tous les nœuds identiques partagent ainsi bin/native/<empreinte>/cpu_bench.
+# Préfixe lisible = cible -march=native résolue par le compilateur (ex. icelake-server).
+native_fingerprint() {
+    local model flags ccver march
+    model=$(awk -F': *' '/^(model name|CPU part|cpu model)/{print $2; exit}' /proc/cpuinfo 2>/dev/null)
+    flags=$(awk -F': *' '/^(flags|Features)/{print $2; exit}' /proc/cpuinfo 2>/dev/null)
+    ccver=$("$CC" --version 2>/dev/null | head -1)
+    march=$("$CC" -march=native -Q --help=target 2>/dev/null | awk '$1=="-march="{print $2; exit}')
+    printf '%s-%s\n' "${march:-$(uname -m)}" \
+        "$(printf '%s\n%s\n%s\n%s\n' "$(uname -m)" "$model" "$flags" "$ccver" | cksum | awk '{printf "%08x", $1}')"
+}
 
-# Construire le binaire natif via le Makefile (dans bin/)
-if [[ ! -x "$NATIVE_BIN" ]]; then
-    (( VERBOSE == 1 )) && echo "[bench] build native for host=$HOST into $NATIVE_BIN"
-    make -C "$ROOT_DIR/src" native-host HOSTNAME="$HOST" PREFIX="$ROOT_DIR" >/dev/null 2>&1 || true
+# Classe matérielle du nœud (colonne hw_class): modèle et flags CPU, nombre de
+# CPU alloués, sans le compilateur. Les nœuds d'une même classe forment la
+# flotte de référence de « main.sh regress ».
+hw_class() {
+    local model flags
+    model=$(awk -F': *' '/^(model name|CPU part|cpu model)/{print $2; exit}' /proc/cpuinfo 2>/dev/null)
+    flags=$(awk -F': *' '/^(flags|Features)/{print $2; exit}' /proc/cpuinfo 2>/dev/null)
+    printf '%s-%s-%sc\n' "$(uname -m)" \
+        "$(printf '%s\n%s\n' "$model" "$flags" | cksum | awk '{printf "%08x", $1}')" "$CPUS"
+}
+HW_CLASS=$(hw_class)
+
+NATIVE_BIN=""
+if [[ -n "$CC" ]]; then
+    NATIVE_FP=$(native_fingerprint)
+    NATIVE_BIN="$BIN_DIR/native/$NATIVE_FP/cpu_bench"
+    # Compilation une seule fois par empreinte, sous verrou (le premier nœud
+    # compile, les autres attendent puis réutilisent). make ne recompile que si
+    # la source est plus récente que le binaire en cache.
+    if [[ ! -x "$NATIVE_BIN" || "$ROOT_DIR/src/cpu_bench.c" -nt "$NATIVE_BIN" ]]; then
+        (( VERBOSE == 1 )) && echo "[bench] build native fp=$NATIVE_FP into $NATIVE_BIN"
+        mkdir -p "$BIN_DIR/native/$NATIVE_FP" 2>/dev/null || true
+        build_cmd=( make -C "$ROOT_DIR/src" native-cache CC="$CC" NATIVE_FP="$NATIVE_FP" PREFIX="$ROOT_DIR" )
+        if command -v flock >/dev/null 2>&1; then
+            flock -w 600 "$BIN_DIR/native/$NATIVE_FP/.lock" "${build_cmd[@]}" >/dev/null 2>&1 || true
+        else
+            "${build_cmd[@]}" >/dev/null 2>&1 || true
+        fi
+    fi
 fi
 
 # Choix du binaire: natif si disponible, sinon générique
-if [[ -x "$NATIVE_BIN" ]]; then
+if [[ -n "$NATIVE_BIN" && -x "$NATIVE_BIN" ]]; then
     BENCH_BIN="$NATIVE_BIN"
     (( VERBOSE == 1 )) && echo "[bench] Using native binary: $BENCH_BIN"
 else
@@ -64,78 +152,526 @@ if [[ ! -x "$BENCH_BIN" ]]; then
     exit 1
 fi
 
-# Fichier résultat CSV par nœud (préfixé)
-CSV="$RES_DIR/cpu_$HOST.csv"
-new_header="node,mode,threads,runs,duration_s,avg_events_per_s,stddev_events_per_s,min_events_per_s,max_events_per_s,timestamp"
-if [[ -f "$CSV" ]]; then
-    # Vérifier si l'en-tête correspond au nouveau schéma, sinon sauvegarder l'ancien
-    read -r first_line <"$CSV" || true
-    if [[ "$first_line" != "$new_header" ]]; then
-        mv "$CSV" "$CSV.bak.$(date +%s)" 2>/dev/null || true
+# Contamination (voisins bruyants, démons résiduels): relevés /proc avant et
+# après chaque mesure. Processus « étrangers » = hors de la session du job
+# (le script et cpu_bench en font partie), noyau compris.
+CLK_TCK=$(getconf CLK_TCK 2>/dev/null || echo 100)
+NODE_CPUS=$(getconf _NPROCESSORS_ONLN 2>/dev/null || nproc)
+JOB_SID=$(awk '{sub(/.*\) /, ""); print $4}' /proc/$$/stat 2>/dev/null || echo -1)
+CONTAM=",,,,"   # load1,steal_pct,foreign_cpu_pct,foreign_top,contamination de la dernière mesure
+
+# total et steal (jiffies) de la ligne cpu de /proc/stat
+cpu_jiffies() {
+    awk '$1=="cpu"{t=0; for(i=2;i<=9;i++) t+=$i; print t, $9; exit}' /proc/stat 2>/dev/null
+}
+
+# "<pid> <ticks utime+stime> <comm>" des processus hors de la session du job
+foreign_ticks() {
+    # un processus terminé entre le glob et la lecture fait échouer cat (pipefail)
+    { cat /proc/[0-9]*/stat 2>/dev/null || true; } | awk -v sid="$JOB_SID" '{
+        j=0; for(k=length($0)-1;k>0;k--) if(substr($0,k,2)==") "){j=k; break}
+        if(!j) next
+        c=substr($0, index($0, "(")+1, j-index($0, "(")-1); gsub(/[ ,]/, "_", c)
+        split(substr($0, j+2), f, " ")
+        if(f[4]!=sid) print $1, f[12]+f[13], c
+    }'
+}
+
+contam_begin() {
+    CONTAM_T0=$(date +%s.%N)
+    CONTAM_LOAD=$(awk '{print $1}' /proc/loadavg 2>/dev/null)
+    CONTAM_CPU0=$(cpu_jiffies)
+    CONTAM_F0=$(foreign_ticks)
+}
+
+# Calcule CONTAM pour l'intervalle depuis contam_begin: charge 1 min au départ,
+# % de steal, % de la capacité du nœud consommé par les processus étrangers,
+# le plus gourmand d'entre eux, et le score = steal + CPU étranger (en %)
+contam_end() {
+    local t1 cpu1 f1
+    t1=$(date +%s.%N)
+    cpu1=$(cpu_jiffies)
+    f1=$(foreign_ticks)
+    CONTAM=$(awk -v t0="$CONTAM_T0" -v t1="$t1" -v c0="$CONTAM_CPU0" -v c1="$cpu1" \
+                 -v hz="$CLK_TCK" -v n="$NODE_CPUS" -v load="$CONTAM_LOAD" '
+        FNR==NR{b[$1]=$2; next}
+        {d=$2-(($1 in b) ? b[$1] : 0); if(d>0){ft+=d; by[$3]+=d}}
+        END{
+            split(c0, a, " "); split(c1, z, " "); dt=z[1]-a[1]
+            st=(dt>0) ? 100*(z[2]-a[2])/dt : 0
+            fp=(t1>t0 && hz>0 && n>0) ? 100*ft/((t1-t0)*hz*n) : 0
+            top=""; m=0; for(k in by) if(by[k]>m){m=by[k]; top=k}
+            printf "%s,%.2f,%.2f,%s,%.2f\n", load, st, fp, top, st+fp
+        }' <(printf '%s\n' "$CONTAM_F0") <(printf '%s\n' "$f1"))
+    local score=${CONTAM##*,}
+    if awk -v s="$score" 'BEGIN{exit !(s>5)}'; then
+        echo "[contam] activité étrangère pendant la mesure: ${score} % (steal + CPU hors job, surtout '$(cut -d, -f4 <<<"$CONTAM")')" >&2
     fi
-fi
-if [[ ! -f "$CSV" ]]; then
-    echo "$new_header" >"$CSV"
-fi
+}
+
+# Lignes CPU mono/multi (results/cpu_<host>.csv après compaction du spool)
+new_header="node,mode,threads,runs,duration_s,avg_events_per_s,stddev_events_per_s,min_events_per_s,max_events_per_s,median_events_per_s,p5_events_per_s,p95_events_per_s,robust_mean_events_per_s,work_iters,build,compiler,isa,cflags,counters,ipc,cache_mpki,branch_mpki,eff_mhz,stall_frontend_pct,stall_backend_pct,governor,freq_mhz,pkg_w,events_per_j,pkg_limit_w,series_ms,drop_pct,cv_pct,throttle_s,series_file,load1,steal_pct,foreign_cpu_pct,foreign_top,contamination,hw_class,timestamp"
+declare -A LAST_AVG=()   # dernière moyenne par mode, pour la synthèse finale
+
+# Extrait les statistiques imprimées par cpu_bench (RUNS, SCORE, STD, ...) dans
+# l'ordre des colonnes CSV: runs,avg,std,min,max,median,p5,p95,robust_mean
+parse_stats() {
+    awk '{v[$1]=$2} END{OFS=","; print v["RUNS"], v["SCORE"], v["STD"], v["MIN"], v["MAX"], v["MEDIAN"], v["P5"], v["P95"], v["RMEAN"]}'
+}
+
+# Compteurs matériels imprimés par cpu_bench --counters, dans l'ordre des
+# colonnes CSV: counters,ipc,cache_mpki,branch_mpki,eff_mhz,stall_fe,stall_be
+# ("off:<raison>" et valeurs vides si perf est refusé ou la PMU absente)
+parse_counters() {
+    awk '$1=="COUNTERS"{st=($2=="on") ? "on" : "off:" $3} {v[$1]=$2}
+         END{OFS=","; print st, v["IPC"], v["CACHE_MPKI"], v["BRANCH_MPKI"], v["EFF_MHZ"], v["STALL_FE_PCT"], v["STALL_BE_PCT"]}'
+}
+
+# Télémétrie échantillonnée par cpu_bench pendant les répétitions mesurées,
+# dans l'ordre des colonnes CSV: governor,freq_mhz,pkg_w,events_per_j,pkg_limit_w
+# (vides sans cpufreq / RAPL lisible)
+parse_telemetry() {
+    awk '{v[$1]=$2}
+         END{OFS=","; g=v["GOVERNOR"]; if(g=="-") g=""; print g, v["FREQ_MHZ"], v["PKG_W"], v["EVENTS_PER_J"], v["PKG_LIMIT_W"]}'
+}
+
+# Séries temporelles intra-run: un fichier compact par mode et par job,
+# results/series/<node>_<mode>_<horodatage>.csv (chemin relatif à results/)
+SERIES_DIR="$RES_DIR/series"
 
-calc_stats() {
-    # lit des nombres (un par ligne) sur stdin et imprime: avg stddev
-    awk '{s+=$1;n++;ss+=$1*$1} END{if(n){m=s/n; v=(ss/n)-(m*m); if(v<0) v=0; printf "%.3f %.3f\n", m, sqrt(v)} else {print "0 0"}}'
+# write_series <mode> <sortie cpu_bench> -> imprime le chemin relatif (vide sans série)
+write_series() {
+    local label=$1 output=$2
+    grep -q '^SERIES ' <<<"$output" || return 0
+    mkdir -p "$SERIES_DIR"
+    local rel="series/${HOST}_${label}_$(date +%Y%m%dT%H%M%S).csv"
+    # SERIES <run> <t_s> <events/s total> <events/s par thread...>
+    awk '$1=="SERIES"{
+            if(!hdr){printf "run,t_s,events_per_s"; for(i=5;i<=NF;i++) printf ",thread_%d", i-5; printf "\n"; hdr=1}
+            line=$2; for(i=3;i<=NF;i++) line=line "," $i; print line
+         }' <<<"$output" >"$RES_DIR/$rel.tmp.$$" && mv "$RES_DIR/$rel.tmp.$$" "$RES_DIR/$rel"
+    echo "$rel"
+}
+
+# Stabilité intra-run imprimée par cpu_bench --series, dans l'ordre des colonnes
+# CSV: series_ms,drop_pct,cv_pct,throttle_s (vides sans série)
+parse_stability() {
+    awk '{v[$1]=$2} END{OFS=","; print v["SERIES_MS"], v["DROP_PCT"], v["CV_PCT"], v["THROTTLE_S"]}'
+}
+
+# Identité d'un binaire pour le CSV: build,compiler,isa,cflags (virgules
+# neutralisées). Un binaire antérieur à --build-info donne "unknown".
+build_info() {
+    "$1" --build-info 2>/dev/null | awk '
+        {k=$1; sub(/^[^ ]+ ?/, ""); gsub(/,/, ";"); v[k]=$0}
+        END{OFS=","; print (v["BUILD"]==""?"unknown":v["BUILD"]), v["COMPILER"], v["ISA"], v["CFLAGS"]}'
+}
+
+# Recopie la sortie de cpu_bench (stdin) et enregistre chaque ligne
+# « RUN <i> <score> <durée> » dès qu'elle paraît (cpu_bench vide stdout après
+# chaque répétition): un job tué garde ses répétitions terminées. Un run long
+# lancé avec --progress (soak) est enregistré par intervalles « PROGRESS »
+# au fil du run; sa ligne RUN n'est alors pas répétée.
+# Usage: stream_reps <mode> <build> <répétitions ou intervalles prévus>
+stream_reps() {
+    local line rep score run_s _ chunks=0
+    while IFS= read -r line; do
+        printf '%s\n' "$line"
+        case "$line" in
+            "PROGRESS "*)
+                read -r _ rep score run_s _ <<<"$line"
+                chunks=$rep
+                record_rep cpu "$1" "$2" "$rep" "$3" "$score" "$run_s" ;;
+            "RUN "*)
+                (( chunks > 0 )) && continue
+                read -r _ rep score run_s _ <<<"$line"
+                record_rep cpu "$1" "$2" "$rep" "$3" "$score" "$run_s" ;;
+        esac
+    done
+    return 0
 }
 
 run_mode() {
     local mode_threads=$1  # 1 ou $CPUS
     local label=$2         # mono|multi
-    local i score
+    local bin=${3:-$BENCH_BIN}
     # configure OpenMP
     export OMP_NUM_THREADS=$mode_threads
-    # collecte des scores
-    scores=()
-    for ((i=1;i<=REPEATS;i++)); do
-        extra=""
-        (( VERBOSE == 1 && i == 1 )) && extra="--verbose"
-        # Exécuter en capturant stdout tout en laissant stderr aller au fichier .err de Slurm
-        set +e
-        output=$("$BENCH_BIN" --duration "$DUR" $extra 2> >(tee >&2))
-        rc=$?
-        set -e
-        if (( rc != 0 )); then
-        echo "[$label] run $i/$REPEATS: échec (rc=$rc)" >&2
-        continue
-        fi
-        score=$(awk '/SCORE/{print $2}' <<<"$output")
-        if [[ -z "$score" ]]; then
-        echo "[$label] run $i/$REPEATS: aucun SCORE détecté" >&2
-        continue
-        fi
-        echo "[$label] run $i/$REPEATS: $score"
-        scores+=("$score")
-    done
-    read -r avg std <<< "$(printf "%s\n" "${scores[@]}" | calc_stats)"
-    # Calcul min / max (si scores non vides)
-    if ((${#scores[@]})); then
-        min_v=${scores[0]}
-        max_v=${scores[0]}
-        for v in "${scores[@]}"; do
-        (( $(awk -v a="$v" -v b="$min_v" 'BEGIN{print (a<b)}') )) && min_v=$v || true
-        (( $(awk -v a="$v" -v b="$max_v" 'BEGIN{print (a>b)}') )) && max_v=$v || true
+    # toutes les répétitions (et le warmup écarté) dans un seul processus
+    local args=( --duration "$DUR" --repeats "$REPEATS" --warmup "$CPU_WARMUP" )
+    [[ -n "$CPU_WORK" ]] && args+=( --work "$CPU_WORK" )
+    (( COUNTERS == 1 )) && args+=( --counters )
+    (( SERIES_MS > 0 )) && args+=( --series "$SERIES_MS" )
+    (( VERBOSE == 1 )) && args+=( --verbose )
+    # PROGRESS_S (soak): débit écrit toutes les PROGRESS_S secondes pendant le run
+    local planned=$REPEATS
+    if [[ -n "${PROGRESS_S:-}" ]] && (( SERIES_MS > 0 )); then
+        args+=( --progress "$PROGRESS_S" )
+        planned=$(awk -v d="$DUR" -v p="$PROGRESS_S" 'BEGIN{n=int(d/p); print (n<1 ? 1 : n)}')
+    fi
+    local build
+    build=$(build_info "$bin")
+    record_phase cpu "$label" "${build%%,*}" "$planned"
+    # Exécuter en capturant stdout tout en laissant stderr aller au fichier .err de Slurm;
+    # chaque répétition est enregistrée dès sa fin (stream_reps)
+    contam_begin
+    set +e
+    output=$("$bin" "${args[@]}" 2> >(tee >&2) | stream_reps "$label" "${build%%,*}" "$planned")
+    rc=$?
+    set -e
+    contam_end
+    if (( rc != 0 )); then
+        echo "[$label] échec (rc=$rc)" >&2
+        return 0
+    fi
+    awk -v l="$label" -v r="$REPEATS" '$1=="RUN"{printf "[%s] run %d/%d: %s\n", l, $2, r, $3}' <<<"$output"
+    if ! grep -q '^SCORE ' <<<"$output"; then
+        echo "[$label] aucun SCORE détecté" >&2
+        return 0
+    fi
+    awk -v l="$label" '$1=="STABILITY"{printf "[%s] run %d: chute %s %%, CV %s %%, throttling %s\n", l, $2, $3, $4, ($5=="-" ? "non" : "à " $5 " s")}' <<<"$output"
+    local series_file
+    series_file=$(write_series "$label" "$output")
+    # --cpu-work: duration_s = durée moyenne mesurée d'une répétition
+    [[ -n "$CPU_WORK" ]] && local DUR=$(awk '$1=="DURATION"{print $2}' <<<"$output")
+    write_cpu_row "$label" "$mode_threads" "$(parse_stats <<<"$output")" "$build" \
+        "$(parse_counters <<<"$output")" "$(parse_telemetry <<<"$output")" \
+        "$(parse_stability <<<"$output"),$series_file"
+    if [[ "$label" == "multi" ]]; then
+        write_cores "$output"
+    fi
+}
+
+# Carte des débits par cœur (lignes CORE du mode multi): médiane calculée par
+# type de cœur (P/E séparés sur les hybrides), écart relatif et drapeau « slow »
+cores_header="node,cpu,thread,core_type,events_per_s,type_median_events_per_s,deficit_pct,slow,slow_threshold_pct,timestamp"
+
+write_cores() {
+    grep -q '^CORE ' <<<"$1" || return 0
+    ts=$(date -Iseconds)
+    # CORE <thread> <cpu> <type> <events/s>
+    awk -v h="$HOST" -v ts="$ts" -v pct="$SLOW_CORE_PCT" -v out="$ROWS_TMP" '
+        $1=="CORE"{n++; th[n]=$2; cpu[n]=$3; ty[n]=$4; v[n]=$5; cnt[$4]++; val[$4, cnt[$4]]=$5}
+        END{
+            for(t in cnt){
+                m=cnt[t]
+                for(i=1;i<=m;i++) s[i]=val[t, i]
+                for(i=2;i<=m;i++){x=s[i]; for(j=i-1;j>=1 && s[j]>x;j--) s[j+1]=s[j]; s[j+1]=x}
+                med[t]=(m%2) ? s[(m+1)/2] : (s[m/2]+s[m/2+1])/2
+            }
+            slow=0
+            for(i=1;i<=n;i++){
+                d=(med[ty[i]]>0) ? 100*(med[ty[i]]-v[i])/med[ty[i]] : 0
+                flag=(d>pct) ? 1 : 0
+                if(flag){slow++; printf "[cores] cœur lent: cpu %s (type %s) %.1f %% sous la médiane\n", cpu[i], ty[i], d}
+                printf "%s,%s,%s,%s,%s,%.3f,%.2f,%d,%s,%s\n", h, cpu[i], th[i], ty[i], v[i], med[ty[i]], d, flag, pct, ts >>out
+            }
+            printf "[cores] %d cœurs mesurés, %d lents (seuil %s %%)\n", n, slow, pct
+        }' <<<"$1"
+    spool_rows cores "$cores_header" <"$ROWS_TMP"
+    : >"$ROWS_TMP"
+}
+
+# Ajoute une ligne au CSV CPU:
+# write_cpu_row <mode> <threads> <stats> <build> [<counters>] [<telemetry>] [<stability>]
+write_cpu_row() {
+    local label=$1 mode_threads=$2 stats=$3 build=$4 counters=${5:-,,,,,,} telemetry=${6:-,,,,} stability=${7:-,,,,}
+    ts=$(date -Iseconds)
+    IFS=, read -r runs avg std min_v max_v med p5 p95 rmean <<<"$stats"
+    echo "$HOST,$label,$mode_threads,$runs,$DUR,$avg,$std,$min_v,$max_v,$med,$p5,$p95,$rmean,$CPU_WORK,$build,$counters,$telemetry,$stability,$CONTAM,$HW_CLASS,$ts" | spool_rows cpu "$new_header"
+    LAST_AVG[$label]=$avg
+    echo "$label [${build%%,*}] avg=$avg std=$std min=$min_v max=$max_v median=$med p5=$p5 p95=$p95 robust=$rmean"
+    if [[ "${counters%%,*}" == on ]]; then
+        IFS=, read -r _ ipc cmpki bmpki mhz _ <<<"$counters"
+        echo "$label [counters] ipc=$ipc cache_mpki=$cmpki branch_mpki=$bmpki eff_mhz=$mhz"
+    elif [[ -n "${counters%%,*}" ]]; then
+        echo "$label [counters] indisponibles (${counters%%,*})"
+    fi
+    local gov mhz watts epj limit
+    IFS=, read -r gov mhz watts epj limit <<<"$telemetry"
+    if [[ -n "$gov$mhz$watts" ]]; then
+        echo "$label [telemetry] governor=${gov:--} freq_mhz=${mhz:--} pkg_w=${watts:--} events_per_j=${epj:--} pkg_limit_w=${limit:--}"
+    fi
+    if [[ -n "$gov" && "$gov" != performance ]]; then
+        echo "[$label] attention: gouverneur cpufreq '$gov' (scores potentiellement bridés)" >&2
+    fi
+}
+
+# Mesure A/B: binaires générique et natif exécutés en alternance (ordre ABBA
+# d'une répétition à l'autre, pour que la dérive thermique ou la charge du
+# nœud pèse autant sur les deux), une répétition par processus; les
+# statistiques sont recalculées par cpu_bench --stats sur les scores collectés.
+run_ab() {
+    local mode_threads=$1
+    local label=$2
+    export OMP_NUM_THREADS=$mode_threads
+    local args=( --duration "$DUR" --repeats 1 --warmup "$CPU_WARMUP" )
+    [[ -n "$CPU_WORK" ]] && args+=( --work "$CPU_WORK" )
+    local -a order scores_g=() scores_n=() runs_g=() runs_n=()
+    local r b score run_s
+    record_phase cpu "$label" ab "$REPEATS"
+    contam_begin
+    for (( r = 1; r <= REPEATS; r++ )); do
+        if (( r % 2 == 1 )); then order=( "$GENERIC_BIN" "$NATIVE_BIN" ); else order=( "$NATIVE_BIN" "$GENERIC_BIN" ); fi
+        for b in "${order[@]}"; do
+            set +e
+            read -r score run_s < <("$b" "${args[@]}" 2> >(tee >&2) | awk '$1=="RUN"{print $3, $4}')
+            set -e
+            [[ -z "$score" ]] && continue
+            record_rep cpu "$label" "$([[ "$b" == "$GENERIC_BIN" ]] && echo generic || echo native)" "$r" "$REPEATS" "$score" "$run_s"
+            if [[ "$b" == "$GENERIC_BIN" ]]; then scores_g+=( "$score" ); runs_g+=( "$run_s" ); else scores_n+=( "$score" ); runs_n+=( "$run_s" ); fi
+            echo "[$label-ab] run $r/$REPEATS $([[ "$b" == "$GENERIC_BIN" ]] && echo generic || echo native): $score"
         done
-    else
-        min_v=0; max_v=0
+    done
+    contam_end
+    if (( ${#scores_g[@]} == 0 || ${#scores_n[@]} == 0 )); then
+        echo "[$label-ab] échec: scores manquants" >&2
+        return 0
+    fi
+    local stats_g stats_n
+    stats_g=$(printf '%s\n' "${scores_g[@]}" | "$GENERIC_BIN" --stats | parse_stats)
+    stats_n=$(printf '%s\n' "${scores_n[@]}" | "$GENERIC_BIN" --stats | parse_stats)
+    # --cpu-work: duration_s = durée moyenne mesurée d'une répétition du binaire
+    [[ -n "$CPU_WORK" ]] && local DUR=$(printf '%s\n' "${runs_g[@]}" | awk '{s+=$1} END{printf "%.3f", s/NR}')
+    write_cpu_row "$label" "$mode_threads" "$stats_g" "$(build_info "$GENERIC_BIN")"
+    [[ -n "$CPU_WORK" ]] && local DUR=$(printf '%s\n' "${runs_n[@]}" | awk '{s+=$1} END{printf "%.3f", s/NR}')
+    write_cpu_row "$label" "$mode_threads" "$stats_n" "$(build_info "$NATIVE_BIN")"
+    awk -F, -v l="$label" -v g="$stats_g" -v n="$stats_n" 'BEGIN{split(g,a,","); split(n,b,","); if(a[2]>0) printf "[%s-ab] speedup natif/générique = %.3f\n", l, b[2]/a[2]}'
+}
+
+# Endurance: un seul run multi de SOAK secondes, sans chauffe, pour voir le
+# throttling qui n'apparaît qu'après plusieurs dizaines de secondes de charge
+# (ligne CSV mode=soak; série relevée toutes les secondes si --series-ms 0).
+# Le débit de chaque intervalle de SOAK_PROGRESS_S secondes est écrit dès sa
+# fin: un soak tué par le walltime garde ses intervalles terminés.
+run_soak() {
+    local DUR=$SOAK REPEATS=1 CPU_WARMUP=0 CPU_WORK="" PROGRESS_S=$SOAK_PROGRESS_S
+    (( SERIES_MS > 0 )) || local SERIES_MS=1000
+    run_mode "$CPUS" soak
+}
+
+# Balayage bande passante mémoire (kernels STREAM, working set L1 -> DRAM)
+mem_header="node,kernel,mode,threads,size_bytes,runs,avg_GBps,stddev_GBps,min_GBps,max_GBps,median_GBps,p5_GBps,p95_GBps,robust_mean_GBps,contamination,timestamp"
+
+run_mem() {
+    local kernel=$1
+    local mode_threads=$2
+    local label=$3
+    export OMP_NUM_THREADS=$mode_threads
+    record_phase cpu "mem-$label" "$kernel"
+    contam_begin
+    set +e
+    output=$("$BENCH_BIN" --kernel "$kernel" --duration "$DUR" --repeats "$REPEATS" --warmup "$CPU_WARMUP" 2> >(tee >&2))
+    rc=$?
+    set -e
+    contam_end
+    if (( rc != 0 )); then
+        echo "[mem-$kernel-$label] échec (rc=$rc)" >&2
+        return 0
+    fi
+    grep -q '^MEM ' <<<"$output" || return 0
+    ts=$(date -Iseconds)
+    # MEM <kernel> <size> <threads> <moy> <std> <min> <max> <médiane> <p5> <p95> <moy.robuste> <n>
+    awk -v h="$HOST" -v m="$label" -v ts="$ts" -v c="${CONTAM##*,}" '
+        $1=="MEM"{printf "%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s\n", h, $2, m, $4, $3, $13, $5, $6, $7, $8, $9, $10, $11, $12, c, ts}
+    ' <<<"$output" | spool_rows mem "$mem_header"
+    echo "[mem-$kernel-$label] $(awk '/^SCORE/{print $2}' <<<"$output") GB/s (plus grand working set, moyenne sur $REPEATS runs)"
+}
+
+# Courbe de latence (ns par chargement) de 4 KiB à plusieurs GiB, un seul thread
+lat_header="node,size_bytes,ns_per_load,hugepages,timestamp"
+
+run_latency() {
+    local args=( --kernel latency --duration "$DUR" )
+    (( HUGEPAGES == 1 )) && args+=( --hugepages )
+    export OMP_NUM_THREADS=1
+    record_phase cpu lat -
+    set +e
+    output=$("$BENCH_BIN" "${args[@]}" 2> >(tee >&2))
+    rc=$?
+    set -e
+    if (( rc != 0 )); then
+        echo "[latency] échec (rc=$rc)" >&2
+        return 0
+    fi
+    ts=$(date -Iseconds)
+    awk -v h="$HOST" -v ts="$ts" '$1=="LAT"{printf "%s,%s,%s,%s,%s\n", h, $2, $3, $4, ts}' <<<"$output" | spool_rows lat "$lat_header"
+    echo "[latency] $(awk '$1=="LAT"{n++} END{print n+0}' <<<"$output") tailles, $(awk '/^SCORE/{print $2}' <<<"$output") ns/chargement au plus grand working set"
+}
+
+# Débit crête flottant (GFLOP/s) pour chaque ISA supportée (sse2/avx2/avx512) et précision
+flops_header="node,isa,precision,mode,threads,runs,avg_GFLOPs,stddev_GFLOPs,min_GFLOPs,max_GFLOPs,median_GFLOPs,p5_GFLOPs,p95_GFLOPs,robust_mean_GFLOPs,contamination,timestamp"
+
+run_flops() {
+    local mode_threads=$1
+    local label=$2
+    export OMP_NUM_THREADS=$mode_threads
+    record_phase cpu "flops-$label" -
+    contam_begin
+    set +e
+    output=$("$BENCH_BIN" --kernel flops --duration "$DUR" --repeats "$REPEATS" --warmup "$CPU_WARMUP" 2> >(tee >&2))
+    rc=$?
+    set -e
+    contam_end
+    if (( rc != 0 )); then
+        echo "[flops-$label] échec (rc=$rc)" >&2
+        return 0
+    fi
+    grep -q '^FLOPS ' <<<"$output" || return 0
+    ts=$(date -Iseconds)
+    # FLOPS <isa> <précision> <threads> <moy> <std> <min> <max> <médiane> <p5> <p95> <moy.robuste> <n>
+    awk -v h="$HOST" -v m="$label" -v ts="$ts" -v c="${CONTAM##*,}" '
+        $1=="FLOPS"{printf "%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s\n", h, $2, $3, m, $4, $13, $5, $6, $7, $8, $9, $10, $11, $12, c, ts}
+    ' <<<"$output" | spool_rows flops "$flops_header"
+    awk -v l="$label" '$1=="FLOPS"{printf "[flops-%s] %-7s %s: %s GFLOP/s\n", l, $2, $3, $5}' <<<"$output"
+}
+
+# Charges réalistes (GEMM référence et BLAS système, FFT 1D/2D, tri radix, SpMV CSR)
+work_header="node,workload,variant,mode,threads,size_bytes,unit,runs,avg,stddev,min,max,median,p5,p95,robust_mean,blas_lib,contamination,timestamp"
+
+run_work() {
+    local mode_threads=$1
+    local label=$2
+    export OMP_NUM_THREADS=$mode_threads
+    record_phase cpu "work-$label" "$WORKLOADS"
+    contam_begin
+    set +e
+    output=$("$BENCH_BIN" --kernel work --workloads "$WORKLOADS" --duration "$DUR" --repeats "$REPEATS" --warmup "$CPU_WARMUP" 2> >(tee >&2))
+    rc=$?
+    set -e
+    contam_end
+    if (( rc != 0 )); then
+        echo "[work-$label] échec (rc=$rc)" >&2
+        return 0
+    fi
+    grep -q '^WORK ' <<<"$output" || return 0
+    ts=$(date -Iseconds)
+    # WORK <charge> <variante> <threads> <octets> <unité> <moy> <std> <min> <max> <médiane> <p5> <p95> <moy.robuste> <n>
+    awk -v h="$HOST" -v m="$label" -v ts="$ts" -v c="${CONTAM##*,}" '
+        $1=="BLAS"{blas=$2}
+        $1=="WORK"{line[++n]=$2","$3","m","$4","$5","$6","$15","$7","$8","$9","$10","$11","$12","$13","$14; v[n]=$3}
+        END{for(i=1;i<=n;i++) printf "%s,%s,%s,%s,%s\n", h, line[i], (v[i]=="blas" ? blas : ""), c, ts}
+    ' <<<"$output" | spool_rows work "$work_header"
+    awk -v l="$label" '$1=="WORK"{printf "[work-%s] %-6s %-6s %s %s\n", l, $2, $3, $7, $6}' <<<"$output"
+}
+
+# Matrice NUMA: threads sur le domaine i, mémoire sur le domaine j (N x N)
+numa_header="node,cpu_node,mem_node,GBps,ns_per_load,bw_ratio_local,lat_ratio_local,placement,threads,numa_nodes,sockets,timestamp"
+
+run_numa() {
+    export OMP_NUM_THREADS=$CPUS
+    record_phase cpu numa -
+    set +e
+    output=$("$BENCH_BIN" --kernel numa --duration "$DUR" 2> >(tee >&2))
+    rc=$?
+    set -e
+    if (( rc != 0 )); then
+        echo "[numa] échec (rc=$rc)" >&2
+        return 0
     fi
+    grep -q '^NUMA ' <<<"$output" || return 0
+    # sockets physiques: plus de sockets que de domaines NUMA = interleaving
+    # mémoire activé dans le BIOS (ou NUMA désactivé au boot)
+    local sockets
+    sockets=$(cat /sys/devices/system/cpu/cpu*/topology/physical_package_id 2>/dev/null | sort -u | wc -l)
     ts=$(date -Iseconds)
-    echo "$HOST,$label,$mode_threads,$REPEATS,$DUR,$avg,$std,$min_v,$max_v,$ts" >>"$CSV"
-    echo "$label avg=$avg std=$std min=$min_v max=$max_v"
+    # NUMA <domaine CPU> <domaine mémoire> <GB/s> <ns> <placement> <threads>;
+    # ratios rapportés à la cellule locale (i, i) de chaque domaine CPU
+    awk -v h="$HOST" -v ts="$ts" -v s="$sockets" -v out="$ROWS_TMP" '
+        $1=="NUMANODES"{nn=$2}
+        $1=="NUMA"{n++; ci[n]=$2; mj[n]=$3; bw[n]=$4; ns[n]=$5; pl[n]=$6; th[n]=$7; if($2==$3){lbw[$2]=$4; lns[$2]=$5}}
+        END{
+            for(k=1;k<=n;k++){
+                rb=(lbw[ci[k]]>0) ? sprintf("%.3f", bw[k]/lbw[ci[k]]) : ""
+                rl=(lns[ci[k]]>0) ? sprintf("%.3f", ns[k]/lns[ci[k]]) : ""
+                printf "%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s\n", h, ci[k], mj[k], bw[k], ns[k], rb, rl, pl[k], th[k], nn, s, ts >>out
+                printf "[numa] cpu %s -> mem %s: %8.2f GB/s (x%s) %8.1f ns (x%s) [%s]\n", ci[k], mj[k], bw[k], rb, ns[k], rl, pl[k]
+            }
+            if(s>nn) printf "[numa] ATTENTION: %d sockets mais %d domaine(s) NUMA (interleaving mémoire ou NUMA désactivé ?)\n", s, nn
+        }' <<<"$output"
+    spool_rows numa "$numa_header" <"$ROWS_TMP"
+    : >"$ROWS_TMP"
 }
 
-# Monothread
-run_mode 1 mono
+# Courbe de scaling: tous les paliers 1,2,4,...,CPUS dans un seul processus
+scaling_header="node,kernel,threads,score,speedup,efficiency,unit,size_bytes,timestamp"
+
+run_sweep() {
+    local kernel=$1
+    local args=( --kernel "$kernel" --sweep auto --duration "$DUR" )
+    # working set des kernels mémoire: 1 GiB (hors caches, sans coût d'init excessif)
+    [[ "$kernel" != "events" ]] && args+=( --max-size 1G )
+    [[ "$kernel" == "events" && -n "$CPU_WORK" ]] && args+=( --work "$CPU_WORK" )
+    export OMP_NUM_THREADS=$CPUS
+    record_phase cpu sweep "$kernel"
+    set +e
+    # attente passive: les threads inactifs d'un palier ne doivent pas consommer
+    # de ressources (notamment sur les cœurs SMT voisins)
+    output=$(OMP_WAIT_POLICY=passive "$BENCH_BIN" "${args[@]}" 2> >(tee >&2))
+    rc=$?
+    set -e
+    if (( rc != 0 )); then
+        echo "[sweep-$kernel] échec (rc=$rc)" >&2
+        return 0
+    fi
+    ts=$(date -Iseconds)
+    awk -v h="$HOST" -v k="$kernel" -v ts="$ts" '
+        $1=="UNIT"{unit=$2} $1=="SIZE"{size=$2}
+        $1=="SWEEP"{line[++n]=$2","$3","$4","$5}
+        END{for(i=1;i<=n;i++) printf "%s,%s,%s,%s,%s,%s\n", h, k, line[i], unit, size, ts}' <<<"$output" | spool_rows scaling "$scaling_header"
+    awk -v k="$kernel" '$1=="SWEEP"{printf "[sweep-%s] %4d threads: %s (efficacité %.2f)\n", k, $2, $3, $5}' <<<"$output"
+}
+
+if (( AB == 1 )) && [[ -n "$NATIVE_BIN" && -x "$NATIVE_BIN" && -x "$GENERIC_BIN" ]]; then
+    # A/B mono puis multi: une ligne par build et par mode
+    run_ab 1 mono
+    run_ab "$CPUS" multi
+else
+    (( AB == 1 )) && echo "[bench] A/B impossible (binaire natif ou générique absent), mesure simple" >&2
+    # Monothread
+    run_mode 1 mono
 
-# Multithread (tous les CPU du nœud alloués)
-run_mode "$CPUS" multi
+    # Multithread (tous les CPU du nœud alloués)
+    run_mode "$CPUS" multi
+fi
+
+(( SOAK > 0 )) && run_soak
+
+# Bande passante mémoire mono puis multi pour chaque kernel demandé
+case "$MEM_KERNELS" in
+    none|"") MEM_LIST=() ;;
+    all) MEM_LIST=(copy scale add triad) ;;
+    *) IFS=',' read -r -a MEM_LIST <<<"$MEM_KERNELS" ;;
+esac
+for k in "${MEM_LIST[@]}"; do
+    run_mem "$k" 1 mono
+    run_mem "$k" "$CPUS" multi
+done
+
+(( LATENCY == 1 )) && run_latency
+
+(( NUMA == 1 )) && run_numa
+
+if [[ "$WORKLOADS" != "none" && -n "$WORKLOADS" ]]; then
+    run_work 1 mono
+    run_work "$CPUS" multi
+fi
+
+if (( FLOPS == 1 )); then
+    run_flops 1 mono
+    run_flops "$CPUS" multi
+fi
+
+case "$SWEEP_KERNELS" in
+    none|"") SWEEP_LIST=() ;;
+    *) IFS=',' read -r -a SWEEP_LIST <<<"$SWEEP_KERNELS" ;;
+esac
+for k in "${SWEEP_LIST[@]}"; do
+    run_sweep "$k"
+done
 
 # Affichage de synthèse pour les logs Slurm
 printf "Host=%s mono(avg)=%.3f multi(avg)=%.3f (threads=%d runs=%d)\n" "$HOST" \
-    "$(awk -F, -v h="$HOST" '$1==h && $2=="mono" {print $6; exit}' "$CSV")" \
-    "$(awk -F, -v h="$HOST" '$1==h && $2=="multi" {print $6; exit}' "$CSV")" \
+    "${LAST_AVG[mono]:-0}" "${LAST_AVG[multi]:-0}" \
     "$CPUS" "$REPEATS"
+echo "[bench] lignes du job dans $SPOOL_FILE (fusionnées dans results/ par la compaction)"
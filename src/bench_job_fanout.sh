@@ -0,0 +1,39 @@
+#!/bin/bash
+# Slurm job script d'un lot de nœuds de même forme (submit_cpu / submit_gpu
+# avec --batch-size > 1): une seule allocation multi-nœuds, puis un seul step
+# srun avec une tâche par nœud, chaque tâche exécutant le script de job
+# (bench_job_cpu.sh ou bench_job_gpu.sh) sur son nœud. Sorties par nœud
+# comme pour un job mono-nœud (outputs/bench_<nœud>_<cpu|gpu>.out|err).
+# Usage: bench_job_fanout.sh [--gres G] <cpu|gpu> <script de job> [arguments du job]
+# Prérequis: BENCH_ROOT exporté par sbatch
+
+set -uo pipefail
+
+ROOT_DIR=${BENCH_ROOT:?BENCH_ROOT non défini}
+OUT_DIR="$ROOT_DIR/outputs"
+
+GRES=""
+if [[ ${1:-} == "--gres" ]]; then
+    GRES="${2:?valeur manquante pour --gres}"; shift 2
+fi
+KIND=${1:?type de job manquant (cpu|gpu)}
+JOB=${2:?script de job manquant}
+shift 2
+
+nodes=${SLURM_JOB_NUM_NODES:?hors allocation Slurm}
+step=( srun
+    --nodes "$nodes"
+    --ntasks "$nodes"
+    --ntasks-per-node 1
+    --kill-on-bad-exit=0
+    --output "$OUT_DIR/bench_%N_$KIND.out"
+    --error "$OUT_DIR/bench_%N_$KIND.err" )
+[[ -n "${SLURM_CPUS_PER_TASK:-}" ]] && step+=( --cpus-per-task "$SLURM_CPUS_PER_TASK" )
+[[ -n "$GRES" ]] && step+=( --gres "$GRES" )
+
+echo "[fanout] job ${SLURM_JOB_ID:-?}: $KIND sur $nodes nœud(s) (${SLURM_JOB_NODELIST:-?})"
+# un nœud en échec n'interrompt pas les autres (--kill-on-bad-exit=0)
+"${step[@]}" bash "$JOB" "$@"
+rc=$?
+echo "[fanout] fin du step (rc=$rc)"
+exit "$rc"
@@ -32,7 +32,7 @@ enforce_conda_presence() {
 
 enforce_conda_presence
 
-HOST=$(hostname -s)
+HOST=${BENCH_HOST:-$(hostname -s)}  # BENCH_HOST: nom du nœud imposé (simulateur local)
 DUR=3.0
 REPEATS=5
 VERBOSE=0
@@ -107,16 +107,25 @@ PY
 
 check_deps
 
+# Verrou par nœud (job Slurm, hôte, PID) et spool des résultats du job
+source "$SRC_DIR/lib/job_common.sh"
+
 # Empêcher une exécution concurrente GPU sur le même nœud (si FS partagé)
-lockfile="$OUT_DIR/.lock.gpu.$HOST"
-if ! ( set -o noclobber; : >"$lockfile" ) 2>/dev/null; then
+lockfile="$RES_DIR/.lock.gpu.$HOST"
+if ! acquire_lock "$lockfile"; then
     echo "Un bench GPU est déjà en cours pour $HOST, on quitte." >&2
     exit 0
 fi
-trap 'rm -f "$lockfile"' EXIT
+# classe GPU (nombre x modèle) et durée du job enregistrée à la sortie
+# (walltime appris), y compris sur SIGTERM à l'échéance du walltime
+GPU_N=${SLURM_GPUS_ON_NODE:-$(awk -F, '{print NF}' <<<"${CUDA_VISIBLE_DEVICES:-}")}
+GPU_MODEL=$(nvidia-smi --query-gpu=name --format=csv,noheader 2>/dev/null | head -n1 | tr ' ' '_' || true)
+trap 'rc=$?; record_elapsed gpu "${GPU_N:-0}x${GPU_MODEL:-unknown}" "${GPU_N:-0}" "$rc"; rm -f "$lockfile"' EXIT
+trap 'exit 143' TERM
 
-# Commande bench GPU (écrit une seule ligne dans results/gpu_<node>.csv)
-CMD=("$PY" "$SRC_DIR/gpu_bench.py" --duration "$DUR" --repeats "$REPEATS" --node "$HOST" --csv-dir "$RES_DIR")
+# Commande bench GPU (une ligne par backend et mode dans le spool du job,
+# fusionnées ensuite dans results/gpu_<node>.csv, et une par répétition)
+CMD=("$PY" "$SRC_DIR/gpu_bench.py" --duration "$DUR" --repeats "$REPEATS" --node "$HOST" --csv-dir "$RES_DIR" --job-id "$JOB_ID" --job-start "$JOB_T0")
 if [[ -n "${BENCH_CONDA_ENV:-}" ]]; then
     CMD+=(--conda-env "$BENCH_CONDA_ENV")
 fi
@@ -135,9 +144,8 @@ if (( rc != 0 )); then
     exit $rc
 fi
 
-csv="$RES_DIR/gpu_${HOST}.csv"
-if [[ -f "$csv" ]]; then
-    echo "[gpu] Bench terminé. Ligne ajoutée dans: $csv"
+if [[ -f "$SPOOL_FILE" ]]; then
+    echo "[gpu] Bench terminé. Lignes ajoutées dans: $SPOOL_FILE"
 else
-    echo "[gpu] Bench terminé, mais fichier CSV introuvable: $csv" >&2
+    echo "[gpu] Bench terminé, mais fichier de spool introuvable: $SPOOL_FILE" >&2
 fi
@@ -59,4 +59,4 @@ setup_conda_env() {
     echo "        pip install cupy-cuda12x  # ou cupy-cuda11x selon votre stack"
 }
 
-setup_conda_env
+setup_conda_env || true  # étape facultative: le binaire CPU est prêt
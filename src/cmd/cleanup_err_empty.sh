@@ -20,7 +20,7 @@ echo $$ > "$PID_FILE"
 # Attendre la fin de tous les jobs bench (CPU/GPU) du user
 while true; do
     # squeue retourne 0 même s'il n'y a rien; on teste le nombre de lignes
-    cnt=$(squeue -h -u "$USER" -n "$JOBN_CPU,$JOBN_GPU" | wc -l | tr -d ' ')
+    cnt=$(squeue -h -u "${USER:-$(id -un)}" -n "$JOBN_CPU,$JOBN_GPU" | wc -l | tr -d ' ')
     if [[ "$cnt" == "0" ]]; then
         break
     fi
@@ -4,9 +4,10 @@ SCRIPT_DIR=$(cd "$(dirname "$0")" && pwd)
 source "$SCRIPT_DIR/../lib/bench_common.sh"
 
 check_deps list
+compact_results
 
 echo "=== Nœuds du cluster et nombre de runs enregistrés ==="
-mapfile -t NODES < <(sinfo -h -N -o '%N')
+mapfile -t NODES < <(node_inventory --fields node)
 for NODE in "${NODES[@]}"; do
     f="$RES_DIR/cpu_$NODE.csv"
     if [[ -f "$f" ]]; then
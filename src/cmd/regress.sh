@@ -0,0 +1,21 @@
+#!/bin/bash
+set -euo pipefail
+SCRIPT_DIR=$(cd "$(dirname "$0")" && pwd)
+source "$SCRIPT_DIR/../lib/bench_common.sh"
+
+# Dernier résultat CPU (par mode et build) et GPU (par backend et mode) de
+# chaque nœud comparé à son propre historique (médiane/MAD) et aux nœuds de
+# même classe matérielle. Code de sortie 1 si au moins un nœud s'est dégradé
+# (alerte cron), 2 sans résultats. Options:
+#   --threshold PCT  --fleet-threshold PCT  --z Z  --min-history N
+#   --history N  --days D  --max-contam PCT  --verbose
+for a in "$@"; do
+  case "$a" in
+    -h|--help)
+      echo "Usage: regress.sh [--threshold PCT] [--fleet-threshold PCT] [--z Z] [--min-history N] [--history N] [--days D] [--max-contam PCT] [--verbose]"; exit 0 ;;
+  esac
+done
+
+check_deps top
+
+exec python3 "$SCRIPT_DIR/../results_store.py" --results "$RES_DIR" regress "$@"
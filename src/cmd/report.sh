@@ -0,0 +1,18 @@
+#!/bin/bash
+set -euo pipefail
+SCRIPT_DIR=$(cd "$(dirname "$0")" && pwd)
+source "$SCRIPT_DIR/../lib/bench_common.sh"
+
+# Rapport statique report/index.html (+ une figure SVG par vue), régénéré
+# seulement si les résultats ont changé. Options:
+#   --out DIR  --max-contam PCT  --max-nodes N  --force  --verbose
+for a in "$@"; do
+  case "$a" in
+    -h|--help)
+      echo "Usage: report.sh [--out DIR] [--max-contam PCT] [--max-nodes N] [--force] [--verbose]"; exit 0 ;;
+  esac
+done
+
+check_deps top
+
+exec python3 "$SCRIPT_DIR/../report.py" --results "$RES_DIR" "$@"
@@ -6,7 +6,22 @@ source "$SCRIPT_DIR/../lib/bench_common.sh"
 JOB_NAME="bench_cpu_node"
 
 echo "=== Jobs Slurm en cours ($JOB_NAME) ==="
-squeue -u "$USER" -n "$JOB_NAME" || true
+squeue -u "${USER:-$(id -un)}" -n "$JOB_NAME" || true
+echo
+# progression des jobs CPU et GPU (répétitions reçues); les jobs encore dans
+# la file servent à repérer ceux disparus sans avoir enregistré leur durée
+progress_args=()
+if ids=$(squeue -h -u "${USER:-$(id -un)}" -n "$JOB_NAME,bench_gpu_node" -o %i 2>/dev/null); then
+    progress_args=(--jobs "$(paste -sd, <<<"$ids")")
+fi
+python3 "$SCRIPT_DIR/../progress.py" --results "$RES_DIR" "${progress_args[@]}" || true
+echo
+echo "=== Nœuds (inventaire en cache) ==="
+python3 "$SCRIPT_DIR/../inventory.py" --results "$RES_DIR" summary || true
 echo
 echo "=== Résultats présents ==="
-ls -1 "$RES_DIR"/cpu_*.csv 2>/dev/null | wc -l | xargs -I{} echo "Fichiers résultats: {}"
+# compaction préalable; ne compte que les fichiers de spool ayant encore des
+# lignes à fusionner (pas ceux fusionnés qui attendent leur suppression)
+pending=$(python3 "$SCRIPT_DIR/../results_store.py" --results "$RES_DIR" pending 2>/dev/null) || pending="?"
+echo "Fichiers de spool en attente: $pending"
+{ ls -1 "$RES_DIR"/cpu_*.csv 2>/dev/null || true; } | wc -l | xargs -I{} echo "Fichiers résultats: {}"
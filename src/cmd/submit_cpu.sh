@@ -4,6 +4,7 @@ SCRIPT_DIR=$(cd "$(dirname "$0")" && pwd)
 source "$SCRIPT_DIR/../lib/bench_common.sh"
 
 JOB_SCRIPT="$ROOT_DIR/src/bench_job_cpu.sh"
+FANOUT_SCRIPT="$ROOT_DIR/src/bench_job_fanout.sh"
 JOB_NAME="bench_cpu_node"
 
 # Paramètres par défaut (écrasés par arguments)
@@ -14,6 +15,24 @@ INCLUDE_NODES=""
 EXCLUDE_NODES=""
 LIMIT_NODES=""
 ONLY_NEW=0
+MEM_KERNELS="triad"
+LATENCY=1
+HUGEPAGES=0
+FLOPS=1
+NUMA=1
+WORKLOADS="all"
+AB=0
+COUNTERS=0
+SERIES_MS=""
+SOAK=0
+SLOW_CORE_PCT=""
+SWEEP_KERNELS="events"
+CPU_WARMUP=1
+CPU_WORK=""
+BATCH_SIZE=16
+SCHEDULE_TOP=""
+BUDGET_NH=""
+FORMULA_WALLTIME=0
 
 while [[ $# -gt 0 ]]; do
 	case "$1" in
@@ -24,6 +43,24 @@ while [[ $# -gt 0 ]]; do
 		--exclude) EXCLUDE_NODES="${2:?}"; shift 2 ;;
 		--limit) LIMIT_NODES="${2:?}"; shift 2 ;;
 		--only-new) ONLY_NEW=1; shift ;;
+		--mem-kernels) MEM_KERNELS="${2:?}"; shift 2 ;;
+		--no-latency) LATENCY=0; shift ;;
+		--hugepages) HUGEPAGES=1; shift ;;
+		--no-flops) FLOPS=0; shift ;;
+		--no-numa) NUMA=0; shift ;;
+		--workloads) WORKLOADS="${2:?}"; shift 2 ;;
+		--ab) AB=1; shift ;;
+		--counters) COUNTERS=1; shift ;;
+		--series-ms) SERIES_MS="${2:?}"; shift 2 ;;
+		--soak) SOAK="${2:?}"; shift 2 ;;
+		--slow-core-pct) SLOW_CORE_PCT="${2:?}"; shift 2 ;;
+		--sweep-kernels) SWEEP_KERNELS="${2:?}"; shift 2 ;;
+		--cpu-warmup) CPU_WARMUP="${2:?}"; shift 2 ;;
+		--cpu-work) CPU_WORK="${2:?}"; shift 2 ;;
+		--batch-size) BATCH_SIZE="${2:?}"; shift 2 ;;
+		--schedule) SCHEDULE_TOP="${2:?}"; shift 2 ;;
+		--budget) BUDGET_NH="${2:?}"; shift 2 ;;
+		--formula-walltime) FORMULA_WALLTIME=1; shift ;;
 		--) shift; break ;;
 		*) echo "[submit-cpu] option inconnue: $1" >&2; exit 1 ;;
 	esac
@@ -31,54 +68,52 @@ done
 
 check_deps submit
 
+if [[ ! "$BATCH_SIZE" =~ ^[1-9][0-9]*$ ]]; then
+	echo "--batch-size attend un entier >= 1." >&2; exit 1
+fi
+
+if [[ -n "$LIMIT_NODES" && ! "$LIMIT_NODES" =~ ^[0-9]+$ ]]; then
+	echo "--limit attend un entier." >&2; exit 1
+fi
+
+# une charge mal orthographiée ferait échouer la phase sur tous les nœuds
+if [[ "$WORKLOADS" != "all" && "$WORKLOADS" != "none" ]]; then
+	IFS=',' read -r -a wl <<<"$WORKLOADS"
+	for w in "${wl[@]}"; do
+		case "$w" in
+			gemm|fft1d|fft2d|sort|spmv) ;;
+			*) echo "--workloads: charge inconnue '$w' (gemm,fft1d,fft2d,sort,spmv | all | none)." >&2; exit 1 ;;
+		esac
+	done
+fi
+
 # build préalable
 "$SCRIPT_DIR/build.sh"
 
-echo "[submit-cpu] Construction de la liste des nœuds (tous les nœuds visibles dans sinfo)."
+echo "[submit-cpu] Construction de la liste des nœuds (inventaire en cache)."
 
-# Récupérer tous les nœuds connus du cluster.
-mapfile -t NODES < <(sinfo -h -N -o '%N')
+# Nœuds de l'inventaire (un seul scontrol pour tout le cluster, mis en cache),
+# filtrés par --include/--exclude/--limit. CPU et partitions servent ensuite à
+# regrouper les nœuds de même forme, l'état à ne grouper que les nœuds idle.
+inv_args=( --include "$INCLUDE_NODES" --exclude "$EXCLUDE_NODES" --fields node,cpus,gpus,partitions,state )
+[[ -n "$LIMIT_NODES" ]] && inv_args+=( --limit "$LIMIT_NODES" )
+NODES=()
+declare -A CPU_TOT PARTS STATE
+while read -r _n _c _g _p _s; do
+	NODES+=("$_n"); CPU_TOT["$_n"]=$_c; PARTS["$_n"]=$_p; STATE["$_n"]=$_s
+done < <(node_inventory "${inv_args[@]}")
 
 if [[ ${#NODES[@]} -eq 0 ]]; then
-	echo "[submit-cpu] Aucun nœud détecté via sinfo." >&2
+	echo "[submit-cpu] Aucun nœud retenu (inventaire vide ou filtres)." >&2
 	exit 1
 fi
 
-(( BENCH_VERBOSE == 1 )) && echo "[submit-cpu] Total nœuds détectés: ${#NODES[@]} => ${NODES[*]}"
-echo "[submit-cpu] Nœuds initiaux: ${#NODES[@]}"
-
-# include
-if [[ -n "$INCLUDE_NODES" ]]; then
-	IFS=',' read -r -a inc <<<"$INCLUDE_NODES"
-	tmp=()
-	for n in "${NODES[@]}"; do
-		for i in "${inc[@]}"; do [[ "$n" == "$i" ]] && tmp+=("$n"); done
-	done
-	NODES=("${tmp[@]}")
-fi
-
-# exclude
-if [[ -n "$EXCLUDE_NODES" ]]; then
-	IFS=',' read -r -a exc <<<"$EXCLUDE_NODES"
-	tmp=()
-	for n in "${NODES[@]}"; do
-		keep=1; for e in "${exc[@]}"; do [[ "$n" == "$e" ]] && keep=0; done
-		(( keep )) && tmp+=("$n")
-	done
-	NODES=("${tmp[@]}")
-fi
-
-# limit
-if [[ -n "$LIMIT_NODES" ]]; then
-	if [[ "$LIMIT_NODES" =~ ^[0-9]+$ ]]; then
-		NODES=("${NODES[@]:0:LIMIT_NODES}")
-	else
-		echo "--limit attend un entier." >&2; exit 1
-	fi
-fi
+(( BENCH_VERBOSE == 1 )) && echo "[submit-cpu] Nœuds retenus: ${#NODES[@]} => ${NODES[*]}"
+echo "[submit-cpu] Nœuds retenus: ${#NODES[@]}"
 
 # only new
 if (( ONLY_NEW )); then
+	compact_results
 	tmp=()
 	for n in "${NODES[@]}"; do
 			f="$RES_DIR/cpu_$n.csv"
@@ -96,39 +131,142 @@ if (( ONLY_NEW )); then
 	NODES=("${tmp[@]}")
 fi
 
-wall_s=$(estimate_walltime "$BENCH_REPEATS" "$BENCH_DURATION")
-wall=$(fmt_hms "$wall_s")
-echo "[submit-cpu] Walltime estimé: $wall (sec=$wall_s)"
+# mono + multi, mono + multi pour chaque kernel mémoire, puis courbe de latence
+# (une seule passe, compte double pour la construction des chaînes de pointeurs)
+# et débit crête FMA mono + multi (durée répartie entre les ISA)
+phases=$(( 2 + 2 * $(count_mem_kernels "$MEM_KERNELS") ))
+(( LATENCY == 1 )) && phases=$(( phases + 2 ))
+(( FLOPS == 1 )) && phases=$(( phases + 2 ))
+# matrice NUMA: une seule passe (sans répétition), comptée comme une phase
+(( NUMA == 1 )) && phases=$(( phases + 1 ))
+# charges réalistes mono + multi (durée répartie entre les charges)
+[[ "$WORKLOADS" != "none" ]] && phases=$(( phases + 2 ))
+sweep_kernels=$(count_sweep_kernels "$SWEEP_KERNELS")
+# A/B: mono + multi refaits pour les deux binaires, un processus (avec sa
+# chauffe) par répétition, à la place des 2 phases mono + multi habituelles
+ab_s=0
+if (( AB == 1 )); then
+	phases=$(( phases - 2 ))
+	ab_s=$(awk -v r="$BENCH_REPEATS" -v w="$CPU_WARMUP" -v d="$BENCH_DURATION" 'BEGIN{print int(2*2*r*(1+w)*d*1.5)}')
+fi
+# endurance: un run multi unique de --soak secondes
+soak_s=$(awk -v s="$SOAK" 'BEGIN{print int(s*1.5)}')
+
+# arguments du job, identiques pour tous les nœuds
+job_args=( --duration "$BENCH_DURATION" --repeats "$BENCH_REPEATS" --mem-kernels "$MEM_KERNELS" )
+(( LATENCY == 0 )) && job_args+=( --no-latency )
+(( HUGEPAGES == 1 )) && job_args+=( --hugepages )
+(( FLOPS == 0 )) && job_args+=( --no-flops )
+(( NUMA == 0 )) && job_args+=( --no-numa )
+job_args+=( --workloads "$WORKLOADS" )
+(( AB == 1 )) && job_args+=( --ab )
+(( COUNTERS == 1 )) && job_args+=( --counters )
+[[ -n "$SERIES_MS" ]] && job_args+=( --series-ms "$SERIES_MS" )
+(( SOAK > 0 )) && job_args+=( --soak "$SOAK" )
+[[ -n "$SLOW_CORE_PCT" ]] && job_args+=( --slow-core-pct "$SLOW_CORE_PCT" )
+job_args+=( --sweep-kernels "$SWEEP_KERNELS" --cpu-warmup "$CPU_WARMUP" )
+[[ -n "$CPU_WORK" ]] && job_args+=( --cpu-work "$CPU_WORK" )
+(( BENCH_VERBOSE == 1 )) && job_args+=( --verbose )
+
+# walltime de la formule pour un nœud à <tot> CPU: le balayage de scaling
+# dépend du nombre de CPU (un palier = une durée, sans répétition); les
+# répétitions de chauffe (écartées) coûtent autant que les mesures
+cpu_wall_s() {
+	local sweep_s
+	sweep_s=$(awk -v k="$sweep_kernels" -v p="$(count_sweep_steps "${1:-1}")" -v d="$BENCH_DURATION" 'BEGIN{print int(k*p*d*1.5)}')
+	echo $(( $(estimate_walltime "$(( BENCH_REPEATS + CPU_WARMUP ))" "$BENCH_DURATION" "$phases") + sweep_s + ab_s + soak_s ))
+}
+declare -A WALL_S
+for n in "${NODES[@]}"; do
+	t=${CPU_TOT[$n]}
+	[[ -n "${WALL_S[$t]:-}" ]] || WALL_S[$t]=$(cpu_wall_s "$t")
+done
+
+# walltime par nœud appris des durées des jobs passés de même signature de
+# paramètres (nœud, puis classe matérielle, puis nombre de CPU), sinon formule
+PARAMS_SIG=$(params_sig "${job_args[@]}")
+declare -A NODE_WALL NODE_WSRC
+if (( FORMULA_WALLTIME == 0 )) && (( ${#NODES[@]} > 0 )); then
+	while read -r n w src; do
+		NODE_WALL[$n]=$w; NODE_WSRC[$n]=$src
+	done < <(for n in "${NODES[@]}"; do echo "$n ${CPU_TOT[$n]} ${WALL_S[${CPU_TOT[$n]}]}"; done |
+		learned_walltime cpu "$PARAMS_SIG")
+fi
+for n in "${NODES[@]}"; do
+	[[ -n "${NODE_WALL[$n]:-}" ]] || { NODE_WALL[$n]=${WALL_S[${CPU_TOT[$n]}]}; NODE_WSRC[$n]=formule; }
+	(( BENCH_VERBOSE == 1 )) && echo "[submit-cpu] walltime $n: $(fmt_hms "${NODE_WALL[$n]}") (${NODE_WSRC[$n]})"
+done
+
+# ordonnanceur: nœuds classés par priorité (âge et incertitude des résultats,
+# changement d'état, idle), K premiers dans le budget de nœuds-heures par jour
+if [[ -n "$SCHEDULE_TOP$BUDGET_NH" ]]; then
+	sched_args=( pick --family cpu )
+	[[ -n "$SCHEDULE_TOP" && "$SCHEDULE_TOP" != 0 ]] && sched_args+=( --top "$SCHEDULE_TOP" )
+	[[ -n "$BUDGET_NH" ]] && sched_args+=( --budget "$BUDGET_NH" )
+	(( BENCH_VERBOSE == 1 )) && sched_args=( --verbose "${sched_args[@]}" )
+	mapfile -t NODES < <(for n in "${NODES[@]}"; do echo "$n ${NODE_WALL[$n]}"; done |
+		python3 "$ROOT_DIR/src/schedule.py" --results "$RES_DIR" "${sched_args[@]}")
+fi
+
+if [[ ${#NODES[@]} -eq 0 ]]; then
+	echo "[submit-cpu] Aucun nœud à soumettre après filtres." >&2
+	exit 0
+fi
 
-for NODE in "${NODES[@]}"; do
-	# Calculer CPU libres sur le nœud
-	line=$(scontrol show node -o "$NODE" 2>/dev/null || true)
-	tot=$(sed -n 's/.*CPUTot=\([0-9]*\).*/\1/p' <<<"$line")
-	echo "[submit-cpu] Soumission sur $NODE avec $tot CPU(s) total(s)."
+# Un sbatch par lot de nœuds idle de même forme (CPUTot, partitions) et de
+# même walltime (réservé et décompté du budget tel quel pour chaque nœud): une
+# seule allocation, un step srun fanné à une tâche par nœud. Un nœud occupé
+# (mix, alloc, ...) a son propre job pour ne pas retarder tout un lot.
+# --batch-size 1 revient à un job par nœud.
+n_jobs=0
+submitted=()
+while read -r shape list; do
+	tot=${shape%%:*}
+	IFS=',' read -r -a batch <<<"$list"
+	# walltime du lot: celui de chacun de ses nœuds (clé de regroupement),
+	# c'est-à-dire celui que l'ordonnanceur a décompté de --budget
+	wall_s=${NODE_WALL[${batch[0]}]}; learned=0
+	for n in "${batch[@]}"; do
+		[[ "${NODE_WSRC[$n]}" != formule ]] && learned=$(( learned + 1 ))
+	done
+	wall=$(fmt_hms "$wall_s")
 	sb_cmd=( sbatch
 			--job-name "$JOB_NAME"
-			--nodelist "$NODE"
-			--nodes 1
+			--nodelist "$list"
+			--nodes "${#batch[@]}"
 			--ntasks-per-node 1
 			--cpus-per-task "$tot"
 			--exclusive
 			--mem=0
 			--time "$wall"
-			--output "$OUT_DIR/bench_%N_cpu.out"
-			--error "$OUT_DIR/bench_%N_cpu.err"
-			--export "ALL,BENCH_ROOT=$ROOT_DIR"
-			"$JOB_SCRIPT" --duration "$BENCH_DURATION" --repeats "$BENCH_REPEATS" )
-	if (( BENCH_VERBOSE == 1 )); then
-		sb_cmd+=( --verbose )
+			--export "ALL,BENCH_ROOT=$ROOT_DIR,BENCH_PARAMS_SIG=$PARAMS_SIG" )
+	if (( ${#batch[@]} == 1 )); then
+		echo "[submit-cpu] Soumission sur $list avec $tot CPU(s) total(s), walltime $wall (sec=$wall_s, ${NODE_WSRC[$list]})."
+		sb_cmd+=( --output "$OUT_DIR/bench_%N_cpu.out" --error "$OUT_DIR/bench_%N_cpu.err"
+				"$JOB_SCRIPT" )
+	else
+		echo "[submit-cpu] Soumission groupée sur ${#batch[@]} nœuds à $tot CPU(s), walltime $wall (sec=$wall_s, appris pour $learned/${#batch[@]}): $list"
+		sb_cmd+=( --output "$OUT_DIR/bench_batch_%j_cpu.out" --error "$OUT_DIR/bench_batch_%j_cpu.err"
+				"$FANOUT_SCRIPT" cpu "$JOB_SCRIPT" )
 	fi
+	sb_cmd+=( "${job_args[@]}" )
 
 	if (( BENCH_VERBOSE == 1 )); then
 		printf '[submit-cpu] CMD: '
 		printf '%q ' "${sb_cmd[@]}"
 		echo
 	fi
-	"${sb_cmd[@]}"
-done
+	out=$("${sb_cmd[@]}")
+	echo "$out"
+	for n in "${batch[@]}"; do submitted+=( "$n $wall_s ${out##* }" ); done
+	n_jobs=$(( n_jobs + 1 ))
+done < <(for n in "${NODES[@]}"; do echo "$n ${CPU_TOT[$n]}:${PARTS[$n]}:${NODE_WALL[$n]} ${STATE[$n]}"; done | node_batches "$BATCH_SIZE")
 
+echo "[submit-cpu] ${#NODES[@]} nœud(s) en $n_jobs job(s)."
+# walltime réservé, décompté du budget quotidien de l'ordonnanceur
+if (( ${#submitted[@]} > 0 )); then
+	printf '%s\n' "${submitted[@]}" | python3 "$ROOT_DIR/src/schedule.py" --results "$RES_DIR" record --family cpu ||
+		echo "[submit-cpu] soumissions non enregistrées dans results/.schedule.jsonl" >&2
+fi
 echo "[submit-cpu] Soumissions terminées."
 
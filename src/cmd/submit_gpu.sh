@@ -4,6 +4,7 @@ SCRIPT_DIR=$(cd "$(dirname "$0")" && pwd)
 source "$SCRIPT_DIR/../lib/bench_common.sh"
 
 JOB_SCRIPT="$ROOT_DIR/src/bench_job_gpu.sh"
+FANOUT_SCRIPT="$ROOT_DIR/src/bench_job_fanout.sh"
 JOB_NAME="bench_gpu_node"
 
 # Valeurs par défaut (écrasées par arguments CLI)
@@ -16,6 +17,10 @@ LIMIT_NODES=""
 WARMUP_STEPS=5
 VRAM_FRAC=0.8
 GPU_WALLTIME_FACTOR=10
+BATCH_SIZE=16
+SCHEDULE_TOP=""
+BUDGET_NH=""
+FORMULA_WALLTIME=0
 BENCH_CONDA_ENV="${BENCH_CONDA_ENV:-bench}"  # on laisse la possibilité d'être pré-positionné
 
 while [[ $# -gt 0 ]]; do
@@ -28,6 +33,12 @@ while [[ $# -gt 0 ]]; do
         --limit) LIMIT_NODES="${2:?}"; shift 2 ;;
         --warmup) WARMUP_STEPS="${2:?}"; shift 2 ;;
         --vram-frac) VRAM_FRAC="${2:?}"; shift 2 ;;
+        --batch-size) BATCH_SIZE="${2:?}"; shift 2 ;;
+        --schedule) SCHEDULE_TOP="${2:?}"; shift 2 ;;
+        --budget) BUDGET_NH="${2:?}"; shift 2 ;;
+        --formula-walltime) FORMULA_WALLTIME=1; shift ;;
+        --mem-kernels|--sweep-kernels|--cpu-warmup|--cpu-work|--slow-core-pct|--workloads|--series-ms|--soak) shift 2 ;;  # options CPU (routeur submit), ignorées ici
+        --no-latency|--hugepages|--no-flops|--no-numa|--ab|--counters) shift ;;
         --) shift; break ;;
         *) echo "[submit-gpu] option inconnue: $1" >&2; exit 1 ;;
     esac
@@ -67,106 +78,131 @@ ensure_conda_env
 
 check_deps submit
 
+if [[ ! "$BATCH_SIZE" =~ ^[1-9][0-9]*$ ]]; then
+    echo "--batch-size attend un entier >= 1." >&2; exit 1
+fi
+
+if [[ -n "$LIMIT_NODES" && ! "$LIMIT_NODES" =~ ^[0-9]+$ ]]; then
+    echo "--limit attend un entier." >&2; exit 1
+fi
+
 # build préalable
 "$SCRIPT_DIR/build.sh"
 
-# Dresse la liste des nœuds avec GPU et leur quantité (une seule fois)
-nodes_with_gpu_counts() {
-    for node in $(sinfo -h -N -o "%N"); do
-        line=$(scontrol show node -o "$node" 2>/dev/null || true)
-        gres=$(sed -n 's/.*Gres=\([^ ]*\).*/\1/p' <<<"$line")
-        total=0
-        if [[ -n "$gres" && "$gres" != "(null)" ]]; then
-            total=$(tr ',' '\n' <<<"$gres" | awk -F: '
-                $1=="gpu" { n=$NF; gsub(/[^0-9].*/, "", n); s+=n }
-                END{print s+0}
-            ')
-        fi
-        if [[ "$total" -gt 0 ]]; then
-            echo "$node $total"
-        fi
-    done
-}
-
-# Construire la table "nœud -> nombre de GPU" une fois
-declare -A GPU_COUNT
+# Table "nœud -> nombre de GPU" depuis l'inventaire en cache, filtrée par
+# --include/--exclude/--limit (état: seuls les nœuds idle sont groupés)
+inv_args=( --gpu --include "$INCLUDE_NODES" --exclude "$EXCLUDE_NODES" --fields node,cpus,gpus,partitions,state )
+[[ -n "$LIMIT_NODES" ]] && inv_args+=( --limit "$LIMIT_NODES" )
+declare -A GPU_COUNT PARTS STATE
 GPU_NODES=()
-while read -r _n _c; do
-    GPU_COUNT["$_n"]="$_c"
+while read -r _n _c _g _p _s; do
+    GPU_COUNT["$_n"]="$_g"; PARTS["$_n"]="$_p"; STATE["$_n"]="$_s"
     GPU_NODES+=("$_n")
-done < <(nodes_with_gpu_counts)
+done < <(node_inventory "${inv_args[@]}")
 
 if (( BENCH_VERBOSE == 1 )); then
-    echo "[submit-gpu] Nœuds avec GPU détectés: ${GPU_NODES[*]:-none}"
+    echo "[submit-gpu] Nœuds avec GPU retenus: ${GPU_NODES[*]:-none}"
     for n in "${GPU_NODES[@]}"; do echo "  - $n: ${GPU_COUNT[$n]}"; done
 fi
 
 if [[ ${#GPU_NODES[@]} -eq 0 ]]; then
-    echo "Aucun nœud avec GPU détecté." >&2
-    exit 1
-fi
-
-# include
-if [[ -n "$INCLUDE_NODES" ]]; then
-    IFS=',' read -r -a inc <<<"$INCLUDE_NODES"
-    tmp=()
-    for n in "${GPU_NODES[@]}"; do for i in "${inc[@]}"; do [[ "$n" == "$i" ]] && tmp+=("$n"); done; done
-    GPU_NODES=("${tmp[@]}")
+    if [[ -z "$INCLUDE_NODES$EXCLUDE_NODES$LIMIT_NODES" ]]; then
+        echo "Aucun nœud avec GPU détecté." >&2
+        exit 1
+    fi
+    echo "[submit-gpu] Aucun nœud GPU à soumettre après filtres." >&2
+    exit 0
 fi
 
-# exclude
-if [[ -n "$EXCLUDE_NODES" ]]; then
-    IFS=',' read -r -a exc <<<"$EXCLUDE_NODES"
-    tmp=()
-    for n in "${GPU_NODES[@]}"; do keep=1; for e in "${exc[@]}"; do [[ "$n" == "$e" ]] && keep=0; done; (( keep )) && tmp+=("$n"); done
-    GPU_NODES=("${tmp[@]}")
+job_args=( --duration "$BENCH_DURATION" --repeats "$BENCH_REPEATS" --warmup "$WARMUP_STEPS" --vram-frac "$VRAM_FRAC" )
+(( BENCH_VERBOSE == 1 )) && job_args+=( --verbose )
+
+# walltime de la formule (repli), puis walltime par nœud appris des durées des
+# jobs passés de même signature (nœud, classe GPU, nombre de GPU)
+formula_s=$(( $(estimate_walltime "$BENCH_REPEATS" "$BENCH_DURATION") * GPU_WALLTIME_FACTOR ))
+echo "[submit-gpu] Walltime de la formule: $(fmt_hms "$formula_s") (sec=$formula_s)"
+PARAMS_SIG=$(params_sig "${job_args[@]}")
+declare -A NODE_WALL NODE_WSRC
+if (( FORMULA_WALLTIME == 0 )); then
+    while read -r n w src; do
+        NODE_WALL[$n]=$w; NODE_WSRC[$n]=$src
+    done < <(for n in "${GPU_NODES[@]}"; do echo "$n ${GPU_COUNT[$n]} $formula_s"; done |
+        learned_walltime gpu "$PARAMS_SIG")
 fi
+for n in "${GPU_NODES[@]}"; do
+    [[ -n "${NODE_WALL[$n]:-}" ]] || { NODE_WALL[$n]=$formula_s; NODE_WSRC[$n]=formule; }
+    (( BENCH_VERBOSE == 1 )) && echo "[submit-gpu] walltime $n: $(fmt_hms "${NODE_WALL[$n]}") (${NODE_WSRC[$n]})"
+done
 
-# limit
-if [[ -n "$LIMIT_NODES" ]]; then
-    if [[ "$LIMIT_NODES" =~ ^[0-9]+$ ]]; then
-        GPU_NODES=("${GPU_NODES[@]:0:LIMIT_NODES}")
-    else
-        echo "--limit attend un entier." >&2; exit 1
+# ordonnanceur: nœuds classés par priorité, K premiers dans le budget de
+# nœuds-heures par jour (voir src/schedule.py)
+if [[ -n "$SCHEDULE_TOP$BUDGET_NH" ]]; then
+    sched_args=( pick --family gpu )
+    [[ -n "$SCHEDULE_TOP" && "$SCHEDULE_TOP" != 0 ]] && sched_args+=( --top "$SCHEDULE_TOP" )
+    [[ -n "$BUDGET_NH" ]] && sched_args+=( --budget "$BUDGET_NH" )
+    (( BENCH_VERBOSE == 1 )) && sched_args=( --verbose "${sched_args[@]}" )
+    mapfile -t GPU_NODES < <(for n in "${GPU_NODES[@]}"; do echo "$n ${NODE_WALL[$n]}"; done |
+        python3 "$ROOT_DIR/src/schedule.py" --results "$RES_DIR" "${sched_args[@]}")
+    if [[ ${#GPU_NODES[@]} -eq 0 ]]; then
+        echo "[submit-gpu] Aucun nœud GPU retenu par l'ordonnanceur." >&2
+        exit 0
     fi
 fi
 
-if [[ ${#GPU_NODES[@]} -eq 0 ]]; then
-    echo "[submit-gpu] Aucun nœud GPU à soumettre après filtres." >&2
-    exit 0
-fi
-
-wall_s=$(( $(estimate_walltime "$BENCH_REPEATS" "$BENCH_DURATION") * GPU_WALLTIME_FACTOR ))
-wall=$(fmt_hms "$wall_s")
-echo "[submit-gpu] Walltime estimé: $wall (sec=$wall_s)"
-
-for NODE in "${GPU_NODES[@]}"; do
-    # Vérifier au dernier moment si le nœud a des GPU occupés
-    TOTAL_GPU=${GPU_COUNT[$NODE]:-0}
-    echo "[submit-gpu] Soumission sur $NODE (GPU=$TOTAL_GPU)"
+# Un sbatch par lot de nœuds idle de même forme (nombre de GPU, partitions)
+# et de même walltime (celui décompté du budget pour chaque nœud),
+# fanné à une tâche par nœud; un nœud occupé a son propre job.
+# --batch-size 1 revient à un job par nœud.
+n_jobs=0
+submitted=()
+while read -r shape list; do
+    TOTAL_GPU=${shape%%:*}
+    IFS=',' read -r -a batch <<<"$list"
+    # walltime du lot: celui de chacun de ses nœuds (clé de regroupement),
+    # c'est-à-dire celui que l'ordonnanceur a décompté de --budget
+    wall_s=${NODE_WALL[${batch[0]}]}; learned=0
+    for n in "${batch[@]}"; do
+        [[ "${NODE_WSRC[$n]}" != formule ]] && learned=$(( learned + 1 ))
+    done
+    wall=$(fmt_hms "$wall_s")
     sb_cmd=( sbatch
         --job-name "$JOB_NAME"
-        --nodelist "$NODE"
-        --nodes 1
+        --nodelist "$list"
+        --nodes "${#batch[@]}"
         --ntasks-per-node 1
         --cpus-per-task 4
         --gres=gpu:"$TOTAL_GPU"
         --mem=10G
         --time "$wall"
-        --output "$OUT_DIR/bench_%N_gpu.out"
-        --error "$OUT_DIR/bench_%N_gpu.err"
-        --export "ALL,BENCH_ROOT=$ROOT_DIR,BENCH_CONDA_ENV=$BENCH_CONDA_ENV" 
-        "$JOB_SCRIPT" --duration "$BENCH_DURATION" --repeats "$BENCH_REPEATS" --warmup "$WARMUP_STEPS" --vram-frac "$VRAM_FRAC" )
-    (( BENCH_VERBOSE == 1 )) && sb_cmd+=( --verbose )
+        --export "ALL,BENCH_ROOT=$ROOT_DIR,BENCH_CONDA_ENV=$BENCH_CONDA_ENV,BENCH_PARAMS_SIG=$PARAMS_SIG" )
+    if (( ${#batch[@]} == 1 )); then
+        echo "[submit-gpu] Soumission sur $list (GPU=$TOTAL_GPU), walltime $wall (${NODE_WSRC[$list]})"
+        sb_cmd+=( --output "$OUT_DIR/bench_%N_gpu.out" --error "$OUT_DIR/bench_%N_gpu.err"
+            "$JOB_SCRIPT" )
+    else
+        echo "[submit-gpu] Soumission groupée sur ${#batch[@]} nœuds (GPU=$TOTAL_GPU), walltime $wall (appris pour $learned/${#batch[@]}): $list"
+        sb_cmd+=( --output "$OUT_DIR/bench_batch_%j_gpu.out" --error "$OUT_DIR/bench_batch_%j_gpu.err"
+            "$FANOUT_SCRIPT" --gres "gpu:$TOTAL_GPU" gpu "$JOB_SCRIPT" )
+    fi
+    sb_cmd+=( "${job_args[@]}" )
 
     if (( BENCH_VERBOSE == 1 )); then
         printf '[submit-gpu] CMD: '
         printf '%q ' "${sb_cmd[@]}"
         echo
     fi
-    "${sb_cmd[@]}"
-done
-
+    out=$("${sb_cmd[@]}")
+    echo "$out"
+    for n in "${batch[@]}"; do submitted+=( "$n $wall_s ${out##* }" ); done
+    n_jobs=$(( n_jobs + 1 ))
+done < <(for n in "${GPU_NODES[@]}"; do echo "$n ${GPU_COUNT[$n]}:${PARTS[$n]}:${NODE_WALL[$n]} ${STATE[$n]}"; done | node_batches "$BATCH_SIZE")
+
+echo "[submit-gpu] ${#GPU_NODES[@]} nœud(s) en $n_jobs job(s)."
+# walltime réservé, décompté du budget quotidien de l'ordonnanceur
+if (( ${#submitted[@]} > 0 )); then
+    printf '%s\n' "${submitted[@]}" | python3 "$ROOT_DIR/src/schedule.py" --results "$RES_DIR" record --family gpu ||
+        echo "[submit-gpu] soumissions non enregistrées dans results/.schedule.jsonl" >&2
+fi
 echo "[submit-gpu] Soumissions terminées."
 
 echo "[submit-gpu] Retour a l'environnement initial."
@@ -5,52 +5,2111 @@
 #include <math.h>
 #include <string.h>
 #include <time.h>
-#include <string.h>
+#include <unistd.h>
+#include <sched.h>
+#include <sys/mman.h>
+#include <sys/syscall.h>
+#include <dlfcn.h>
+#include <pthread.h>
+#include <errno.h>
+#include <sys/ioctl.h>
+#include <linux/perf_event.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+#if defined(__x86_64__) || defined(__i386__)
+#include <immintrin.h>
+#define HAVE_X86_SIMD 1
+#endif
+
+static double now_sec(void) {
+#ifdef _OPENMP
+    return omp_get_wtime();
+#else
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec*1e-9;
+#endif
+}
+
+static int thread_id(void) {
+#ifdef _OPENMP
+    return omp_get_thread_num();
+#else
+    return 0;
+#endif
+}
+
+static int thread_count(void) {
+#ifdef _OPENMP
+    return omp_get_num_threads();
+#else
+    return 1;
+#endif
+}
+
+// Taille d'équipe d'une prochaine région parallèle (OMP_NUM_THREADS)
+static int thread_count_max(void) {
+#ifdef _OPENMP
+    return omp_get_max_threads();
+#else
+    return 1;
+#endif
+}
+
+// Découpe [0,n) en `parts` blocs contigus, un par thread de rang < parts
+// (les threads de rang supérieur reçoivent un bloc vide)
+static void thread_chunk(size_t n, int parts, size_t *lo, size_t *hi) {
+    size_t np = (size_t)parts;
+    size_t id = (size_t)thread_id();
+    if (id >= np) { *lo = *hi = 0; return; }
+    size_t base = n / np, rem = n % np;
+    *lo = id * base + (id < rem ? id : rem);
+    *hi = *lo + base + (id < rem ? 1 : 0);
+}
+
+// Taille lisible: 4096, 32K, 8M, 2G (puissances de 1024)
+static size_t parse_size(const char *s) {
+    char *end = NULL;
+    double v = strtod(s, &end);
+    if (end == s || v <= 0) return 0;
+    switch (*end) {
+        case 'k': case 'K': v *= 1024.0; break;
+        case 'm': case 'M': v *= 1024.0 * 1024.0; break;
+        case 'g': case 'G': v *= 1024.0 * 1024.0 * 1024.0; break;
+        case '\0': break;
+        default: return 0;
+    }
+    return (size_t)v;
+}
+
+static size_t phys_mem_bytes(void) {
+    long pages = sysconf(_SC_PHYS_PAGES);
+    long psz = sysconf(_SC_PAGESIZE);
+    if (pages <= 0 || psz <= 0) return 0;
+    return (size_t)pages * (size_t)psz;
+}
+
+static uint64_t bench_kernel(uint64_t iters) {
+    // Kernel simple: accumulation de calculs flottants pour occuper le CPU
+    // et éviter l'optimisation excessive. Aucun appel d'horloge ici: le
+    // chronométrage est fait par l'appelant, autour de lots d'itérations.
+    volatile double acc = 0.0;
+    for (uint64_t it = 0; it < iters; ++it) {
+        // 256 opérations flottantes approximatives
+        for (int i = 1; i <= 256; ++i) {
+            acc += sin((double)i) * cos((double)i) + sqrt((double)i);
+        }
+    }
+    (void)acc; // évite d'être optimisé
+    return iters * 256ULL; // événements approximatifs
+}
+
+// Taille de lot (en itérations de bench_kernel) telle qu'un lot dure au moins
+// ~1 ms: l'horloge n'est alors consultée qu'une fois par milliseconde.
+static uint64_t calibrate_batch(void) {
+    uint64_t batch = 1;
+    for (;;) {
+        double t0 = now_sec();
+        bench_kernel(batch);
+        if (now_sec() - t0 >= 1e-3 || batch >= (1ULL << 30)) return batch;
+        batch *= 2;
+    }
+}
+
+/* ---------------------------------------------------------------------------
+ * Compteurs matériels (perf_event_open, optionnels: --counters)
+ *
+ * Chaque thread ouvre ses propres compteurs (pid = 0, cpu = -1, espace
+ * utilisateur seulement, accepté jusqu'à perf_event_paranoid = 2), les active
+ * entre les barrières de mesure et les ajoute aux totaux partagés. Les
+ * compteurs indisponibles (PMU absente en VM, stalled-cycles inconnus sur la
+ * plupart des Intel) sont simplement omis; valeurs extrapolées si le noyau
+ * multiplexe (time_enabled / time_running).
+ * ------------------------------------------------------------------------- */
+
+enum { CTR_CYCLES, CTR_INSTR, CTR_CACHE_REF, CTR_CACHE_MISS, CTR_BRANCH_MISS,
+       CTR_STALL_FE, CTR_STALL_BE, CTR_TASK_CLOCK, N_CTR };
+
+static const struct { uint32_t type; uint64_t config; } ctr_defs[N_CTR] = {
+    { PERF_TYPE_HARDWARE, PERF_COUNT_HW_CPU_CYCLES },
+    { PERF_TYPE_HARDWARE, PERF_COUNT_HW_INSTRUCTIONS },
+    { PERF_TYPE_HARDWARE, PERF_COUNT_HW_CACHE_REFERENCES },
+    { PERF_TYPE_HARDWARE, PERF_COUNT_HW_CACHE_MISSES },
+    { PERF_TYPE_HARDWARE, PERF_COUNT_HW_BRANCH_MISSES },
+    { PERF_TYPE_HARDWARE, PERF_COUNT_HW_STALLED_CYCLES_FRONTEND },
+    { PERF_TYPE_HARDWARE, PERF_COUNT_HW_STALLED_CYCLES_BACKEND },
+    { PERF_TYPE_SOFTWARE, PERF_COUNT_SW_TASK_CLOCK },
+};
+
+typedef struct {
+    double total[N_CTR];   // somme sur les threads et les répétitions
+    int ok[N_CTR];         // compteur ouvert avec succès par tous les threads
+    int first_errno;       // cause du premier échec sur les cycles (mode dégradé)
+    int used;
+} counters_t;
+
+static void counters_init(counters_t *c) {
+    memset(c, 0, sizeof(*c));
+    for (int k = 0; k < N_CTR; ++k) c->ok[k] = 1;
+}
+
+static void counters_open(int fds[N_CTR]) {
+    for (int k = 0; k < N_CTR; ++k) {
+        struct perf_event_attr attr;
+        memset(&attr, 0, sizeof(attr));
+        attr.size = sizeof(attr);
+        attr.type = ctr_defs[k].type;
+        attr.config = ctr_defs[k].config;
+        attr.disabled = 1;
+        attr.exclude_kernel = 1;
+        attr.exclude_hv = 1;
+        attr.read_format = PERF_FORMAT_TOTAL_TIME_ENABLED | PERF_FORMAT_TOTAL_TIME_RUNNING;
+        fds[k] = (int)syscall(SYS_perf_event_open, &attr, 0, -1, -1, 0);
+    }
+}
+
+static void counters_ctl(const int fds[N_CTR], unsigned long req) {
+    for (int k = 0; k < N_CTR; ++k) {
+        if (fds[k] >= 0) ioctl(fds[k], req, 0);
+    }
+}
+
+// Lit, ferme et cumule les compteurs d'un thread
+static void counters_collect(counters_t *c, int fds[N_CTR], int open_errno) {
+    for (int k = 0; k < N_CTR; ++k) {
+        uint64_t v[3];
+        if (fds[k] < 0 || read(fds[k], v, sizeof(v)) != (ssize_t)sizeof(v) || v[2] == 0) {
+            __atomic_store_n(&c->ok[k], 0, __ATOMIC_RELAXED);
+            if (k == CTR_CYCLES) {
+                int zero = 0;
+                __atomic_compare_exchange_n(&c->first_errno, &zero, open_errno ? open_errno : ENOENT, 0,
+                                            __ATOMIC_RELAXED, __ATOMIC_RELAXED);
+            }
+        } else {
+            double scaled = (double)v[0] * ((double)v[1] / (double)v[2]);
+#ifdef _OPENMP
+            #pragma omp atomic
+#endif
+            c->total[k] += scaled;
+        }
+        if (fds[k] >= 0) close(fds[k]);
+        fds[k] = -1;
+    }
+    __atomic_store_n(&c->used, 1, __ATOMIC_RELAXED);
+}
+
+// COUNTERS on|off <raison>, puis IPC, MPKI, fréquence effective et stalls disponibles
+static void counters_print(const counters_t *c) {
+    if (!c->used) return;
+    if (!c->ok[CTR_CYCLES] || !c->ok[CTR_INSTR]) {
+        int e = c->first_errno ? c->first_errno : ENOENT;
+        printf("COUNTERS off %s\n", e == EACCES || e == EPERM ? "perf_event_paranoid"
+                                  : e == ENOENT || e == EOPNOTSUPP ? "pmu-indisponible" : "erreur");
+        return;
+    }
+    const double *t = c->total;
+    double kinstr = t[CTR_INSTR] / 1000.0;
+    printf("COUNTERS on\n");
+    printf("IPC %.3f\n", t[CTR_CYCLES] > 0 ? t[CTR_INSTR] / t[CTR_CYCLES] : 0.0);
+    if (c->ok[CTR_CACHE_MISS] && kinstr > 0) printf("CACHE_MPKI %.4f\n", t[CTR_CACHE_MISS] / kinstr);
+    if (c->ok[CTR_BRANCH_MISS] && kinstr > 0) printf("BRANCH_MPKI %.4f\n", t[CTR_BRANCH_MISS] / kinstr);
+    if (c->ok[CTR_CACHE_REF] && c->ok[CTR_CACHE_MISS] && t[CTR_CACHE_REF] > 0)
+        printf("CACHE_MISS_PCT %.2f\n", 100.0 * t[CTR_CACHE_MISS] / t[CTR_CACHE_REF]);
+    // cycles / temps CPU des threads = fréquence effective moyenne
+    if (c->ok[CTR_TASK_CLOCK] && t[CTR_TASK_CLOCK] > 0)
+        printf("EFF_MHZ %.1f\n", t[CTR_CYCLES] / t[CTR_TASK_CLOCK] * 1e3);
+    if (c->ok[CTR_STALL_FE] && t[CTR_CYCLES] > 0) printf("STALL_FE_PCT %.2f\n", 100.0 * t[CTR_STALL_FE] / t[CTR_CYCLES]);
+    if (c->ok[CTR_STALL_BE] && t[CTR_CYCLES] > 0) printf("STALL_BE_PCT %.2f\n", 100.0 * t[CTR_STALL_BE] / t[CTR_CYCLES]);
+}
+
+/* ---------------------------------------------------------------------------
+ * Télémétrie fréquence / énergie (cpufreq + RAPL)
+ *
+ * Un thread échantillonneur (hors équipe OpenMP, endormi entre deux relevés)
+ * lit toutes les TELEMETRY_PERIOD_MS la fréquence courante des CPU où
+ * tournent les threads de mesure et les compteurs d'énergie des domaines
+ * « package » RAPL (bouclage du compteur géré à chaque relevé). Les fichiers
+ * absents (VM, RAPL réservé à root) laissent simplement les valeurs vides.
+ * ------------------------------------------------------------------------- */
+
+#define TELEMETRY_PERIOD_MS 100
+#define MAX_RAPL 64
+
+typedef struct {
+    const int *cpus;       // CPU des threads de mesure (-1 = pas encore connu)
+    int ncpu;
+    int nrapl;
+    char rapl[MAX_RAPL][96];
+    uint64_t rapl_last[MAX_RAPL], rapl_range[MAX_RAPL];
+    double rapl_limit_w;   // somme des limites long terme des packages (0 = inconnue)
+    double joules;
+    double freq_sum;
+    long freq_n;
+    double t0, t1;
+    volatile int stop;
+    pthread_t th;
+    int running;
+} telemetry_t;
+
+static int read_u64_file(const char *path, uint64_t *v) {
+    FILE *f = fopen(path, "r");
+    if (!f) return 0;
+    unsigned long long x;
+    int ok = fscanf(f, "%llu", &x) == 1;
+    fclose(f);
+    if (ok) *v = (uint64_t)x;
+    return ok;
+}
+
+// Domaines package RAPL lisibles (intel-rapl:N, également exposés sur AMD)
+static void telemetry_find_rapl(telemetry_t *t) {
+    char path[128], name[32];
+    for (int i = 0; i < MAX_RAPL && t->nrapl < MAX_RAPL; ++i) {
+        snprintf(path, sizeof(path), "/sys/class/powercap/intel-rapl:%d/name", i);
+        FILE *f = fopen(path, "r");
+        if (!f) continue;
+        int ok = fscanf(f, "%31s", name) == 1;
+        fclose(f);
+        if (!ok || strncmp(name, "package", 7) != 0) continue;
+        char *dst = t->rapl[t->nrapl];
+        snprintf(dst, sizeof(t->rapl[0]), "/sys/class/powercap/intel-rapl:%d/energy_uj", i);
+        uint64_t e, range = 0, limit;
+        if (!read_u64_file(dst, &e)) continue;
+        snprintf(path, sizeof(path), "/sys/class/powercap/intel-rapl:%d/max_energy_range_uj", i);
+        read_u64_file(path, &range);
+        snprintf(path, sizeof(path), "/sys/class/powercap/intel-rapl:%d/constraint_0_power_limit_uw", i);
+        if (read_u64_file(path, &limit)) t->rapl_limit_w += (double)limit * 1e-6;
+        t->rapl_last[t->nrapl] = e;
+        t->rapl_range[t->nrapl] = range;
+        t->nrapl++;
+    }
+}
+
+static void telemetry_sample(telemetry_t *t) {
+    char path[96];
+    for (int i = 0; i < t->ncpu; ++i) {
+        int cpu = __atomic_load_n(&t->cpus[i], __ATOMIC_RELAXED);
+        uint64_t khz;
+        if (cpu < 0) continue;
+        snprintf(path, sizeof(path), "/sys/devices/system/cpu/cpu%d/cpufreq/scaling_cur_freq", cpu);
+        if (read_u64_file(path, &khz)) {
+            t->freq_sum += (double)khz * 1e-3;
+            t->freq_n++;
+        }
+    }
+    for (int i = 0; i < t->nrapl; ++i) {
+        uint64_t e;
+        if (!read_u64_file(t->rapl[i], &e)) continue;
+        uint64_t d = e >= t->rapl_last[i] ? e - t->rapl_last[i] : e + t->rapl_range[i] - t->rapl_last[i];
+        t->joules += (double)d * 1e-6;
+        t->rapl_last[i] = e;
+    }
+}
+
+static void *telemetry_main(void *arg) {
+    telemetry_t *t = arg;
+    struct timespec ts = { 0, TELEMETRY_PERIOD_MS * 1000000L };
+    while (!t->stop) {
+        nanosleep(&ts, NULL);
+        telemetry_sample(t);
+    }
+    return NULL;
+}
+
+static void telemetry_start(telemetry_t *t, const int *cpus, int ncpu) {
+    memset(t, 0, sizeof(*t));
+    t->cpus = cpus;
+    t->ncpu = ncpu;
+    telemetry_find_rapl(t);
+    t->t0 = now_sec();
+    t->running = pthread_create(&t->th, NULL, telemetry_main, t) == 0;
+}
+
+static void telemetry_stop(telemetry_t *t) {
+    t->stop = 1;
+    if (t->running) pthread_join(t->th, NULL);
+    telemetry_sample(t);  // dernier intervalle, jusqu'à la fin des mesures
+    t->t1 = now_sec();
+}
+
+// Gouverneur cpufreq des CPU mesurés ("mixed" s'ils diffèrent, "-" sans cpufreq)
+static void telemetry_governor(const int *cpus, int ncpu, char *out, size_t cap) {
+    char path[96], gov[32];
+    snprintf(out, cap, "-");
+    for (int i = 0; i < ncpu; ++i) {
+        if (cpus[i] < 0) continue;
+        snprintf(path, sizeof(path), "/sys/devices/system/cpu/cpu%d/cpufreq/scaling_governor", cpus[i]);
+        FILE *f = fopen(path, "r");
+        if (!f) continue;
+        int ok = fscanf(f, "%31s", gov) == 1;
+        fclose(f);
+        if (!ok) continue;
+        if (strcmp(out, "-") == 0) snprintf(out, cap, "%s", gov);
+        else if (strcmp(out, gov) != 0) snprintf(out, cap, "mixed");
+    }
+}
+
+// GOVERNOR, FREQ_MHZ, PKG_W, EVENTS_PER_J, PKG_LIMIT_W (lignes absentes si sysfs manque)
+static void telemetry_print(const telemetry_t *t, const int *cpus, int ncpu, double score) {
+    char gov[32];
+    telemetry_governor(cpus, ncpu, gov, sizeof(gov));
+    printf("GOVERNOR %s\n", gov);
+    if (t->freq_n > 0) printf("FREQ_MHZ %.1f\n", t->freq_sum / (double)t->freq_n);
+    double dt = t->t1 - t->t0;
+    if (t->nrapl > 0 && dt > 0.0 && t->joules > 0.0) {
+        double watts = t->joules / dt;
+        printf("PKG_W %.2f\n", watts);
+        printf("EVENTS_PER_J %.3f\n", score / watts);
+    }
+    if (t->rapl_limit_w > 0.0) printf("PKG_LIMIT_W %.1f\n", t->rapl_limit_w);
+}
+
+/* ---------------------------------------------------------------------------
+ * Série temporelle intra-run (--series MS)
+ *
+ * Chaque thread publie son compteur d'événements cumulé après chaque lot
+ * (une ligne de cache par thread); le thread chronomètre en relève un
+ * instantané toutes les MS millisecondes. Les débits par intervalle en sont
+ * déduits à l'impression, hors de la boucle mesurée.
+ *
+ * Avec --progress S, le même thread imprime aussi pendant le run, toutes les
+ * S secondes, une ligne PROGRESS (débit depuis la précédente) vidée aussitôt:
+ * un long run (soak) tué avant sa fin laisse ainsi ses intervalles terminés.
+ * ------------------------------------------------------------------------- */
+
+#define SERIES_PAD 8   // uint64_t par thread = 64 octets, pas de faux partage
+
+typedef struct {
+    double interval;   // secondes entre deux relevés
+    int nthr;
+    size_t n, cap;
+    double *t;         // fin de l'intervalle, depuis le départ de la mesure
+    uint64_t *ev;      // n x nthr compteurs cumulés
+    uint64_t *live;    // nthr x SERIES_PAD, écrit par les threads de mesure
+    double progress;   // secondes entre deux lignes PROGRESS (0: aucune)
+    int progress_k;    // lignes PROGRESS déjà imprimées pendant ce run
+    double progress_t; // fin de l'intervalle précédent
+    uint64_t progress_ev;
+} series_t;
+
+static int series_init(series_t *s, double interval_s, int nthr) {
+    memset(s, 0, sizeof(*s));
+    s->interval = interval_s;
+    s->nthr = nthr;
+    return posix_memalign((void **)&s->live, 64, (size_t)nthr * SERIES_PAD * sizeof(uint64_t)) == 0;
+}
+
+// Début d'un run: relevés et progression remis à zéro
+static void series_reset(series_t *s) {
+    s->n = 0;
+    s->progress_k = 0;
+    s->progress_t = 0.0;
+    s->progress_ev = 0;
+}
+
+static void series_free(series_t *s) {
+    free(s->t);
+    free(s->ev);
+    free(s->live);
+}
+
+// Appelé par le thread chronomètre seulement
+static void series_record(series_t *s, double t) {
+    if (s->n == s->cap) {
+        size_t cap = s->cap ? 2 * s->cap : 256;
+        double *nt = realloc(s->t, cap * sizeof(double));
+        if (nt) s->t = nt;
+        uint64_t *ne = nt ? realloc(s->ev, cap * (size_t)s->nthr * sizeof(uint64_t)) : NULL;
+        if (!ne) return;
+        s->ev = ne;
+        s->cap = cap;
+    }
+    for (int i = 0; i < s->nthr; ++i)
+        s->ev[s->n * (size_t)s->nthr + (size_t)i] = __atomic_load_n(&s->live[i * SERIES_PAD], __ATOMIC_RELAXED);
+    s->t[s->n++] = t;
+}
+
+// Appelé par le thread chronomètre après chaque relevé:
+// PROGRESS <intervalle> <events/s> <durée_s> toutes les s->progress secondes
+static void series_progress(series_t *s, double t) {
+    // grille fixe (k x S): pas de dérive d'un intervalle au suivant
+    if (s->progress <= 0.0 || t < (s->progress_k + 1) * s->progress) return;
+    uint64_t ev = 0;
+    for (int i = 0; i < s->nthr; ++i) ev += __atomic_load_n(&s->live[i * SERIES_PAD], __ATOMIC_RELAXED);
+    double dt = t - s->progress_t;
+    printf("PROGRESS %d %.3f %.6f\n", ++s->progress_k, (double)(ev - s->progress_ev) / dt, dt);
+    fflush(stdout);
+    s->progress_t = t;
+    s->progress_ev = ev;
+}
+
+static double series_rate(const series_t *s, size_t k) {
+    double dt = s->t[k] - (k ? s->t[k - 1] : 0.0);
+    uint64_t d = 0;
+    for (int i = 0; i < s->nthr; ++i) {
+        size_t j = k * (size_t)s->nthr + (size_t)i;
+        d += s->ev[j] - (k ? s->ev[j - (size_t)s->nthr] : 0);
+    }
+    return dt > 0.0 ? (double)d / dt : 0.0;
+}
+
+typedef struct {
+    double drop_pct;    // (premier - dernier) / premier, fenêtres de 10 % des intervalles
+    double cv_pct;      // écart-type / moyenne des débits par intervalle
+    double throttle_s;  // début de la chute durable sous 95 % de la première fenêtre (-1: aucune)
+} stability_t;
+
+static int series_stability(const series_t *s, stability_t *out) {
+    size_t n = s->n;
+    if (n < 2) return 0;
+    double *r = malloc(n * sizeof(double));
+    if (!r) return 0;
+    double sum = 0.0, sq = 0.0;
+    for (size_t k = 0; k < n; ++k) {
+        r[k] = series_rate(s, k);
+        sum += r[k];
+    }
+    double mean = sum / (double)n;
+    for (size_t k = 0; k < n; ++k) sq += (r[k] - mean) * (r[k] - mean);
+    size_t w = n / 10 ? n / 10 : 1;
+    double first = 0.0, last = 0.0;
+    for (size_t k = 0; k < w; ++k) {
+        first += r[k] / (double)w;
+        last += r[n - w + k] / (double)w;
+    }
+    out->drop_pct = first > 0.0 ? 100.0 * (first - last) / first : 0.0;
+    out->cv_pct = mean > 0.0 ? 100.0 * sqrt(sq / (double)n) / mean : 0.0;
+    // débit lissé (moyenne centrée sur w intervalles): la chute durable commence
+    // après le dernier intervalle dont le débit lissé atteint encore le seuil
+    out->throttle_s = -1.0;
+    size_t h = w / 2, last_ok = 0;
+    for (size_t k = 0; k < n; ++k) {
+        size_t lo = k > h ? k - h : 0, hi = k + h < n ? k + h : n - 1;
+        double win = 0.0;
+        for (size_t j = lo; j <= hi; ++j) win += r[j];
+        if (win / (double)(hi - lo + 1) >= 0.95 * first) last_ok = k;
+    }
+    if (last_ok + 1 < n) out->throttle_s = s->t[last_ok];
+    free(r);
+    return 1;
+}
+
+// SERIES <run> <t_s> <events/s total> <events/s thread 0> ..., puis STABILITY
+static void series_print(const series_t *s, int run, stability_t *st, int *have) {
+    for (size_t k = 0; k < s->n; ++k) {
+        double dt = s->t[k] - (k ? s->t[k - 1] : 0.0);
+        printf("SERIES %d %.3f %.3f", run, s->t[k], series_rate(s, k));
+        for (int i = 0; i < s->nthr; ++i) {
+            size_t j = k * (size_t)s->nthr + (size_t)i;
+            uint64_t d = s->ev[j] - (k ? s->ev[j - (size_t)s->nthr] : 0);
+            printf(" %.0f", dt > 0.0 ? (double)d / dt : 0.0);
+        }
+        printf("\n");
+    }
+    stability_t cur;
+    if (!series_stability(s, &cur)) return;
+    if (cur.throttle_s >= 0.0) printf("STABILITY %d %.2f %.2f %.3f\n", run, cur.drop_pct, cur.cv_pct, cur.throttle_s);
+    else printf("STABILITY %d %.2f %.2f -\n", run, cur.drop_pct, cur.cv_pct);
+    // résumé: pire chute, pire CV, throttling le plus précoce
+    if (!*have || cur.drop_pct > st->drop_pct) st->drop_pct = cur.drop_pct;
+    if (!*have || cur.cv_pct > st->cv_pct) st->cv_pct = cur.cv_pct;
+    if (cur.throttle_s >= 0.0 && (!*have || st->throttle_s < 0.0 || cur.throttle_s < st->throttle_s))
+        st->throttle_s = cur.throttle_s;
+    else if (!*have) st->throttle_s = cur.throttle_s;
+    *have = 1;
+}
+
+/* État partagé d'une mesure bench_kernel exécutée par une équipe OpenMP dont
+ * seuls les `active` premiers threads travaillent.
+ *
+ * - travail fixe (work > 0): chaque thread exécute exactement `work`
+ *   itérations, chronométrées une seule fois entre deux barrières;
+ * - durée (work == 0): le thread 0 sert de chronomètre et ne lit l'horloge
+ *   qu'entre deux lots calibrés; il lève un drapeau d'arrêt que les autres
+ *   threads consultent entre leurs lots, puis tous se retrouvent à la barrière.
+ *
+ * Dans les deux cas le score est le total d'événements divisé par le temps
+ * écoulé entre la barrière de départ et celle d'arrivée.
+ *
+ * Si thread_ev est fourni, chaque thread y cumule ses propres événements (et
+ * note dans thread_cpu le CPU logique sur lequel il tourne) pour la carte
+ * des débits par cœur; si ctr est fourni, les compteurs matériels de chaque
+ * thread actif couvrent la même fenêtre; si series est fourni (mode durée),
+ * le thread 0 relève les compteurs publiés à chaque intervalle. */
+typedef struct {
+    double duration_s;
+    uint64_t work;
+    int active;
+    int stop;
+    uint64_t total;
+    double t0, elapsed;
+    double *thread_ev;
+    int *thread_cpu;
+    counters_t *ctr;
+    series_t *series;
+} events_ctx_t;
+
+static void events_ctx_init(events_ctx_t *ctx, double duration_s, uint64_t work, int active) {
+    memset(ctx, 0, sizeof(*ctx));
+    ctx->duration_s = duration_s;
+    ctx->work = work;
+    ctx->active = active;
+}
+
+static double events_ctx_score(const events_ctx_t *ctx) {
+    return ctx->elapsed > 0.0 ? (double)ctx->total / ctx->elapsed : 0.0;
+}
+
+// Corps de mesure appelé par chaque thread de l'équipe (constructions orphelines)
+static void events_run_team(events_ctx_t *ctx) {
+    int me = thread_id();
+    int on = me < ctx->active;
+    uint64_t batch = (on && ctx->work == 0) ? calibrate_batch() : 0;
+    uint64_t ev = 0;
+    int fds[N_CTR], open_errno = 0;
+    for (int k = 0; k < N_CTR; ++k) fds[k] = -1;
+    if (on && ctx->thread_cpu) ctx->thread_cpu[me] = sched_getcpu();
+    uint64_t *live = (on && ctx->series && ctx->work == 0) ? &ctx->series->live[me * SERIES_PAD] : NULL;
+    if (live) __atomic_store_n(live, 0, __ATOMIC_RELAXED);
+    if (on && ctx->ctr) {
+        errno = 0;
+        counters_open(fds);
+        open_errno = errno;
+    }
+#ifdef _OPENMP
+    #pragma omp single
+#endif
+    {
+        ctx->stop = 0;
+        ctx->total = 0;
+    }
+#ifdef _OPENMP
+    #pragma omp single
+#endif
+    ctx->t0 = now_sec();
+    if (on && ctx->ctr) {
+        counters_ctl(fds, PERF_EVENT_IOC_RESET);
+        counters_ctl(fds, PERF_EVENT_IOC_ENABLE);
+    }
+    if (on) {
+        if (ctx->work > 0) {
+            ev = bench_kernel(ctx->work);
+        } else if (me == 0) {
+            double t, next = live ? ctx->series->interval : 0.0;
+            do {
+                ev += bench_kernel(batch);
+                t = now_sec() - ctx->t0;
+                if (live) {
+                    __atomic_store_n(live, ev, __ATOMIC_RELAXED);
+                    if (t >= next) {
+                        series_record(ctx->series, t);
+                        series_progress(ctx->series, t);
+                        next += ctx->series->interval;
+                    }
+                }
+            } while (t < ctx->duration_s);
+            __atomic_store_n(&ctx->stop, 1, __ATOMIC_RELEASE);
+        } else {
+            while (!__atomic_load_n(&ctx->stop, __ATOMIC_ACQUIRE)) {
+                ev += bench_kernel(batch);
+                if (live) __atomic_store_n(live, ev, __ATOMIC_RELAXED);
+            }
+        }
+    }
+    if (on && ctx->ctr) {
+        counters_ctl(fds, PERF_EVENT_IOC_DISABLE);
+        counters_collect(ctx->ctr, fds, open_errno);
+    }
+    __atomic_fetch_add(&ctx->total, ev, __ATOMIC_RELAXED);
+    if (on && ctx->thread_ev) {
+        ctx->thread_ev[me] += (double)ev;
+    }
+#ifdef _OPENMP
+    #pragma omp barrier
+    #pragma omp single
+#endif
+    ctx->elapsed = now_sec() - ctx->t0;
+}
+
+// Une mesure bench_kernel avec tous les threads OpenMP (OMP_NUM_THREADS);
+// thread_ev/thread_cpu optionnels (NULL), dimensionnés au nombre de threads
+static double events_point(double duration_s, uint64_t work, double *elapsed,
+                           double *thread_ev, int *thread_cpu, counters_t *ctr,
+                           series_t *series) {
+    events_ctx_t ctx;
+    events_ctx_init(&ctx, duration_s, work, 1);
+    ctx.thread_ev = thread_ev;
+    ctx.thread_cpu = thread_cpu;
+    ctx.ctr = ctr;
+    ctx.series = series;
+#ifdef _OPENMP
+    #pragma omp parallel
+#endif
+    {
+#ifdef _OPENMP
+        #pragma omp single
+#endif
+        ctx.active = thread_count();
+        events_run_team(&ctx);
+    }
+    if (elapsed) *elapsed = ctx.elapsed;
+    return events_ctx_score(&ctx);
+}
+
+/* ---------------------------------------------------------------------------
+ * Type de cœur (hybride Intel P/E): listes de CPU exposées par les PMU
+ * cpu_core et cpu_atom; "-" sur un processeur homogène
+ * ------------------------------------------------------------------------- */
+
+// Lit une liste sysfs du type "0-7,16,18-23" et la développe dans `out`
+// (au plus `cap` entrées). Retourne le nombre d'entrées, -1 si fichier absent.
+static int read_list_file(const char *path, int *out, int cap) {
+    FILE *f = fopen(path, "r");
+    if (!f) return -1;
+    char buf[4096];
+    int n = 0;
+    if (fgets(buf, sizeof(buf), f)) {
+        char *save = NULL;
+        for (char *tok = strtok_r(buf, ",\n", &save); tok; tok = strtok_r(NULL, ",\n", &save)) {
+            int lo, hi;
+            int k = sscanf(tok, "%d-%d", &lo, &hi);
+            if (k < 1) continue;
+            if (k == 1) hi = lo;
+            for (int v = lo; v <= hi && n < cap; ++v) out[n++] = v;
+        }
+    }
+    fclose(f);
+    return n;
+}
+
+#define MAX_CPUS 4096
+
+// Vrai si `cpu` figure dans la liste sysfs `path`
+static int cpu_in_list_file(const char *path, int cpu) {
+    static int list[MAX_CPUS];
+    int n = read_list_file(path, list, MAX_CPUS);
+    for (int i = 0; i < n; ++i) {
+        if (list[i] == cpu) return 1;
+    }
+    return 0;
+}
+
+static const char *core_type(int cpu) {
+    if (cpu < 0) return "-";
+    if (cpu_in_list_file("/sys/devices/cpu_core/cpus", cpu)) return "P";
+    if (cpu_in_list_file("/sys/devices/cpu_atom/cpus", cpu)) return "E";
+    return "-";
+}
+
+/* ---------------------------------------------------------------------------
+ * Topologie NUMA (/sys/devices/system/node) et placement mémoire
+ *
+ * Sans dépendre de libnuma: mbind(MPOL_BIND) par appel système brut, puis
+ * premier accès depuis un CPU du domaine cible (seule méthode si mbind est
+ * refusé, p. ex. par seccomp). Le domaine effectif d'une page est relu via
+ * get_mempolicy(MPOL_F_NODE | MPOL_F_ADDR).
+ * ------------------------------------------------------------------------- */
+
+#define MAX_NUMA_NODES 64
+#define BENCH_MPOL_BIND 2
+#define BENCH_MPOL_F_NODE 1
+#define BENCH_MPOL_F_ADDR 2
+
+typedef struct {
+    int id;
+    int ncpu;          // CPU du domaine autorisés pour ce processus (cpuset Slurm)
+    int *cpus;
+    int has_mem;
+} numa_node_t;
+
+// Domaines en ligne; retourne leur nombre (0 si la topologie est absente)
+static int numa_topology(numa_node_t *nodes, int cap) {
+    int ids[MAX_NUMA_NODES];
+    int nids = read_list_file("/sys/devices/system/node/online", ids, MAX_NUMA_NODES);
+    cpu_set_t allowed;
+    CPU_ZERO(&allowed);
+    if (sched_getaffinity(0, sizeof(allowed), &allowed) != 0) return 0;
+    int n = 0;
+    for (int k = 0; k < nids && n < cap; ++k) {
+        char path[128];
+        int list[MAX_CPUS];
+        numa_node_t *nd = &nodes[n];
+        memset(nd, 0, sizeof(*nd));
+        nd->id = ids[k];
+        snprintf(path, sizeof(path), "/sys/devices/system/node/node%d/cpulist", ids[k]);
+        int nc = read_list_file(path, list, MAX_CPUS);
+        nd->cpus = malloc((size_t)(nc > 0 ? nc : 1) * sizeof(int));
+        if (!nd->cpus) break;
+        for (int i = 0; i < nc; ++i) {
+            if (list[i] < CPU_SETSIZE && CPU_ISSET(list[i], &allowed)) nd->cpus[nd->ncpu++] = list[i];
+        }
+        snprintf(path, sizeof(path), "/sys/devices/system/node/node%d/meminfo", ids[k]);
+        FILE *f = fopen(path, "r");
+        if (f) {
+            char line[256];
+            unsigned long long kb = 0;
+            while (fgets(line, sizeof(line), f)) {
+                char *p = strstr(line, "MemTotal:");
+                if (p) { kb = strtoull(p + 9, NULL, 10); break; }
+            }
+            fclose(f);
+            nd->has_mem = kb > 0;
+        }
+        n++;
+    }
+    return n;
+}
+
+static void pin_to_cpus(const int *cpus, int n) {
+    cpu_set_t set;
+    CPU_ZERO(&set);
+    for (int i = 0; i < n; ++i) {
+        if (cpus[i] < CPU_SETSIZE) CPU_SET(cpus[i], &set);
+    }
+    if (n > 0) sched_setaffinity(0, sizeof(set), &set);
+}
+
+enum { PLACE_DEFAULT, PLACE_MBIND, PLACE_FIRSTTOUCH, PLACE_MISPLACED, PLACE_UNVERIFIED };
+static const char *const placement_names[] = { "default", "mbind", "firsttouch", "misplaced", "unverified" };
+
+// Place [p, p+len) (aligné page, pas encore touché) sur le domaine `node`:
+// mbind si possible, premier accès depuis un CPU du domaine dans tous les cas,
+// puis vérification du domaine réel d'une page du milieu de la zone.
+static int numa_place(void *p, size_t len, const numa_node_t *node) {
+    unsigned long mask[MAX_NUMA_NODES / (8 * sizeof(unsigned long)) + 1];
+    memset(mask, 0, sizeof(mask));
+    mask[node->id / (8 * sizeof(unsigned long))] |= 1UL << (node->id % (8 * sizeof(unsigned long)));
+    int mode = PLACE_FIRSTTOUCH;
+#ifdef SYS_mbind
+    if (syscall(SYS_mbind, p, len, BENCH_MPOL_BIND, mask, (unsigned long)(8 * sizeof(mask)), 0) == 0) mode = PLACE_MBIND;
+#endif
+    if (mode == PLACE_FIRSTTOUCH && node->ncpu == 0) mode = PLACE_UNVERIFIED;
+    cpu_set_t saved;
+    int have_saved = sched_getaffinity(0, sizeof(saved), &saved) == 0;
+    pin_to_cpus(node->cpus, node->ncpu);
+    memset(p, 0, len);
+    if (have_saved) sched_setaffinity(0, sizeof(saved), &saved);
+#ifdef SYS_get_mempolicy
+    int actual = -1;
+    char *mid = (char *)p + (len / 2 & ~(size_t)4095);
+    if (syscall(SYS_get_mempolicy, &actual, NULL, 0UL, mid, BENCH_MPOL_F_NODE | BENCH_MPOL_F_ADDR) == 0) {
+        if (actual != node->id) mode = PLACE_MISPLACED;
+    } else if (mode == PLACE_FIRSTTOUCH) {
+        mode = PLACE_UNVERIFIED;
+    }
+#endif
+    return mode;
+}
+
+/* ---------------------------------------------------------------------------
+ * Kernels mémoire type STREAM (copy/scale/add/triad)
+ *
+ * La taille de working set désigne le volume total des tableaux touchés par
+ * le kernel (2 tableaux pour copy/scale, 3 pour add/triad), de sorte qu'une
+ * passe complète déplace exactement `size` octets (comptage STREAM, sans
+ * write-allocate). Chaque thread travaille sur son propre bloc contigu, touché
+ * en premier par lui-même (first-touch NUMA).
+ * ------------------------------------------------------------------------- */
+
+enum { K_EVENTS, K_COPY, K_SCALE, K_ADD, K_TRIAD, K_LATENCY, K_FLOPS, K_NUMA, K_WORK };
+static const char *const kernel_names[] = { "events", "copy", "scale", "add", "triad", "latency", "flops", "numa", "work" };
+#define N_KERNELS ((int)(sizeof(kernel_names) / sizeof(kernel_names[0])))
+
+static int kernel_from_name(const char *s) {
+    for (int k = 0; k < N_KERNELS; ++k) {
+        if (strcmp(s, kernel_names[k]) == 0) return k;
+    }
+    return -1;
+}
+
+static int mem_arrays(int kernel) {
+    return (kernel == K_COPY || kernel == K_SCALE) ? 2 : 3;
+}
+
+static void stream_pass(int kernel, double *restrict a, double *restrict b,
+                        double *restrict c, size_t lo, size_t hi) {
+    const double q = 3.0;
+    switch (kernel) {
+        case K_COPY:  for (size_t i = lo; i < hi; ++i) c[i] = a[i]; break;
+        case K_SCALE: for (size_t i = lo; i < hi; ++i) b[i] = q * c[i]; break;
+        case K_ADD:   for (size_t i = lo; i < hi; ++i) c[i] = a[i] + b[i]; break;
+        default:      for (size_t i = lo; i < hi; ++i) a[i] = b[i] + q * c[i]; break;
+    }
+    // Empêche le compilateur de fusionner/supprimer des passes idempotentes
+    __asm__ __volatile__("" ::: "memory");
+}
+
+// État partagé d'une mesure de bande passante, exécutée par toute une équipe
+// OpenMP dont seuls les `active` premiers threads travaillent
+typedef struct {
+    int kernel;
+    size_t size;
+    size_t n;
+    int active;
+    double budget_s;
+    double *a, *b, *c;
+    size_t map_len;    // longueur mmap de chaque tableau (multiple de page)
+    long passes;
+    int final;
+    double t0, elapsed;
+} mem_ctx_t;
+
+static void mem_ctx_free(mem_ctx_t *ctx) {
+    if (ctx->a) munmap(ctx->a, ctx->map_len);
+    if (ctx->b) munmap(ctx->b, ctx->map_len);
+    if (ctx->c) munmap(ctx->c, ctx->map_len);
+    ctx->a = ctx->b = ctx->c = NULL;
+}
+
+static int mem_ctx_init(mem_ctx_t *ctx, int kernel, size_t size, double budget_s, int active) {
+    memset(ctx, 0, sizeof(*ctx));
+    ctx->kernel = kernel;
+    ctx->size = size;
+    ctx->n = size / ((size_t)mem_arrays(kernel) * sizeof(double));
+    ctx->active = active;
+    ctx->budget_s = budget_s;
+    ctx->passes = 1;
+    if (ctx->n == 0) return 0;
+    // mmap (aligné page, non touché) pour pouvoir placer les tableaux par mbind
+    long page = sysconf(_SC_PAGESIZE);
+    size_t pg = page > 0 ? (size_t)page : 4096;
+    ctx->map_len = (ctx->n * sizeof(double) + pg - 1) / pg * pg;
+    double **arr[3] = { &ctx->a, &ctx->b, &ctx->c };
+    for (int k = 0; k < 3; ++k) {
+        void *p = mmap(NULL, ctx->map_len, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+        if (p == MAP_FAILED) { mem_ctx_free(ctx); return -1; }
+        *arr[k] = p;
+    }
+    return 0;
+}
+
+static double mem_ctx_gbps(const mem_ctx_t *ctx) {
+    return ctx->elapsed > 0.0 ? (double)ctx->size * (double)ctx->passes / ctx->elapsed / 1e9 : 0.0;
+}
+
+// Corps de mesure appelé par chaque thread de l'équipe (constructions orphelines).
+// Le nombre de passes est doublé jusqu'à occuper ~1/4 du budget, puis une passe
+// finale calibrée sur `budget_s` est chronométrée entre deux barrières.
+static void mem_run_team(mem_ctx_t *ctx) {
+    size_t lo, hi;
+    if (ctx->n == 0) return;
+    thread_chunk(ctx->n, ctx->active, &lo, &hi);
+    for (size_t i = lo; i < hi; ++i) { ctx->a[i] = 1.0; ctx->b[i] = 2.0; ctx->c[i] = 0.5; }
+    for (;;) {
+#ifdef _OPENMP
+        #pragma omp barrier
+        #pragma omp single
+#endif
+        ctx->t0 = now_sec();
+        for (long p = 0; p < ctx->passes; ++p) stream_pass(ctx->kernel, ctx->a, ctx->b, ctx->c, lo, hi);
+#ifdef _OPENMP
+        #pragma omp barrier
+        #pragma omp single
+#endif
+        {
+            ctx->elapsed = now_sec() - ctx->t0;
+            if (!ctx->final && ctx->elapsed >= ctx->budget_s / 4.0) {
+                double scale = ctx->elapsed > 0.0 ? ctx->budget_s / ctx->elapsed : 4.0;
+                ctx->passes = (long)((double)ctx->passes * scale);
+                if (ctx->passes < 1) ctx->passes = 1;
+                ctx->final = 1;
+            } else if (!ctx->final) {
+                ctx->passes *= 2;
+            } else {
+                ctx->final = 2;
+            }
+        }
+        if (ctx->final == 2) break;
+    }
+}
+
+// Mesure la bande passante (GB/s) d'un kernel sur un working set de `size` octets
+// avec tous les threads OpenMP (OMP_NUM_THREADS)
+static double mem_point(int kernel, size_t size, double budget_s) {
+    mem_ctx_t ctx;
+    if (mem_ctx_init(&ctx, kernel, size, budget_s, 1) != 0) return -1.0;
+#ifdef _OPENMP
+    #pragma omp parallel
+#endif
+    {
+#ifdef _OPENMP
+        #pragma omp single
+#endif
+        ctx.active = thread_count();
+        mem_run_team(&ctx);
+    }
+    mem_ctx_free(&ctx);
+    return mem_ctx_gbps(&ctx);
+}
+
+// Tailles par défaut: de 16 KiB (L1) à max_size, par pas de x4 (max_size inclus)
+static int default_sizes(size_t max_size, size_t *out, int cap) {
+    int n = 0;
+    for (size_t s = 16 * 1024; s < max_size && n < cap - 1; s *= 4) out[n++] = s;
+    out[n++] = max_size;
+    return n;
+}
+
+/* ---------------------------------------------------------------------------
+ * Latence mémoire par pointer chasing
+ *
+ * Le buffer est découpé en lignes de cache de 64 octets reliées en un unique
+ * cycle aléatoire: chaque chargement dépend du précédent, le prefetcher ne peut
+ * rien anticiper et le temps moyen par chargement donne la latence du niveau
+ * de la hiérarchie (L1/L2/L3/DRAM) qui contient le working set.
+ * ------------------------------------------------------------------------- */
+
+#define LAT_LINE 64
+#define HUGE_2M (2UL * 1024 * 1024)
+
+enum { HP_NONE, HP_HUGETLB, HP_THP };
+static const char *const hugepage_names[] = { "none", "hugetlb", "thp" };
+
+static uint64_t xorshift64(uint64_t *s) {
+    uint64_t x = *s;
+    x ^= x << 13; x ^= x >> 7; x ^= x << 17;
+    return *s = x;
+}
+
+// mmap anonyme, avec pages de 2 MiB si demandé: hugetlbfs réservé d'abord,
+// puis Transparent Huge Pages (madvise) en repli. *mode reçoit ce qui a été obtenu.
+static void *lat_alloc(size_t *size, int huge, int *mode) {
+    void *p = MAP_FAILED;
+    *mode = HP_NONE;
+#ifdef MAP_HUGETLB
+    if (huge) {
+        size_t sz = (*size + HUGE_2M - 1) & ~(HUGE_2M - 1);
+        p = mmap(NULL, sz, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS | MAP_HUGETLB, -1, 0);
+        if (p != MAP_FAILED) { *size = sz; *mode = HP_HUGETLB; return p; }
+    }
+#endif
+    p = mmap(NULL, *size, PROT_READ | PROT_WRITE, MAP_PRIVATE | MAP_ANONYMOUS, -1, 0);
+    if (p == MAP_FAILED) return NULL;
+#ifdef MADV_HUGEPAGE
+    if (huge && madvise(p, *size, MADV_HUGEPAGE) == 0) *mode = HP_THP;
+#endif
+    return p;
+}
+
+// Relie les lignes du buffer en un cycle unique de permutation aléatoire
+static int lat_build_chain(char *buf, size_t lines) {
+    uint32_t *order = malloc(lines * sizeof(uint32_t));
+    if (!order) return -1;
+    for (size_t i = 0; i < lines; ++i) order[i] = (uint32_t)i;
+    uint64_t seed = 0x9e3779b97f4a7c15ULL ^ (uint64_t)lines;
+    for (size_t i = lines - 1; i > 0; --i) {
+        size_t j = (size_t)(xorshift64(&seed) % (i + 1));
+        uint32_t t = order[i]; order[i] = order[j]; order[j] = t;
+    }
+    for (size_t i = 0; i < lines; ++i) {
+        char *from = buf + (size_t)order[i] * LAT_LINE;
+        char *to = buf + (size_t)order[(i + 1) % lines] * LAT_LINE;
+        *(void **)from = to;
+    }
+    free(order);
+    return 0;
+}
+
+static void *volatile lat_sink;
+
+static void *lat_chase(void *start, uint64_t loads) {
+    void **p = (void **)start;
+    for (uint64_t i = 0; i < loads; i += 16) {
+        p = (void **)*p; p = (void **)*p; p = (void **)*p; p = (void **)*p;
+        p = (void **)*p; p = (void **)*p; p = (void **)*p; p = (void **)*p;
+        p = (void **)*p; p = (void **)*p; p = (void **)*p; p = (void **)*p;
+        p = (void **)*p; p = (void **)*p; p = (void **)*p; p = (void **)*p;
+    }
+    return p;
+}
+
+// Latence moyenne (ns/chargement) sur un working set de `size` octets, placé
+// sur le domaine NUMA `mem_node` si non NULL (*placement reçoit la méthode)
+static double lat_point(size_t size, double budget_s, int huge, int *hp_mode,
+                        const numa_node_t *mem_node, int *placement) {
+    size_t lines = size / LAT_LINE;
+    if (lines < 2) return 0.0;
+    size_t map_size = lines * LAT_LINE;
+    char *buf = lat_alloc(&map_size, huge, hp_mode);
+    if (!buf) return -1.0;
+    if (mem_node) {
+        int pl = numa_place(buf, map_size, mem_node);
+        if (placement) *placement = pl;
+    }
+    if (lat_build_chain(buf, lines) != 0) {
+        munmap(buf, map_size);
+        return -1.0;
+    }
+    // Doublement du nombre de chargements jusqu'à ~1/4 du budget, puis mesure finale
+    uint64_t loads = 1 << 14;
+    void *p = buf;
+    double elapsed = 0.0;
+    for (int final = 0; final < 2; ) {
+        double t0 = now_sec();
+        p = lat_chase(p, loads);
+        elapsed = now_sec() - t0;
+        if (final) break;
+        if (elapsed >= budget_s / 4.0) {
+            double scale = elapsed > 0.0 ? budget_s / elapsed : 4.0;
+            loads = (uint64_t)((double)loads * scale);
+            if (loads < 16) loads = 16;
+            final = 1;
+        } else {
+            loads *= 2;
+        }
+    }
+    lat_sink = p;
+    munmap(buf, map_size);
+    return elapsed * 1e9 / (double)loads;
+}
+
+// Tailles latence par défaut: de 4 KiB à max_size par pas de x2
+static int default_lat_sizes(size_t max_size, size_t *out, int cap) {
+    int n = 0;
+    for (size_t s = 4 * 1024; s < max_size && n < cap - 1; s *= 2) out[n++] = s;
+    out[n++] = max_size;
+    return n;
+}
+
+/* ---------------------------------------------------------------------------
+ * Matrice NUMA: threads épinglés sur le domaine i, mémoire placée sur le
+ * domaine j. Bande passante triad (tous les CPU autorisés du domaine i) et
+ * latence pointer-chasing (un thread du domaine i) pour chaque couple (i, j).
+ * ------------------------------------------------------------------------- */
+
+static double numa_bw_point(const numa_node_t *cpu_node, const numa_node_t *mem_node,
+                            size_t size, double budget_s, int *placement) {
+    mem_ctx_t ctx;
+    if (mem_ctx_init(&ctx, K_TRIAD, size, budget_s, cpu_node->ncpu) != 0) return -1.0;
+    if (ctx.n > 0) {
+        int pa = numa_place(ctx.a, ctx.map_len, mem_node);
+        int pb = numa_place(ctx.b, ctx.map_len, mem_node);
+        int pc = numa_place(ctx.c, ctx.map_len, mem_node);
+        // la pire des trois (misplaced > firsttouch/unverified > mbind)
+        *placement = pa;
+        if (pb == PLACE_MISPLACED || pc == PLACE_MISPLACED) *placement = PLACE_MISPLACED;
+        else if (pb != PLACE_MBIND) *placement = pb;
+        else if (pc != PLACE_MBIND) *placement = pc;
+    }
+    // chaque thread (maître compris) retrouve son affinité d'origine à la sortie
+#ifdef _OPENMP
+    #pragma omp parallel num_threads(cpu_node->ncpu)
+#endif
+    {
+        cpu_set_t saved;
+        int have_saved = sched_getaffinity(0, sizeof(saved), &saved) == 0;
+        int me = thread_id();
+        pin_to_cpus(&cpu_node->cpus[me % cpu_node->ncpu], 1);
+        // threads réellement accordés (OMP_THREAD_LIMIT, OMP_DYNAMIC): aucun bloc orphelin
+#ifdef _OPENMP
+        #pragma omp single
+#endif
+        ctx.active = thread_count();
+        mem_run_team(&ctx);
+        if (have_saved) sched_setaffinity(0, sizeof(saved), &saved);
+    }
+    mem_ctx_free(&ctx);
+    return mem_ctx_gbps(&ctx);
+}
+
+static double numa_lat_point(const numa_node_t *cpu_node, const numa_node_t *mem_node,
+                             size_t size, double budget_s, int hugepages) {
+    cpu_set_t saved;
+    int have_saved = sched_getaffinity(0, sizeof(saved), &saved) == 0;
+    int hp, placement;
+    pin_to_cpus(cpu_node->cpus, 1);
+    double ns = lat_point(size, budget_s, hugepages, &hp, mem_node, &placement);
+    if (have_saved) sched_setaffinity(0, sizeof(saved), &saved);
+    return ns;
+}
+
+/* ---------------------------------------------------------------------------
+ * Débit crête flottant (FMA) par niveau d'ISA, dispatch à l'exécution
+ *
+ * Chaque variante est compilée pour son jeu d'instructions via l'attribut
+ * `target` (le reste du binaire reste en -march=x86-64) et n'est exécutée que
+ * si le CPU la supporte (__builtin_cpu_supports). Les FLOPS_CHAINS
+ * accumulateurs indépendants masquent la latence des FMA pour saturer les
+ * unités vectorielles: x = x * m + a, qui converge vers 1 (ni overflow ni
+ * dénormaux).
+ * ------------------------------------------------------------------------- */
+
+#define FLOPS_CHAINS 12
+// m != 1 aussi en fp32, sinon x * m se simplifie et la boucle est repliée
+#define FLOPS_M 0.9999
+#define FLOPS_A 0.0001
+
+static volatile double flops_sink;
+
+#define FLOPS_BODY(VEC, SET1, OP, ADD)                                        \
+    VEC m = SET1(FLOPS_M), a = SET1(FLOPS_A);                                 \
+    VEC x0 = SET1(1.0), x1 = SET1(1.01), x2 = SET1(1.02), x3 = SET1(1.03);    \
+    VEC x4 = SET1(1.04), x5 = SET1(1.05), x6 = SET1(1.06), x7 = SET1(1.07);   \
+    VEC x8 = SET1(1.08), x9 = SET1(1.09), x10 = SET1(1.1), x11 = SET1(1.11);  \
+    for (uint64_t i = 0; i < iters; ++i) {                                    \
+        x0 = OP(x0, m, a); x1 = OP(x1, m, a); x2 = OP(x2, m, a);              \
+        x3 = OP(x3, m, a); x4 = OP(x4, m, a); x5 = OP(x5, m, a);              \
+        x6 = OP(x6, m, a); x7 = OP(x7, m, a); x8 = OP(x8, m, a);              \
+        x9 = OP(x9, m, a); x10 = OP(x10, m, a); x11 = OP(x11, m, a);          \
+    }                                                                         \
+    x0 = ADD(ADD(ADD(x0, x1), ADD(x2, x3)), ADD(ADD(x4, x5), ADD(x6, x7)));   \
+    x0 = ADD(x0, ADD(ADD(x8, x9), ADD(x10, x11)));
+
+#ifndef HAVE_X86_SIMD
+static double flops_generic_f64(uint64_t iters) {
+#define G_SET1(v) ((double)(v))
+#define G_OP(x, m, a) ((x) * (m) + (a))
+#define G_ADD(x, y) ((x) + (y))
+    FLOPS_BODY(double, G_SET1, G_OP, G_ADD)
+    return x0;
+}
+
+static double flops_generic_f32(uint64_t iters) {
+#define G_SET1F(v) ((float)(v))
+    FLOPS_BODY(float, G_SET1F, G_OP, G_ADD)
+    return x0;
+}
+#endif
+
+#ifdef HAVE_X86_SIMD
+// SSE2 (socle x86-64): pas de FMA, mul + add = 2 FLOP par voie
+#define SSE_OP_PD(x, m, a) _mm_add_pd(_mm_mul_pd((x), (m)), (a))
+#define SSE_OP_PS(x, m, a) _mm_add_ps(_mm_mul_ps((x), (m)), (a))
+#define SSE_SET1_PS(v) _mm_set1_ps((float)(v))
+
+__attribute__((target("sse2")))
+static double flops_sse2_f64(uint64_t iters) {
+    FLOPS_BODY(__m128d, _mm_set1_pd, SSE_OP_PD, _mm_add_pd)
+    return _mm_cvtsd_f64(x0);
+}
+
+__attribute__((target("sse2")))
+static double flops_sse2_f32(uint64_t iters) {
+    FLOPS_BODY(__m128, SSE_SET1_PS, SSE_OP_PS, _mm_add_ps)
+    return (double)_mm_cvtss_f32(x0);
+}
+
+#define AVX_SET1_PS(v) _mm256_set1_ps((float)(v))
+
+__attribute__((target("avx2,fma")))
+static double flops_avx2_f64(uint64_t iters) {
+    FLOPS_BODY(__m256d, _mm256_set1_pd, _mm256_fmadd_pd, _mm256_add_pd)
+    return _mm256_cvtsd_f64(x0);
+}
+
+__attribute__((target("avx2,fma")))
+static double flops_avx2_f32(uint64_t iters) {
+    FLOPS_BODY(__m256, AVX_SET1_PS, _mm256_fmadd_ps, _mm256_add_ps)
+    return (double)_mm256_cvtss_f32(x0);
+}
+
+#define AVX512_SET1_PS(v) _mm512_set1_ps((float)(v))
+
+__attribute__((target("avx512f")))
+static double flops_avx512_f64(uint64_t iters) {
+    FLOPS_BODY(__m512d, _mm512_set1_pd, _mm512_fmadd_pd, _mm512_add_pd)
+    return _mm512_cvtsd_f64(x0);
+}
+
+__attribute__((target("avx512f")))
+static double flops_avx512_f32(uint64_t iters) {
+    FLOPS_BODY(__m512, AVX512_SET1_PS, _mm512_fmadd_ps, _mm512_add_ps)
+    return (double)_mm512_cvtss_f32(x0);
+}
+
+static int cpu_has_sse2(void) { return __builtin_cpu_supports("sse2"); }
+static int cpu_has_avx2(void) { return __builtin_cpu_supports("avx2") && __builtin_cpu_supports("fma"); }
+static int cpu_has_avx512(void) { return __builtin_cpu_supports("avx512f"); }
+#endif
+
+typedef struct {
+    const char *isa;
+    const char *precision;
+    int lanes;                // voies par vecteur
+    double (*fn)(uint64_t);
+    int (*supported)(void);   // NULL = toujours disponible
+} flops_impl_t;
+
+// Table de dispatch: FLOP par itération = FLOPS_CHAINS * lanes * 2 (mul+add ou FMA)
+static const flops_impl_t flops_impls[] = {
+#ifdef HAVE_X86_SIMD
+    { "sse2",   "fp64", 2,  flops_sse2_f64,   cpu_has_sse2 },
+    { "sse2",   "fp32", 4,  flops_sse2_f32,   cpu_has_sse2 },
+    { "avx2",   "fp64", 4,  flops_avx2_f64,   cpu_has_avx2 },
+    { "avx2",   "fp32", 8,  flops_avx2_f32,   cpu_has_avx2 },
+    { "avx512", "fp64", 8,  flops_avx512_f64, cpu_has_avx512 },
+    { "avx512", "fp32", 16, flops_avx512_f32, cpu_has_avx512 },
+#else
+    { "generic", "fp64", 1, flops_generic_f64, NULL },
+    { "generic", "fp32", 1, flops_generic_f32, NULL },
+#endif
+};
+#define N_FLOPS_IMPLS ((int)(sizeof(flops_impls) / sizeof(flops_impls[0])))
+
+// GFLOP/s d'une variante avec tous les threads: nombre d'itérations calibré
+// sur un thread, puis exécution simultanée chronométrée entre deux barrières
+static double flops_point(const flops_impl_t *impl, double budget_s) {
+    uint64_t iters = 1024;
+    for (;;) {
+        double t0 = now_sec();
+        flops_sink = impl->fn(iters);
+        double t = now_sec() - t0;
+        if (t >= 0.01 || iters >= (1ULL << 40)) {
+            iters = (uint64_t)((double)iters * (budget_s / (t > 0.0 ? t : 1e-3)));
+            if (iters < 1) iters = 1;
+            break;
+        }
+        iters *= 2;
+    }
+    int nthreads = 1;
+    double t0 = 0.0, elapsed = 0.0;
+#ifdef _OPENMP
+    #pragma omp parallel
+#endif
+    {
 #ifdef _OPENMP
-#include <omp.h>
+        #pragma omp single
+#endif
+        {
+            nthreads = thread_count();
+            t0 = now_sec();
+        }
+        double r = impl->fn(iters);
+#ifdef _OPENMP
+        #pragma omp barrier
+        #pragma omp single
 #endif
+        elapsed = now_sec() - t0;
+        if (thread_id() == 0) flops_sink = r;
+    }
+    double flop = (double)nthreads * (double)iters * FLOPS_CHAINS * impl->lanes * 2.0;
+    return elapsed > 0.0 ? flop / elapsed / 1e9 : 0.0;
+}
 
-static double now_sec(void) {
+/* ---------------------------------------------------------------------------
+ * Charges de travail réalistes: GEMM dense, FFT 1D/2D, tri radix, SpMV CSR
+ *
+ * Chaque charge prépare ses données une fois (setup, premier accès par les
+ * threads qui les utiliseront), puis enchaîne des opérations complètes
+ * parallélisées par OpenMP; seule `op` est chronométrée (`prep` restaure
+ * l'entrée si l'opération la détruit, hors chronomètre).
+ * ------------------------------------------------------------------------- */
+
+typedef struct {
+    const char *name;
+    const char *variant;
+    const char *unit;
+    double scale;                    // unité de travail -> métrique (1e9 = GFLOP/s)
+    void *(*setup)(void);
+    void (*prep)(void *st);          // NULL si l'entrée est réutilisable telle quelle
+    void (*op)(void *st);
+    double (*work)(const void *st);  // travail d'une opération (FLOP, clés)
+    size_t (*bytes)(const void *st); // empreinte mémoire (colonne size_bytes)
+    void (*teardown)(void *st);
+} workload_t;
+
+// Opérations enchaînées jusqu'à épuiser `budget_s` (au moins une)
+static double workload_point(const workload_t *w, void *st, double budget_s) {
+    double elapsed = 0.0;
+    long ops = 0;
+    do {
+        if (w->prep) w->prep(st);
+        double t0 = now_sec();
+        w->op(st);
+        elapsed += now_sec() - t0;
+        ops++;
+    } while (elapsed < budget_s);
+    return elapsed > 0.0 ? w->work(st) * (double)ops / elapsed / w->scale : 0.0;
+}
+
+/* --- GEMM: C = A * B, n x n double, référence par blocs ou BLAS système --- */
+
+#define GEMM_N 1024
+#define GEMM_BI 64
+#define GEMM_BK 256
+
+typedef void (*cblas_dgemm_fn)(int, int, int, int, int, int, double, const double *, int,
+                               const double *, int, double, double *, int);
+
+typedef struct {
+    int n;
+    double *a, *b, *c;
+    cblas_dgemm_fn dgemm;
+} gemm_state_t;
+
+static void *gemm_alloc(void) {
+    gemm_state_t *g = calloc(1, sizeof(*g));
+    if (!g) return NULL;
+    g->n = GEMM_N;
+    size_t bytes = (size_t)g->n * g->n * sizeof(double);
+    if (posix_memalign((void **)&g->a, 64, bytes) || posix_memalign((void **)&g->b, 64, bytes) ||
+        posix_memalign((void **)&g->c, 64, bytes)) {
+        free(g->a); free(g->b); free(g->c); free(g);
+        return NULL;
+    }
+    int n = g->n;
 #ifdef _OPENMP
-    return omp_get_wtime();
+    #pragma omp parallel for schedule(static)
+#endif
+    for (int i = 0; i < n; ++i) {
+        for (int j = 0; j < n; ++j) {
+            g->a[(size_t)i * n + j] = 1.0 / (1 + ((i + j) % 7));
+            g->b[(size_t)i * n + j] = 1.0 / (1 + ((i * 3 + j) % 5));
+            g->c[(size_t)i * n + j] = 0.0;
+        }
+    }
+    return g;
+}
+
+static void gemm_ref_op(void *st) {
+    gemm_state_t *g = st;
+    const int n = g->n;
+#ifdef _OPENMP
+    #pragma omp parallel for schedule(static)
+#endif
+    for (int ii = 0; ii < n; ii += GEMM_BI) {
+        int ie = ii + GEMM_BI < n ? ii + GEMM_BI : n;
+        for (int i = ii; i < ie; ++i) memset(&g->c[(size_t)i * n], 0, (size_t)n * sizeof(double));
+        for (int kk = 0; kk < n; kk += GEMM_BK) {
+            int ke = kk + GEMM_BK < n ? kk + GEMM_BK : n;
+            for (int jj = 0; jj < n; jj += GEMM_BK) {
+                int je = jj + GEMM_BK < n ? jj + GEMM_BK : n;
+                for (int i = ii; i < ie; ++i) {
+                    double *restrict ci = &g->c[(size_t)i * n];
+                    for (int k = kk; k < ke; ++k) {
+                        const double aik = g->a[(size_t)i * n + k];
+                        const double *restrict bk = &g->b[(size_t)k * n];
+                        for (int j = jj; j < je; ++j) ci[j] += aik * bk[j];
+                    }
+                }
+            }
+        }
+    }
+}
+
+// BLAS système chargée à l'exécution (aucune dépendance de compilation):
+// BENCH_BLAS_LIB, sinon OpenBLAS, MKL, BLIS puis la CBLAS de référence
+static void *blas_handle;
+static const char *blas_lib_name;
+
+static cblas_dgemm_fn blas_load(int threads) {
+    static const char *const candidates[] = {
+        "libopenblas.so.0", "libopenblas.so", "libmkl_rt.so", "libmkl_rt.so.2",
+        "libblis.so.4", "libblis.so", "libcblas.so.3", "libcblas.so", "libblas.so.3",
+    };
+    const char *env = getenv("BENCH_BLAS_LIB");
+    if (!blas_handle && env && *env) {
+        blas_handle = dlopen(env, RTLD_NOW | RTLD_LOCAL);
+        if (blas_handle) blas_lib_name = env;
+    }
+    for (size_t k = 0; !blas_handle && k < sizeof(candidates) / sizeof(candidates[0]); ++k) {
+        blas_handle = dlopen(candidates[k], RTLD_NOW | RTLD_LOCAL);
+        if (blas_handle) blas_lib_name = candidates[k];
+    }
+    if (!blas_handle) return NULL;
+    cblas_dgemm_fn fn = (cblas_dgemm_fn)dlsym(blas_handle, "cblas_dgemm");
+    if (!fn) return NULL;
+    // Threads de la BLAS alignés sur le mode (mono/multi), quelle que soit son implémentation
+    static const char *const setters[] = { "openblas_set_num_threads", "MKL_Set_Num_Threads",
+                                           "bli_thread_set_num_threads" };
+    for (size_t k = 0; k < sizeof(setters) / sizeof(setters[0]); ++k) {
+        void (*set)(int) = (void (*)(int))dlsym(blas_handle, setters[k]);
+        if (set) set(threads);
+    }
+    return fn;
+}
+
+static void gemm_blas_op(void *st) {
+    gemm_state_t *g = st;
+    // CblasRowMajor = 101, CblasNoTrans = 111
+    g->dgemm(101, 111, 111, g->n, g->n, g->n, 1.0, g->a, g->n, g->b, g->n, 0.0, g->c, g->n);
+}
+
+static void *gemm_ref_setup(void) { return gemm_alloc(); }
+
+static void *gemm_blas_setup(void) {
+    cblas_dgemm_fn fn = blas_load(thread_count_max());
+    if (!fn) return NULL;
+    gemm_state_t *g = gemm_alloc();
+    if (g) g->dgemm = fn;
+    return g;
+}
+
+static double gemm_work(const void *st) {
+    const gemm_state_t *g = st;
+    return 2.0 * g->n * (double)g->n * g->n;
+}
+
+static size_t gemm_bytes(const void *st) {
+    const gemm_state_t *g = st;
+    return 3 * (size_t)g->n * g->n * sizeof(double);
+}
+
+static void gemm_teardown(void *st) {
+    gemm_state_t *g = st;
+    free(g->a); free(g->b); free(g->c); free(g);
+}
+
+/* --- FFT radix-2 complexe double, normalisée (1/sqrt(N), norme conservée) --- */
+
+#define FFT1D_LOG2 20
+#define FFT2D_LOG2 10
+
+typedef struct { double re, im; } cplx_t;
+
+typedef struct {
+    int log2n;        // taille d'une transformée 1D (2^log2n points)
+    size_t rows;      // 1 en 1D, 2^log2n en 2D
+    cplx_t *x, *tmp, *w;
+    uint32_t *rev;
+} fft_state_t;
+
+static void *fft_alloc(int log2n, size_t rows) {
+    fft_state_t *f = calloc(1, sizeof(*f));
+    if (!f) return NULL;
+    size_t n = (size_t)1 << log2n, total = n * rows;
+    f->log2n = log2n;
+    f->rows = rows;
+    f->x = malloc(total * sizeof(cplx_t));
+    f->tmp = rows > 1 ? malloc(total * sizeof(cplx_t)) : NULL;
+    f->w = malloc(n / 2 * sizeof(cplx_t));
+    f->rev = malloc(n * sizeof(uint32_t));
+    if (!f->x || (rows > 1 && !f->tmp) || !f->w || !f->rev) {
+        free(f->x); free(f->tmp); free(f->w); free(f->rev); free(f);
+        return NULL;
+    }
+    for (size_t k = 0; k < n / 2; ++k) {
+        double ang = -2.0 * M_PI * (double)k / (double)n;
+        f->w[k].re = cos(ang);
+        f->w[k].im = sin(ang);
+    }
+    for (size_t i = 0; i < n; ++i) {
+        uint32_t r = 0;
+        for (int b = 0; b < log2n; ++b) r |= (uint32_t)((i >> b) & 1) << (log2n - 1 - b);
+        f->rev[i] = r;
+    }
+    uint64_t seed = 0x2545f4914f6cdd1dULL;
+    for (size_t i = 0; i < total; ++i) {
+        f->x[i].re = (double)(xorshift64(&seed) >> 11) / 9007199254740992.0 - 0.5;
+        f->x[i].im = (double)(xorshift64(&seed) >> 11) / 9007199254740992.0 - 0.5;
+    }
+    return f;
+}
+
+static inline void fft_butterfly(cplx_t *a, cplx_t *b, cplx_t w) {
+    double tr = b->re * w.re - b->im * w.im;
+    double ti = b->re * w.im + b->im * w.re;
+    b->re = a->re - tr; b->im = a->im - ti;
+    a->re += tr; a->im += ti;
+}
+
+// FFT séquentielle d'un vecteur (utilisée ligne par ligne en 2D)
+static void fft_serial(cplx_t *x, const cplx_t *w, const uint32_t *rev, int log2n) {
+    size_t n = (size_t)1 << log2n;
+    for (size_t i = 0; i < n; ++i) {
+        size_t j = rev[i];
+        if (i < j) { cplx_t t = x[i]; x[i] = x[j]; x[j] = t; }
+    }
+    for (int s = 1; s <= log2n; ++s) {
+        size_t half = (size_t)1 << (s - 1), len = half << 1, step = n >> s;
+        for (size_t i = 0; i < n; i += len) {
+            for (size_t j = 0; j < half; ++j) fft_butterfly(&x[i + j], &x[i + j + half], w[j * step]);
+        }
+    }
+    double norm = 1.0 / sqrt((double)n);
+    for (size_t i = 0; i < n; ++i) { x[i].re *= norm; x[i].im *= norm; }
+}
+
+// FFT 1D unique de grande taille: chaque étage de papillons est partagé
+// entre les threads (une barrière par étage)
+static void fft1d_op(void *st) {
+    fft_state_t *f = st;
+    const int log2n = f->log2n;
+    const size_t n = (size_t)1 << log2n;
+    cplx_t *x = f->x;
+    const double norm = 1.0 / sqrt((double)n);
+#ifdef _OPENMP
+    #pragma omp parallel
+#endif
+    {
+#ifdef _OPENMP
+        #pragma omp for schedule(static)
+#endif
+        for (size_t i = 0; i < n; ++i) {
+            size_t j = f->rev[i];
+            if (i < j) { cplx_t t = x[i]; x[i] = x[j]; x[j] = t; }
+        }
+        for (int s = 1; s <= log2n; ++s) {
+            const size_t half = (size_t)1 << (s - 1), step = n >> s;
+#ifdef _OPENMP
+            #pragma omp for schedule(static)
+#endif
+            for (size_t t = 0; t < n / 2; ++t) {
+                size_t j = t & (half - 1);
+                size_t i = ((t >> (s - 1)) << s) + j;
+                fft_butterfly(&x[i], &x[i + half], f->w[j * step]);
+            }
+        }
+#ifdef _OPENMP
+        #pragma omp for schedule(static)
+#endif
+        for (size_t i = 0; i < n; ++i) { x[i].re *= norm; x[i].im *= norm; }
+    }
+}
+
+static void fft_transpose(cplx_t *dst, const cplx_t *src, size_t n) {
+#ifdef _OPENMP
+    #pragma omp for schedule(static)
+#endif
+    for (size_t ib = 0; ib < n; ib += 32) {
+        for (size_t jb = 0; jb < n; jb += 32) {
+            for (size_t i = ib; i < ib + 32 && i < n; ++i) {
+                for (size_t j = jb; j < jb + 32 && j < n; ++j) dst[j * n + i] = src[i * n + j];
+            }
+        }
+    }
+}
+
+// FFT 2D n x n: FFT des lignes, transposition, FFT des lignes, transposition
+static void fft2d_op(void *st) {
+    fft_state_t *f = st;
+    const size_t n = f->rows;
+#ifdef _OPENMP
+    #pragma omp parallel
+#endif
+    {
+#ifdef _OPENMP
+        #pragma omp for schedule(static)
+#endif
+        for (size_t r = 0; r < n; ++r) fft_serial(&f->x[r * n], f->w, f->rev, f->log2n);
+        fft_transpose(f->tmp, f->x, n);
+#ifdef _OPENMP
+        #pragma omp for schedule(static)
+#endif
+        for (size_t r = 0; r < n; ++r) fft_serial(&f->tmp[r * n], f->w, f->rev, f->log2n);
+        fft_transpose(f->x, f->tmp, n);
+    }
+}
+
+static void *fft1d_setup(void) { return fft_alloc(FFT1D_LOG2, 1); }
+static void *fft2d_setup(void) { return fft_alloc(FFT2D_LOG2, (size_t)1 << FFT2D_LOG2); }
+
+// Convention usuelle: 5 N log2(N) FLOP par transformée de N points
+static double fft_work(const void *st) {
+    const fft_state_t *f = st;
+    double total = (double)((size_t)1 << f->log2n) * (double)f->rows;
+    return 5.0 * total * log2(total);
+}
+
+static size_t fft_bytes(const void *st) {
+    const fft_state_t *f = st;
+    return ((size_t)1 << f->log2n) * f->rows * sizeof(cplx_t) * (f->rows > 1 ? 2 : 1);
+}
+
+static void fft_teardown(void *st) {
+    fft_state_t *f = st;
+    free(f->x); free(f->tmp); free(f->w); free(f->rev); free(f);
+}
+
+/* --- Tri radix LSD parallèle de clés 32 bits (4 passes de 8 bits) --- */
+
+#define SORT_LOG2 24
+#define SORT_RADIX 256
+
+typedef struct {
+    size_t n;
+    uint32_t *keys, *tmp;
+    size_t *hist;     // SORT_RADIX compteurs par thread
+    int max_threads;
+    uint64_t seed;
+} sort_state_t;
+
+static void *sort_setup(void) {
+    sort_state_t *s = calloc(1, sizeof(*s));
+    if (!s) return NULL;
+    s->n = (size_t)1 << SORT_LOG2;
+    s->max_threads = thread_count_max();
+    s->keys = malloc(s->n * sizeof(uint32_t));
+    s->tmp = malloc(s->n * sizeof(uint32_t));
+    s->hist = malloc((size_t)s->max_threads * SORT_RADIX * sizeof(size_t));
+    s->seed = 0x9e3779b97f4a7c15ULL;
+    if (!s->keys || !s->tmp || !s->hist) {
+        free(s->keys); free(s->tmp); free(s->hist); free(s);
+        return NULL;
+    }
+    return s;
+}
+
+// Nouvelles clés aléatoires avant chaque tri (hors chronomètre)
+static void sort_prep(void *st) {
+    sort_state_t *s = st;
+    s->seed++;
+#ifdef _OPENMP
+    #pragma omp parallel
+#endif
+    {
+        size_t lo, hi;
+        thread_chunk(s->n, thread_count(), &lo, &hi);
+        uint64_t seed = s->seed * 0x100000001b3ULL + (uint64_t)thread_id() * 0x9e3779b97f4a7c15ULL + 1;
+        for (size_t i = lo; i < hi; ++i) s->keys[i] = (uint32_t)xorshift64(&seed);
+    }
+}
+
+static void sort_op(void *st) {
+    sort_state_t *s = st;
+#ifdef _OPENMP
+    #pragma omp parallel
+#endif
+    {
+        const int me = thread_id(), nt = thread_count();
+        size_t lo, hi;
+        thread_chunk(s->n, nt, &lo, &hi);
+        size_t *mine = &s->hist[(size_t)me * SORT_RADIX];
+        for (int pass = 0; pass < 4; ++pass) {
+            const int shift = 8 * pass;
+            const uint32_t *src = (pass & 1) ? s->tmp : s->keys;
+            uint32_t *dst = (pass & 1) ? s->keys : s->tmp;
+            memset(mine, 0, SORT_RADIX * sizeof(size_t));
+            for (size_t i = lo; i < hi; ++i) mine[(src[i] >> shift) & 0xff]++;
+#ifdef _OPENMP
+            #pragma omp barrier
+            #pragma omp single
+#endif
+            {
+                // Décalages: chiffre par chiffre, puis thread par thread (tri stable)
+                size_t off = 0;
+                for (int d = 0; d < SORT_RADIX; ++d) {
+                    for (int t = 0; t < nt; ++t) {
+                        size_t c = s->hist[(size_t)t * SORT_RADIX + d];
+                        s->hist[(size_t)t * SORT_RADIX + d] = off;
+                        off += c;
+                    }
+                }
+            }
+            for (size_t i = lo; i < hi; ++i) dst[mine[(src[i] >> shift) & 0xff]++] = src[i];
+#ifdef _OPENMP
+            #pragma omp barrier
+#endif
+        }
+    }
+}
+
+static double sort_work(const void *st) { return (double)((const sort_state_t *)st)->n; }
+
+static size_t sort_bytes(const void *st) { return 2 * ((const sort_state_t *)st)->n * sizeof(uint32_t); }
+
+static void sort_teardown(void *st) {
+    sort_state_t *s = st;
+    free(s->keys); free(s->tmp); free(s->hist); free(s);
+}
+
+/* --- SpMV CSR: y = A x, 16 non-zéros par ligne (8 en bande, 8 aléatoires) --- */
+
+#define SPMV_LOG2 19
+#define SPMV_NNZ_ROW 16
+
+typedef struct {
+    size_t rows, nnz;
+    uint32_t *row_ptr, *col;
+    double *val, *x, *y;
+} spmv_state_t;
+
+static void *spmv_setup(void) {
+    spmv_state_t *m = calloc(1, sizeof(*m));
+    if (!m) return NULL;
+    m->rows = (size_t)1 << SPMV_LOG2;
+    m->nnz = m->rows * SPMV_NNZ_ROW;
+    m->row_ptr = malloc((m->rows + 1) * sizeof(uint32_t));
+    m->col = malloc(m->nnz * sizeof(uint32_t));
+    m->val = malloc(m->nnz * sizeof(double));
+    m->x = malloc(m->rows * sizeof(double));
+    m->y = malloc(m->rows * sizeof(double));
+    if (!m->row_ptr || !m->col || !m->val || !m->x || !m->y) {
+        free(m->row_ptr); free(m->col); free(m->val); free(m->x); free(m->y); free(m);
+        return NULL;
+    }
+    const size_t rows = m->rows;
+    // Remplissage avec le même découpage statique que le produit (premier accès NUMA)
+#ifdef _OPENMP
+    #pragma omp parallel for schedule(static)
+#endif
+    for (size_t i = 0; i < rows; ++i) {
+        uint64_t seed = (uint64_t)i * 0x9e3779b97f4a7c15ULL + 1;
+        m->row_ptr[i] = (uint32_t)(i * SPMV_NNZ_ROW);
+        for (int k = 0; k < SPMV_NNZ_ROW; ++k) {
+            size_t c = k < SPMV_NNZ_ROW / 2 ? (i + rows + (size_t)k - SPMV_NNZ_ROW / 4) % rows
+                                            : xorshift64(&seed) % rows;
+            m->col[i * SPMV_NNZ_ROW + k] = (uint32_t)c;
+            m->val[i * SPMV_NNZ_ROW + k] = 1.0 / (1 + k);
+        }
+        m->x[i] = 1.0;
+        m->y[i] = 0.0;
+    }
+    m->row_ptr[rows] = (uint32_t)m->nnz;
+    return m;
+}
+
+static void spmv_op(void *st) {
+    spmv_state_t *m = st;
+    const size_t rows = m->rows;
+#ifdef _OPENMP
+    #pragma omp parallel for schedule(static)
+#endif
+    for (size_t i = 0; i < rows; ++i) {
+        double sum = 0.0;
+        for (uint32_t k = m->row_ptr[i]; k < m->row_ptr[i + 1]; ++k) sum += m->val[k] * m->x[m->col[k]];
+        m->y[i] = sum;
+    }
+    __asm__ __volatile__("" ::: "memory");
+}
+
+static double spmv_work(const void *st) { return 2.0 * (double)((const spmv_state_t *)st)->nnz; }
+
+static size_t spmv_bytes(const void *st) {
+    const spmv_state_t *m = st;
+    return m->nnz * (sizeof(double) + sizeof(uint32_t)) + m->rows * (2 * sizeof(double) + sizeof(uint32_t));
+}
+
+static void spmv_teardown(void *st) {
+    spmv_state_t *m = st;
+    free(m->row_ptr); free(m->col); free(m->val); free(m->x); free(m->y); free(m);
+}
+
+static const workload_t workloads[] = {
+    { "gemm",  "ref",   "GFLOP/s", 1e9, gemm_ref_setup,  NULL,      gemm_ref_op,  gemm_work, gemm_bytes, gemm_teardown },
+    { "gemm",  "blas",  "GFLOP/s", 1e9, gemm_blas_setup, NULL,      gemm_blas_op, gemm_work, gemm_bytes, gemm_teardown },
+    { "fft1d", "radix2", "GFLOP/s", 1e9, fft1d_setup,    NULL,      fft1d_op,     fft_work,  fft_bytes,  fft_teardown },
+    { "fft2d", "radix2", "GFLOP/s", 1e9, fft2d_setup,    NULL,      fft2d_op,     fft_work,  fft_bytes,  fft_teardown },
+    { "sort",  "radix", "Mkeys/s", 1e6, sort_setup,      sort_prep, sort_op,      sort_work, sort_bytes, sort_teardown },
+    { "spmv",  "csr",   "GFLOP/s", 1e9, spmv_setup,      NULL,      spmv_op,      spmv_work, spmv_bytes, spmv_teardown },
+};
+#define N_WORKLOADS ((int)(sizeof(workloads) / sizeof(workloads[0])))
+
+// Vrai si la charge `name` figure dans la liste "gemm,fft1d,..." (NULL = toutes)
+static int workload_selected(const char *list, const char *name) {
+    if (!list || strcmp(list, "all") == 0) return 1;
+    size_t len = strlen(name);
+    for (const char *p = list; (p = strstr(p, name)) != NULL; p += len) {
+        if ((p == list || p[-1] == ',') && (p[len] == ',' || p[len] == '\0')) return 1;
+    }
+    return 0;
+}
+
+// Premier nom de la liste qui ne désigne aucune charge (copié dans `bad`), 0 si tous sont connus
+static int workload_list_unknown(const char *list, char *bad, size_t badlen) {
+    if (!list || strcmp(list, "all") == 0) return 0;
+    char *dup = strdup(list), *save = NULL;
+    int found = 0;
+    for (char *tok = strtok_r(dup, ",", &save); tok && !found; tok = strtok_r(NULL, ",", &save)) {
+        int known = 0;
+        for (int k = 0; k < N_WORKLOADS && !known; ++k) known = strcmp(tok, workloads[k].name) == 0;
+        if (!known) { snprintf(bad, badlen, "%s", tok); found = 1; }
+    }
+    free(dup);
+    return found;
+}
+
+/* ---------------------------------------------------------------------------
+ * Balayage du nombre de threads (courbe de scaling)
+ *
+ * Une seule équipe OpenMP de max(steps) threads est créée pour tout le
+ * balayage; à chaque palier seuls les `t` premiers threads (placés par
+ * OMP_PLACES/OMP_PROC_BIND) travaillent, les autres attendent à la barrière.
+ * L'équipe obtenue peut être plus petite (OMP_THREAD_LIMIT, OMP_DYNAMIC): les
+ * paliers au-delà ne sont pas mesurés.
+ * ------------------------------------------------------------------------- */
+
+// "1,2,4,16" ou "auto" (puissances de 2 jusqu'à max_threads, plus max_threads)
+static int parse_sweep(const char *list, int max_threads, int *out, int cap) {
+    int n = 0;
+    if (strcmp(list, "auto") == 0) {
+        for (int t = 1; t < max_threads && n < cap - 1; t *= 2) out[n++] = t;
+        out[n++] = max_threads;
+        return n;
+    }
+    char *dup = strdup(list), *save = NULL;
+    for (char *tok = strtok_r(dup, ",", &save); tok && n < cap; tok = strtok_r(NULL, ",", &save)) {
+        int v = atoi(tok);
+        if (v <= 0) { n = -1; break; }
+        out[n++] = v;
+    }
+    free(dup);
+    return n;
+}
+
+// Retourne la taille de l'équipe obtenue; scores[s] n'est rempli que pour
+// les paliers steps[s] <= cette taille.
+static int run_sweep(int kernel, const int *steps, int nsteps, size_t size,
+                     double dur, uint64_t work, double *scores) {
+    int team = 1, granted = 1;
+    for (int s = 0; s < nsteps; ++s) if (steps[s] > team) team = steps[s];
+    events_ctx_t ev_ctx;
+    mem_ctx_t ctx;
+    int alloc_failed = 0;
+#ifdef _OPENMP
+    #pragma omp parallel num_threads(team)
+#endif
+    {
+#ifdef _OPENMP
+        #pragma omp single
+#endif
+        granted = thread_count();
+        for (int s = 0; s < nsteps; ++s) {
+            if (steps[s] > granted) continue;
+            int active = steps[s];
+            if (kernel == K_EVENTS) {
+#ifdef _OPENMP
+                #pragma omp single
+#endif
+                events_ctx_init(&ev_ctx, dur, work, active);
+                events_run_team(&ev_ctx);
+#ifdef _OPENMP
+                #pragma omp single
+#endif
+                scores[s] = events_ctx_score(&ev_ctx);
+            } else {
+#ifdef _OPENMP
+                #pragma omp single
+#endif
+                alloc_failed = mem_ctx_init(&ctx, kernel, size, dur, active) != 0;
+                if (!alloc_failed) mem_run_team(&ctx);
+#ifdef _OPENMP
+                #pragma omp barrier
+                #pragma omp single
+#endif
+                {
+                    scores[s] = alloc_failed ? 0.0 : mem_ctx_gbps(&ctx);
+                    mem_ctx_free(&ctx);
+                }
+            }
+        }
+    }
+    return granted;
+}
+
+/* ---------------------------------------------------------------------------
+ * Statistiques sur les répétitions (calculées dans le processus)
+ * ------------------------------------------------------------------------- */
+
+typedef struct {
+    int n;
+    double mean, std, min, max;
+    double median, p5, p95;
+    double rmean;   // moyenne après rejet des valeurs aberrantes
+    int rejected;
+} stats_t;
+
+static int cmp_double(const void *a, const void *b) {
+    double x = *(const double *)a, y = *(const double *)b;
+    return (x > y) - (x < y);
+}
+
+// Percentile par interpolation linéaire sur un tableau trié
+static double percentile(const double *sorted, int n, double p) {
+    if (n == 1) return sorted[0];
+    double pos = p * (n - 1);
+    int lo = (int)pos;
+    if (lo >= n - 1) return sorted[n - 1];
+    double frac = pos - lo;
+    return sorted[lo] + frac * (sorted[lo + 1] - sorted[lo]);
+}
+
+// Moyenne/écart-type (population, comme calc_stats côté shell), médiane,
+// p5/p95 et moyenne robuste: rejet des échantillons à plus de 3 MAD normalisés
+// (1.4826 * MAD ~ sigma pour une loi normale) de la médiane.
+static void compute_stats(const double *v, int n, stats_t *st) {
+    memset(st, 0, sizeof(*st));
+    st->n = n;
+    if (n <= 0) return;
+    double *sorted = malloc((size_t)n * sizeof(double));
+    double *dev = malloc((size_t)n * sizeof(double));
+    if (!sorted || !dev) { free(sorted); free(dev); return; }
+    double sum = 0.0, ss = 0.0;
+    for (int i = 0; i < n; ++i) { sorted[i] = v[i]; sum += v[i]; ss += v[i] * v[i]; }
+    qsort(sorted, (size_t)n, sizeof(double), cmp_double);
+    st->mean = sum / n;
+    double var = ss / n - st->mean * st->mean;
+    st->std = var > 0.0 ? sqrt(var) : 0.0;
+    st->min = sorted[0];
+    st->max = sorted[n - 1];
+    st->median = percentile(sorted, n, 0.5);
+    st->p5 = percentile(sorted, n, 0.05);
+    st->p95 = percentile(sorted, n, 0.95);
+    for (int i = 0; i < n; ++i) dev[i] = fabs(sorted[i] - st->median);
+    qsort(dev, (size_t)n, sizeof(double), cmp_double);
+    double limit = 3.0 * 1.4826 * percentile(dev, n, 0.5);
+    double rsum = 0.0;
+    int kept = 0;
+    for (int i = 0; i < n; ++i) {
+        if (fabs(v[i] - st->median) <= limit) { rsum += v[i]; kept++; }
+    }
+    st->rmean = kept ? rsum / kept : st->median;
+    st->rejected = n - kept;
+    free(sorted);
+    free(dev);
+}
+
+static void print_stats(const stats_t *st) {
+    printf("RUNS %d\n", st->n);
+    printf("SCORE %.3f\n", st->mean);
+    printf("STD %.3f\n", st->std);
+    printf("MIN %.3f\n", st->min);
+    printf("MAX %.3f\n", st->max);
+    printf("MEDIAN %.3f\n", st->median);
+    printf("P5 %.3f\n", st->p5);
+    printf("P95 %.3f\n", st->p95);
+    printf("RMEAN %.3f\n", st->rmean);
+    printf("REJECTED %d\n", st->rejected);
+}
+
+/* ---------------------------------------------------------------------------
+ * Identité du binaire (injectée par le Makefile) pour tracer quel build a
+ * produit un score: generic (-march=x86-64) ou native (-march=native)
+ * ------------------------------------------------------------------------- */
+
+#ifndef BENCH_BUILD
+#define BENCH_BUILD "unknown"
+#endif
+#ifndef BENCH_CFLAGS
+#define BENCH_CFLAGS ""
+#endif
+
+#if defined(__clang__)
+#define BENCH_COMPILER "clang " __clang_version__
+#elif defined(__GNUC__)
+#define BENCH_COMPILER "gcc " __VERSION__
 #else
-    struct timespec ts;
-    clock_gettime(CLOCK_MONOTONIC, &ts);
-    return ts.tv_sec + ts.tv_nsec*1e-9;
+#define BENCH_COMPILER "unknown"
+#endif
+
+// Jeu d'instructions le plus large autorisé à la compilation (hors variantes
+// flops dispatchées à l'exécution)
+static const char *build_isa(void) {
+#if defined(__AVX512F__)
+    return "avx512";
+#elif defined(__AVX2__)
+    return "avx2";
+#elif defined(__AVX__)
+    return "avx";
+#elif defined(__SSE4_2__)
+    return "sse4.2";
+#elif defined(__SSE2__)
+    return "sse2";
+#elif defined(__aarch64__)
+    return "aarch64";
+#else
+    return "unknown";
 #endif
 }
 
-static uint64_t bench_kernel(double duration_s) {
-    // Kernel simple: accumulation de calculs flottants pour occuper le CPU
-    // et éviter l'optimisation excessive.
-    volatile double acc = 0.0;
-    uint64_t iters = 0;
-    double t0 = now_sec();
-    double t;
-    do {
-        // 256 opérations flottantes approximatives
-        for (int i = 1; i <= 256; ++i) {
-            acc += sin((double)i) * cos((double)i) + sqrt((double)i);
+static void print_build_info(void) {
+    printf("BUILD %s\n", BENCH_BUILD);
+    printf("COMPILER %s\n", BENCH_COMPILER);
+    printf("ISA %s\n", build_isa());
+    printf("CFLAGS %s\n", BENCH_CFLAGS);
+}
+
+// Statistiques (RUNS, SCORE, ...) d'échantillons lus sur stdin, un par ligne:
+// agrège des mesures faites par plusieurs processus (mode A/B du job)
+static int stats_from_stdin(void) {
+    int cap = 64, n = 0;
+    double *v = malloc((size_t)cap * sizeof(double)), x;
+    if (!v) return 1;
+    while (scanf("%lf", &x) == 1) {
+        if (n == cap) {
+            double *nv = realloc(v, (size_t)(cap *= 2) * sizeof(double));
+            if (!nv) { free(v); return 1; }
+            v = nv;
         }
-        iters++;
-        t = now_sec();
-    } while ((t - t0) < duration_s);
-    (void)acc; // évite d'être optimisé
-    return iters * 256ULL; // événements approximatifs
+        v[n++] = x;
+    }
+    if (n == 0) { free(v); return 1; }
+    stats_t st;
+    compute_stats(v, n, &st);
+    print_stats(&st);
+    free(v);
+    return 0;
+}
+
+static int parse_size_list(const char *list, size_t *out, int cap) {
+    int n = 0;
+    char *dup = strdup(list), *save = NULL;
+    for (char *tok = strtok_r(dup, ",", &save); tok && n < cap; tok = strtok_r(NULL, ",", &save)) {
+        size_t v = parse_size(tok);
+        if (v == 0) { n = -1; break; }
+        out[n++] = v;
+    }
+    free(dup);
+    return n;
 }
 
 static void usage(const char *prog) {
-    fprintf(stderr, "Usage: %s [--duration <seconds>] [--verbose]\n", prog);
+    fprintf(stderr,
+            "Usage: %s [--duration <seconds>] [--kernel events|copy|scale|add|triad|latency|flops|numa|work]\n"
+            "          [--workloads gemm,fft1d,fft2d,sort,spmv]\n"
+            "          [--sizes 32K,1M,...] [--max-size <size>] [--hugepages]\n"
+            "          [--sweep auto|1,2,4,...] [--repeats N] [--warmup N] [--work N]\n"
+            "          [--counters] [--series MS [--progress S]] [--verbose]\n"
+            "       %s --build-info | --stats < valeurs\n", prog, prog);
 }
 
 int main(int argc, char **argv) {
     double dur = 3.0;
     int verbose = 0;
+    int kernel = K_EVENTS;
+    const char *size_list = NULL;
+    size_t max_size = 4ULL << 30;
+    int hugepages = 0;
+    const char *sweep_list = NULL;
+    const char *workload_list = NULL;
+    int counters = 0;
+    double series_ms = 0.0;
+    double progress_s = 0.0;
+    int repeats = 1;
+    int warmup = 0;
+    uint64_t work = 0;
     for (int i = 1; i < argc; ++i) {
         if (strcmp(argv[i], "--duration") == 0 && i + 1 < argc) {
             dur = atof(argv[++i]);
+        } else if (strcmp(argv[i], "--kernel") == 0 && i + 1 < argc) {
+            kernel = kernel_from_name(argv[++i]);
+            if (kernel < 0) { usage(argv[0]); return 1; }
+        } else if (strcmp(argv[i], "--sizes") == 0 && i + 1 < argc) {
+            size_list = argv[++i];
+        } else if (strcmp(argv[i], "--max-size") == 0 && i + 1 < argc) {
+            max_size = parse_size(argv[++i]);
+            if (max_size == 0) { usage(argv[0]); return 1; }
+        } else if (strcmp(argv[i], "--sweep") == 0 && i + 1 < argc) {
+            sweep_list = argv[++i];
+        } else if (strcmp(argv[i], "--repeats") == 0 && i + 1 < argc) {
+            repeats = atoi(argv[++i]);
+            if (repeats < 1) { usage(argv[0]); return 1; }
+        } else if (strcmp(argv[i], "--warmup") == 0 && i + 1 < argc) {
+            warmup = atoi(argv[++i]);
+            if (warmup < 0) { usage(argv[0]); return 1; }
+        } else if (strcmp(argv[i], "--work") == 0 && i + 1 < argc) {
+            work = strtoull(argv[++i], NULL, 10);
+            if (work == 0) { usage(argv[0]); return 1; }
+        } else if (strcmp(argv[i], "--workloads") == 0 && i + 1 < argc) {
+            workload_list = argv[++i];
+        } else if (strcmp(argv[i], "--series") == 0 && i + 1 < argc) {
+            series_ms = atof(argv[++i]);
+            if (series_ms <= 0.0) { usage(argv[0]); return 1; }
+        } else if (strcmp(argv[i], "--progress") == 0 && i + 1 < argc) {
+            progress_s = atof(argv[++i]);
+            if (progress_s <= 0.0) { usage(argv[0]); return 1; }
+        } else if (strcmp(argv[i], "--counters") == 0) {
+            counters = 1;
+        } else if (strcmp(argv[i], "--hugepages") == 0) {
+            hugepages = 1;
         } else if (strcmp(argv[i], "--verbose") == 0) {
             verbose = 1;
+        } else if (strcmp(argv[i], "--build-info") == 0) {
+            print_build_info();
+            return 0;
+        } else if (strcmp(argv[i], "--stats") == 0) {
+            return stats_from_stdin();
         } else {
             usage(argv[0]);
             return 1;
@@ -70,20 +2129,311 @@ int main(int argc, char **argv) {
 #endif
 
     if (verbose) {
-        printf("START threads=%d duration=%.3f\n", threads, dur);
+        printf("START threads=%d duration=%.3f kernel=%s work=%llu\n", threads, dur,
+               kernel_names[kernel], (unsigned long long)work);
     }
 
-    uint64_t total = 0;
-#ifdef _OPENMP
-    #pragma omp parallel reduction(+:total)
-#endif
-    {
-        total += bench_kernel(dur);
+    if (sweep_list) {
+        if (kernel == K_LATENCY || kernel == K_FLOPS || kernel == K_NUMA || kernel == K_WORK) { usage(argv[0]); return 1; }
+        int steps[256];
+        int nsteps = parse_sweep(sweep_list, threads, steps, 256);
+        if (nsteps <= 0) { usage(argv[0]); return 1; }
+        size_t size = max_size;
+        if (size_list) {
+            size_t sizes[64];
+            if (parse_size_list(size_list, sizes, 64) <= 0) { usage(argv[0]); return 1; }
+            size = sizes[0];
+        }
+        size_t phys = phys_mem_bytes();
+        if (phys && size > phys / 2) size = phys / 2;
+        double *scores = calloc((size_t)nsteps, sizeof(double));
+        if (!scores) return 1;
+        int granted = run_sweep(kernel, steps, nsteps, size, dur, work, scores);
+        // Paliers non mesurés (équipe réduite par le runtime) retirés de la courbe
+        int kept = 0;
+        for (int s = 0; s < nsteps; ++s) {
+            if (steps[s] > granted) {
+                fprintf(stderr, "Palier %d threads ignoré: équipe OpenMP limitée à %d threads\n", steps[s], granted);
+                continue;
+            }
+            steps[kept] = steps[s];
+            scores[kept++] = scores[s];
+        }
+        nsteps = kept;
+        if (nsteps == 0) { free(scores); return 1; }
+        // Efficacité parallèle rapportée au débit par thread du premier palier
+        double per_thread = scores[0] / steps[0];
+        printf("THREADS %d\n", steps[nsteps - 1]);
+        printf("DURATION %.3f\n", dur);
+        printf("KERNEL %s\n", kernel_names[kernel]);
+        if (kernel != K_EVENTS) printf("SIZE %zu\n", size);
+        for (int s = 0; s < nsteps; ++s) {
+            double speedup = per_thread > 0.0 ? scores[s] / per_thread : 0.0;
+            printf("SWEEP %d %.3f %.3f %.3f\n", steps[s], scores[s], speedup,
+                   speedup / steps[s]);
+        }
+        printf("UNIT %s\n", kernel == K_EVENTS ? "events/s" : "GB/s");
+        printf("SCORE %.3f\n", scores[nsteps - 1]);
+        free(scores);
+        return 0;
+    }
+
+    if (kernel == K_WORK) {
+        char bad[64];
+        if (workload_list_unknown(workload_list, bad, sizeof(bad))) {
+            fprintf(stderr, "Charge inconnue dans --workloads: %s\n", bad);
+            usage(argv[0]);
+            return 1;
+        }
+        int sel[N_WORKLOADS], nsel = 0;
+        for (int k = 0; k < N_WORKLOADS; ++k) {
+            if (workload_selected(workload_list, workloads[k].name)) sel[nsel++] = k;
+        }
+        if (nsel == 0) { usage(argv[0]); return 1; }
+        // Le budget --duration est réparti sur les charges sélectionnées
+        double budget = dur / nsel;
+        if (budget < 0.2) budget = 0.2;
+        double *vals = malloc((size_t)repeats * sizeof(double));
+        if (!vals) return 1;
+        printf("THREADS %d\n", threads);
+        printf("DURATION %.3f\n", dur);
+        printf("KERNEL work\n");
+        // WORK <charge> <variante> <threads> <octets> <unité> <moy> <std> <min> <max> <médiane> <p5> <p95> <moy.robuste> <n>
+        for (int k = 0; k < nsel; ++k) {
+            const workload_t *w = &workloads[sel[k]];
+            void *st = w->setup();
+            if (!st) {
+                // variante indisponible (p. ex. aucune BLAS système): ignorée
+                if (verbose) printf("SKIP %s %s\n", w->name, w->variant);
+                continue;
+            }
+            for (int r = 0; r < warmup + repeats; ++r) {
+                double v = workload_point(w, st, budget);
+                if (r >= warmup) vals[r - warmup] = v;
+            }
+            stats_t st_w;
+            compute_stats(vals, repeats, &st_w);
+            printf("WORK %s %s %d %zu %s %.3f %.3f %.3f %.3f %.3f %.3f %.3f %.3f %d\n",
+                   w->name, w->variant, threads, w->bytes(st), w->unit, st_w.mean, st_w.std,
+                   st_w.min, st_w.max, st_w.median, st_w.p5, st_w.p95, st_w.rmean, st_w.n);
+            if (w->setup == gemm_blas_setup && blas_lib_name) printf("BLAS %s\n", blas_lib_name);
+            fflush(stdout);
+            w->teardown(st);
+        }
+        free(vals);
+        return 0;
+    }
+
+    if (kernel == K_NUMA) {
+        numa_node_t nodes[MAX_NUMA_NODES];
+        int nn = numa_topology(nodes, MAX_NUMA_NODES);
+        int ncells = 0;
+        for (int i = 0; i < nn; ++i) {
+            for (int j = 0; j < nn; ++j) ncells += nodes[i].ncpu > 0 && nodes[j].has_mem;
+        }
+        if (ncells == 0) {
+            fprintf(stderr, "Topologie NUMA indisponible (/sys/devices/system/node)\n");
+            return 1;
+        }
+        // working set hors caches mais borné: la matrice compte N x N cellules
+        size_t bw_size = max_size < (1ULL << 30) ? max_size : (1ULL << 30);
+        size_t lat_size = bw_size < (256ULL << 20) ? bw_size : (256ULL << 20);
+        double budget = dur / ncells;
+        if (budget < 0.1) budget = 0.1;
+        printf("THREADS %d\n", threads);
+        printf("DURATION %.3f\n", dur);
+        printf("KERNEL numa\n");
+        printf("SIZE %zu\n", bw_size);
+        printf("NUMANODES %d\n", nn);
+        // NUMA <domaine CPU> <domaine mémoire> <GB/s> <ns/chargement> <placement> <threads>
+        for (int i = 0; i < nn; ++i) {
+            if (nodes[i].ncpu == 0) continue;
+            for (int j = 0; j < nn; ++j) {
+                if (!nodes[j].has_mem) continue;
+                int placement = PLACE_DEFAULT;
+                double bw = numa_bw_point(&nodes[i], &nodes[j], bw_size, budget * 0.75, &placement);
+                double ns = numa_lat_point(&nodes[i], &nodes[j], lat_size, budget * 0.25, hugepages);
+                printf("NUMA %d %d %.3f %.3f %s %d\n", nodes[i].id, nodes[j].id, bw, ns,
+                       placement_names[placement], nodes[i].ncpu);
+                fflush(stdout);
+            }
+        }
+        for (int i = 0; i < nn; ++i) free(nodes[i].cpus);
+        return 0;
     }
 
-    double score = (double)total / dur; // events per second
+    if (kernel == K_FLOPS) {
+        int avail[N_FLOPS_IMPLS], navail = 0;
+        for (int k = 0; k < N_FLOPS_IMPLS; ++k) {
+            if (!flops_impls[k].supported || flops_impls[k].supported()) avail[navail++] = k;
+        }
+        // Le budget --duration est réparti sur les variantes disponibles
+        double budget = dur / navail;
+        if (budget < 0.05) budget = 0.05;
+        double *vals = malloc((size_t)repeats * sizeof(double));
+        if (!vals) return 1;
+        stats_t st, best;
+        memset(&best, 0, sizeof(best));
+        printf("THREADS %d\n", threads);
+        printf("DURATION %.3f\n", dur);
+        printf("KERNEL flops\n");
+        // FLOPS <isa> <précision> <threads> <moy> <std> <min> <max> <médiane> <p5> <p95> <moy.robuste> <n>
+        for (int k = 0; k < navail; ++k) {
+            const flops_impl_t *impl = &flops_impls[avail[k]];
+            for (int r = 0; r < warmup + repeats; ++r) {
+                double g = flops_point(impl, budget);
+                if (r >= warmup) vals[r - warmup] = g;
+            }
+            compute_stats(vals, repeats, &st);
+            printf("FLOPS %s %s %d %.3f %.3f %.3f %.3f %.3f %.3f %.3f %.3f %d\n",
+                   impl->isa, impl->precision, threads, st.mean, st.std, st.min, st.max,
+                   st.median, st.p5, st.p95, st.rmean, st.n);
+            fflush(stdout);
+            if (strcmp(impl->precision, "fp64") == 0 && st.mean > best.mean) best = st;
+        }
+        free(vals);
+        printf("UNIT GFLOP/s\n");
+        // Statistiques globales = meilleure variante fp64 (crête vectorielle double précision)
+        print_stats(&best);
+        return 0;
+    }
+
+    if (kernel == K_LATENCY) {
+        size_t phys = phys_mem_bytes();
+        if (phys && max_size > phys / 2) max_size = phys / 2;
+        size_t sizes[64];
+        int nsizes = size_list ? parse_size_list(size_list, sizes, 64)
+                               : default_lat_sizes(max_size, sizes, 64);
+        if (nsizes <= 0) { usage(argv[0]); return 1; }
+        double budget = dur / nsizes;
+        if (budget < 0.05) budget = 0.05;
+        double last = 0.0;
+        printf("THREADS 1\n");
+        printf("DURATION %.3f\n", dur);
+        printf("KERNEL latency\n");
+        for (int s = 0; s < nsizes; ++s) {
+            int hp = HP_NONE;
+            double ns = lat_point(sizes[s], budget, hugepages, &hp, NULL, NULL);
+            if (ns < 0) {
+                fprintf(stderr, "allocation impossible pour %zu octets\n", sizes[s]);
+                continue;
+            }
+            printf("LAT %zu %.3f %s\n", sizes[s], ns, hugepage_names[hp]);
+            fflush(stdout);
+            last = ns;
+        }
+        printf("UNIT ns\n");
+        printf("SCORE %.3f\n", last);
+        return 0;
+    }
+
+    if (kernel != K_EVENTS) {
+        // Ne jamais dépasser la moitié de la RAM physique (3 tableaux + OS)
+        size_t phys = phys_mem_bytes();
+        if (phys && max_size > phys / 2) max_size = phys / 2;
+        size_t sizes[64];
+        int nsizes = size_list ? parse_size_list(size_list, sizes, 64)
+                               : default_sizes(max_size, sizes, 64);
+        if (nsizes <= 0) { usage(argv[0]); return 1; }
+        // Le budget --duration est réparti sur l'ensemble du balayage
+        double budget = dur / nsizes;
+        if (budget < 0.05) budget = 0.05;
+        double *vals = malloc((size_t)repeats * sizeof(double));
+        if (!vals) return 1;
+        stats_t last;
+        memset(&last, 0, sizeof(last));
+        printf("THREADS %d\n", threads);
+        printf("DURATION %.3f\n", dur);
+        printf("KERNEL %s\n", kernel_names[kernel]);
+        // Chaque taille: `warmup` mesures écartées puis `repeats` mesures
+        // MEM <kernel> <size> <threads> <moy> <std> <min> <max> <médiane> <p5> <p95> <moy.robuste> <n>
+        for (int s = 0; s < nsizes; ++s) {
+            int n = 0;
+            for (int r = 0; r < warmup + repeats; ++r) {
+                double gbps = mem_point(kernel, sizes[s], budget);
+                if (gbps < 0) break;
+                if (r >= warmup) vals[n++] = gbps;
+            }
+            if (n == 0) {
+                fprintf(stderr, "allocation impossible pour %zu octets\n", sizes[s]);
+                continue;
+            }
+            compute_stats(vals, n, &last);
+            printf("MEM %s %zu %d %.3f %.3f %.3f %.3f %.3f %.3f %.3f %.3f %d\n",
+                   kernel_names[kernel], sizes[s], threads, last.mean, last.std,
+                   last.min, last.max, last.median, last.p5, last.p95, last.rmean, n);
+            fflush(stdout);
+        }
+        free(vals);
+        printf("UNIT GB/s\n");
+        // Statistiques globales = celles de la plus grande taille
+        print_stats(&last);
+        return 0;
+    }
+
+    // Répétitions dans le processus: warmup écarté, une ligne RUN par mesure.
+    // Les événements de chaque thread sont cumulés sur les répétitions
+    // mesurées: débit par cœur = événements du thread / temps total.
+    double *vals = malloc((size_t)repeats * sizeof(double));
+    double *thread_ev = calloc((size_t)threads, sizeof(double));
+    int *thread_cpu = malloc((size_t)threads * sizeof(int));
+    if (!vals || !thread_ev || !thread_cpu) return 1;
+    for (int t = 0; t < threads; ++t) thread_cpu[t] = -1;
+    double measured = 0.0;
+    counters_t ctr;
+    counters_init(&ctr);
+    telemetry_t tel;
+    // série temporelle: mode durée uniquement (le mode --work ne relève pas l'horloge)
+    series_t series;
+    int use_series = series_ms > 0.0 && work == 0 && series_init(&series, series_ms * 1e-3, threads);
+    if (use_series) series.progress = progress_s;
+    stability_t stab = { 0.0, 0.0, -1.0 };
+    int have_stab = 0;
     printf("THREADS %d\n", threads);
-    printf("DURATION %.3f\n", dur);
-    printf("SCORE %.3f\n", score);
+    // mode --work: DURATION = durée moyenne mesurée, imprimée après les répétitions
+    if (work == 0) printf("DURATION %.3f\n", dur);
+    if (work > 0) printf("WORK %llu\n", (unsigned long long)work);
+    for (int r = 0; r < warmup + repeats; ++r) {
+        double elapsed = 0.0;
+        int timed = r >= warmup;
+        if (r == warmup) telemetry_start(&tel, thread_cpu, threads);
+        if (use_series) series_reset(&series);
+        double score = events_point(dur, work, &elapsed, timed ? thread_ev : NULL,
+                                    thread_cpu, timed && counters ? &ctr : NULL,
+                                    timed && use_series ? &series : NULL); // events per second
+        if (!timed) {
+            printf("WARMUP %d %.3f %.6f\n", r + 1, score, elapsed);
+        } else {
+            measured += elapsed;
+            vals[r - warmup] = score;
+            printf("RUN %d %.3f %.6f\n", r - warmup + 1, score, elapsed);
+            if (use_series) series_print(&series, r - warmup + 1, &stab, &have_stab);
+        }
+        fflush(stdout);
+    }
+    telemetry_stop(&tel);
+    if (work > 0) printf("DURATION %.3f\n", measured / repeats);
+    stats_t st;
+    compute_stats(vals, repeats, &st);
+    print_stats(&st);
+    if (counters) counters_print(&ctr);
+    telemetry_print(&tel, thread_cpu, threads, st.mean);
+    if (use_series) {
+        printf("SERIES_MS %.0f\n", series_ms);
+        if (have_stab) {
+            printf("DROP_PCT %.2f\n", stab.drop_pct);
+            printf("CV_PCT %.2f\n", stab.cv_pct);
+            if (stab.throttle_s >= 0.0) printf("THROTTLE_S %.3f\n", stab.throttle_s);
+        }
+        series_free(&series);
+    }
+    // CORE <thread> <cpu> <type P|E|-> <events/s>
+    for (int t = 0; t < threads; ++t) {
+        printf("CORE %d %d %s %.3f\n", t, thread_cpu[t], core_type(thread_cpu[t]),
+               measured > 0.0 ? thread_ev[t] / measured : 0.0);
+    }
+    free(vals);
+    free(thread_ev);
+    free(thread_cpu);
     return 0;
 }
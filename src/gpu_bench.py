@@ -4,7 +4,9 @@ Ce script gère:
 - le parsing des arguments,
 - l'exécution mono et multi pour chaque backend disponible,
 - le calcul moyenne/écart-type sur N répétitions,
-- et l'écriture d'une ligne consolidée dans outputs/gpu_<node>.csv.
+- et l'écriture d'une ligne consolidée par backend et mode dans le spool du job
+  (results/spool/<node>_<job>.jsonl, fusionné dans results/gpu_<node>.csv),
+  précédée d'une ligne par répétition dès qu'elle se termine (famille reps).
 
 Les fonctions de bench et de listing des devices sont importées depuis
 gpu_bench_core.py afin de séparer la logique cœur et l'orchestration.
@@ -15,12 +17,15 @@ import os
 import socket
 from datetime import datetime
 import math
+import subprocess
+import time
 
 from gpu_bench_core import (
     bench_torch, bench_cupy, bench_numba,
     list_devices_torch, list_devices_cupy, list_devices_numba,
     bench_torch_multi, bench_cupy_multi, set_vram_target, set_warmup_steps,
 )
+from results_store import SCHEMAS, job_id, spool_append, spool_path
 
 
 def display_result(backend: str, mode: str, threads: int, duration: float, avg: float, std: float, runs: int) -> None:
@@ -44,6 +49,116 @@ def display_result(backend: str, mode: str, threads: int, duration: float, avg:
     print(f'RUNS {runs}')
 
 
+def _cpu_jiffies() -> tuple[int, int] | None:
+    """Total et steal (jiffies) de la ligne cpu de /proc/stat, None si illisible."""
+    try:
+        with open('/proc/stat') as f:
+            parts = f.readline().split()
+        vals = [int(x) for x in parts[1:9]]
+        return sum(vals), vals[7]
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _foreign_ticks() -> dict[int, tuple[int, str]]:
+    """Temps CPU (utime+stime, ticks) des processus hors de la session du job."""
+    sid = os.getsid(0)
+    out = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as f:
+                line = f.read()
+        except OSError:
+            continue
+        j = line.rfind(') ')
+        if j < 0:
+            continue
+        comm = line[line.find('(') + 1:j]
+        f = line[j + 2:].split()
+        try:
+            if int(f[3]) == sid:
+                continue
+            out[int(name)] = (int(f[11]) + int(f[12]), comm)
+        except (ValueError, IndexError):
+            continue
+    return out
+
+
+def foreign_gpu_procs() -> int | None:
+    """Nombre de processus de calcul étrangers sur les GPU visibles (nvidia-smi).
+
+    Les processus de la session du job sont ignorés; None si nvidia-smi est absent.
+    """
+    try:
+        res = subprocess.run(['nvidia-smi', '--query-compute-apps=pid', '--format=csv,noheader,nounits'],
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if res.returncode != 0:
+        return None
+    sid = os.getsid(0)
+    n = 0
+    for tok in res.stdout.split():
+        try:
+            pid = int(tok.strip(','))
+        except ValueError:
+            continue
+        try:
+            if os.getsid(pid) == sid:
+                continue
+        except OSError:
+            pass  # pid d'un autre espace de noms (conteneur): étranger
+        n += 1
+    return n
+
+
+def contam_begin() -> dict:
+    """Relevé initial de contamination (voisins bruyants) avant une série de répétitions."""
+    try:
+        with open('/proc/loadavg') as f:
+            load1 = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        load1 = None
+    return {'t0': time.monotonic(), 'load1': load1, 'cpu': _cpu_jiffies(),
+            'ticks': _foreign_ticks(), 'gpu': foreign_gpu_procs()}
+
+
+def contam_note(state: dict) -> None:
+    """Avant chaque répétition: maximum des processus GPU étrangers observés."""
+    n = foreign_gpu_procs()
+    if n is not None:
+        state['gpu'] = max(n, state['gpu'] or 0)
+
+
+def contam_end(state: dict) -> dict:
+    """Contamination sur l'intervalle depuis contam_begin.
+
+    steal_pct: part de steal (hyperviseur); foreign_cpu_pct: part de la capacité
+    du nœud consommée hors du job; contamination = steal + CPU étranger, plus
+    100 si un processus étranger a été vu sur un GPU.
+    """
+    contam_note(state)
+    dt = time.monotonic() - state['t0']
+    cpu1 = _cpu_jiffies()
+    steal = None
+    if state['cpu'] and cpu1 and cpu1[0] > state['cpu'][0]:
+        steal = 100.0 * (cpu1[1] - state['cpu'][1]) / (cpu1[0] - state['cpu'][0])
+    ticks1 = _foreign_ticks()
+    foreign = 0
+    for pid, (t, _) in ticks1.items():
+        d = t - state['ticks'].get(pid, (0, ''))[0]
+        if d > 0:
+            foreign += d
+    hz = os.sysconf('SC_CLK_TCK')
+    ncpu = os.cpu_count() or 1
+    foreign_pct = 100.0 * foreign / (dt * hz * ncpu) if dt > 0 else 0.0
+    score = (steal or 0.0) + foreign_pct + (100.0 if state['gpu'] else 0.0)
+    return {'load1': state['load1'], 'steal_pct': steal, 'foreign_cpu_pct': foreign_pct,
+            'foreign_gpu_procs': state['gpu'], 'contamination': score}
+
+
 def ensure_conda_active(expected_name: str | None = None) -> None:
     """Vérifie qu'un environnement conda est actif, sinon bloque l'exécution.
 
@@ -80,9 +195,13 @@ def main():
     p.add_argument('--verbose', action='store_true')
     p.add_argument('--conda-env', type=str, default=None,
                    help="nom de l'environnement conda requis (obligatoire: un conda actif doit être présent)")
-    # outputs sous la racine du projet (parent de src)
+    # results sous la racine du projet (parent de src), lu par le « top »
     p.add_argument('--csv-dir', type=str, default=os.path.join(os.path.dirname(
-        os.path.dirname(__file__)), 'outputs'), help='répertoire pour stocker le CSV consolidé')
+        os.path.dirname(os.path.abspath(__file__))), 'results'), help='répertoire pour stocker le CSV consolidé')
+    p.add_argument('--job-id', type=str, default=None,
+                   help='identifiant du job pour le fichier de spool (défaut: SLURM_JOB_ID ou local-<date>-<pid>)')
+    p.add_argument('--job-start', type=int, default=int(time.time()),
+                   help='début du job (epoch, défaut: maintenant), pour la progression et l\'ETA')
     p.add_argument('--node', type=str, default=socket.gethostname().split('.')
                    [0], help='nom du nœud pour les CSV')
     p.add_argument('--vram-frac', type=float, default=None,
@@ -112,31 +231,18 @@ def main():
 
     # Nouveau format (aligné sur le CPU) mais avec backend séparé et colonnes VRAM
     # En-tête: node,backend,mode,nb_gpu,runs,duration_s,avg_events_per_s,stddev_events_per_s,min_events_per_s,max_events_per_s,vram_total_MB,vram_used_MB,vram_used_pct,timestamp
-    gpu_header = 'node,backend,mode,nb_gpu,runs,duration_s,avg_events_per_s,stddev_events_per_s,min_events_per_s,max_events_per_s,vram_total_MB,vram_used_MB,vram_used_pct,heterogeneous,timestamp'
-    gpu_csv_path = os.path.join(csv_dir, f"gpu_{args.node}.csv")
-
-    def ensure_gpu_header():
-        if os.path.exists(gpu_csv_path):
-            try:
-                with open(gpu_csv_path, 'r') as f:
-                    first = f.readline().rstrip('\n')
-                if first != gpu_header:
-                    # sauvegarde ancien format
-                    ts = datetime.now().strftime('%Y%m%d%H%M%S')
-                    os.replace(gpu_csv_path, gpu_csv_path + f'.bak.{ts}')
-            except Exception:
-                pass
-        if (not os.path.exists(gpu_csv_path)) or os.path.getsize(gpu_csv_path) == 0:
-            with open(gpu_csv_path, 'w') as f:
-                f.write(gpu_header + '\n')
-
-    ensure_gpu_header()
+    gpu_header = 'node,backend,mode,nb_gpu,runs,duration_s,avg_events_per_s,stddev_events_per_s,min_events_per_s,max_events_per_s,vram_total_MB,vram_used_MB,vram_used_pct,heterogeneous,load1,steal_pct,foreign_cpu_pct,foreign_gpu_procs,contamination,timestamp'
+    # Lignes écrites dans le fichier de spool du job (results/spool/<node>_<job>.jsonl),
+    # fusionnées ensuite dans gpu_<node>.csv par la compaction (results_store.py)
+    job = args.job_id or job_id()
+    gpu_spool_path = spool_path(csv_dir, args.node, job)
 
     def write_gpu_line(backend: str, mode: str, threads: int, runs: int, duration: float,
                        avg: float, std: float, vmin: float, vmax: float,
                        vram_total: float | None, vram_used: float | None, vram_pct: float | None,
-                       heterogeneous: int | None):
+                       heterogeneous: int | None, contam: dict | None = None):
         ts = datetime.now().isoformat(timespec='seconds')
+        contam = contam or {}
 
         def fmt(x):
             if x is None:
@@ -147,10 +253,31 @@ def main():
                 return ''
             return str(int(x))
         line = (
-            f"{args.node},{backend},{mode},{threads},{runs},{duration:.3f},{avg:.3f},{std:.3f},{vmin:.3f},{vmax:.3f},{fmt(vram_total)},{fmt(vram_used)},{fmt(vram_pct)},{fmt_int(heterogeneous)},{ts}\n"
+            f"{args.node},{backend},{mode},{threads},{runs},{duration:.3f},{avg:.3f},{std:.3f},{vmin:.3f},{vmax:.3f},{fmt(vram_total)},{fmt(vram_used)},{fmt(vram_pct)},{fmt_int(heterogeneous)},"
+            f"{fmt(contam.get('load1'))},{fmt(contam.get('steal_pct'))},{fmt(contam.get('foreign_cpu_pct'))},"
+            f"{fmt_int(contam.get('foreign_gpu_procs'))},{fmt(contam.get('contamination'))},{ts}\n"
         )
-        with open(gpu_csv_path, 'a') as f:
-            f.write(line)
+        spool_append(gpu_spool_path, job, 'gpu', gpu_header, [line])
+        if (contam.get('contamination') or 0.0) > 5.0:
+            print(f"[contam] {backend} {mode}: activité étrangère {contam['contamination']:.2f} % "
+                  f"(GPU étrangers: {contam.get('foreign_gpu_procs')})", file=sys.stderr)
+
+    # Chaque répétition est écrite dans le spool dès sa fin (famille reps): un job
+    # tué garde ses répétitions terminées, status.sh en tire progression et ETA
+    reps_header = SCHEMAS['reps']
+    params_sig = os.environ.get('BENCH_PARAMS_SIG') or '-'
+
+    def write_rep(backend: str, mode: str, rep: int, score: float, run_s: float):
+        ts = datetime.now().isoformat(timespec='seconds')
+        line = (f"{args.node},{job},gpu,{mode},{backend},{rep},{args.repeats},{score:.3f},{run_s:.6f},"
+                f"{args.job_start},{params_sig},{ts}")
+        spool_append(gpu_spool_path, job, 'reps', reps_header, [line])
+
+    def write_phase(backend: str, mode: str):
+        # début de phase (rep 0, sans score): status.sh affiche la phase en cours
+        ts = datetime.now().isoformat(timespec='seconds')
+        line = f"{args.node},{job},gpu,{mode},{backend},0,{args.repeats},,,{args.job_start},{params_sig},{ts}"
+        spool_append(gpu_spool_path, job, 'reps', reps_header, [line])
 
     def calc_stats(vals):
         n = len(vals)
@@ -173,9 +300,14 @@ def main():
             if be == 'torch':
                 # Mono-GPU
                 vals = []
+                cstate = contam_begin()
+                write_phase(be, 'mono')
                 for i in range(args.repeats):
+                    contam_note(cstate)
+                    t0 = time.perf_counter()
                     s1 = bench_torch(args.duration, 0, args.size, args.verbose)
                     vals.append(s1)
+                    write_rep(be, 'mono', i + 1, s1, time.perf_counter() - t0)
                     if args.verbose:
                         print(
                             f"[torch mono] run {i+1}/{args.repeats}: {s1:.3f}")
@@ -192,14 +324,18 @@ def main():
                     vram_used = used/1e6
                     vram_pct = (used/total*100.0) if total else 0.0
                 write_gpu_line('torch', 'mono', 1, len(
-                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, 0)
+                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, 0, contam_end(cstate))
                 printed += 1
                 any_ok = True
                 # Multi-GPU
                 devs = list_devices_torch()
                 threads_count = len(devs) if len(devs) > 1 else 1
                 vals = []
+                cstate = contam_begin()
+                write_phase(be, 'multi')
                 for i in range(args.repeats):
+                    contam_note(cstate)
+                    t0 = time.perf_counter()
                     if len(devs) > 1:
                         s = bench_torch_multi(
                             args.duration, devs, args.size, args.verbose)
@@ -207,6 +343,7 @@ def main():
                         s = bench_torch(args.duration, 0,
                                         args.size, args.verbose)
                     vals.append(s)
+                    write_rep(be, 'multi', i + 1, s, time.perf_counter() - t0)
                     if args.verbose:
                         print(
                             f"[torch multi] run {i+1}/{args.repeats}: {s:.3f}")
@@ -239,15 +376,20 @@ def main():
                         vram_used = used/1e6
                         vram_pct = (used/total*100.0) if total else 0.0
                 write_gpu_line('torch', 'multi', threads_count, len(
-                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, hetero_flag)
+                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, hetero_flag, contam_end(cstate))
                 printed += 1
                 any_ok = True
             elif be == 'cupy':
                 # Mono-GPU
                 vals = []
+                cstate = contam_begin()
+                write_phase(be, 'mono')
                 for i in range(args.repeats):
+                    contam_note(cstate)
+                    t0 = time.perf_counter()
                     s1 = bench_cupy(args.duration, 0, args.size, args.verbose)
                     vals.append(s1)
+                    write_rep(be, 'mono', i + 1, s1, time.perf_counter() - t0)
                     if args.verbose:
                         print(
                             f"[cupy mono] run {i+1}/{args.repeats}: {s1:.3f}")
@@ -263,14 +405,18 @@ def main():
                     vram_used = used/1e6
                     vram_pct = (used/total*100.0) if total else 0.0
                 write_gpu_line('cupy', 'mono', 1, len(
-                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, 0)
+                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, 0, contam_end(cstate))
                 printed += 1
                 any_ok = True
                 # Multi-GPU
                 devs = list_devices_cupy()
                 threads_count = len(devs) if len(devs) > 1 else 1
                 vals = []
+                cstate = contam_begin()
+                write_phase(be, 'multi')
                 for i in range(args.repeats):
+                    contam_note(cstate)
+                    t0 = time.perf_counter()
                     if len(devs) > 1:
                         s = bench_cupy_multi(
                             args.duration, devs, args.size, args.verbose)
@@ -278,6 +424,7 @@ def main():
                         s = bench_cupy(args.duration, 0,
                                        args.size, args.verbose)
                     vals.append(s)
+                    write_rep(be, 'multi', i + 1, s, time.perf_counter() - t0)
                     if args.verbose:
                         print(
                             f"[cupy multi] run {i+1}/{args.repeats}: {s:.3f}")
@@ -309,15 +456,20 @@ def main():
                         vram_used = used/1e6
                         vram_pct = (used/total*100.0) if total else 0.0
                 write_gpu_line('cupy', 'multi', threads_count, len(
-                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, hetero_flag)
+                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, hetero_flag, contam_end(cstate))
                 printed += 1
                 any_ok = True
             elif be == 'numba':
                 # Mono-GPU
                 vals = []
+                cstate = contam_begin()
+                write_phase(be, 'mono')
                 for i in range(args.repeats):
+                    contam_note(cstate)
+                    t0 = time.perf_counter()
                     s1 = bench_numba(args.duration, 0, args.size, args.verbose)
                     vals.append(s1)
+                    write_rep(be, 'mono', i + 1, s1, time.perf_counter() - t0)
                     if args.verbose:
                         print(
                             f"[numba mono] run {i+1}/{args.repeats}: {s1:.3f}")
@@ -333,14 +485,18 @@ def main():
                     vram_used = used/1e6
                     vram_pct = (used/total*100.0) if total else 0.0
                 write_gpu_line('numba', 'mono', 1, len(
-                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, 0)
+                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, 0, contam_end(cstate))
                 printed += 1
                 any_ok = True
                 # Multi-GPU (fallback séquentiel)
                 devs = list_devices_numba()
                 threads_count = len(devs) if len(devs) > 1 else 1
                 vals = []
+                cstate = contam_begin()
+                write_phase(be, 'multi')
                 for i in range(args.repeats):
+                    contam_note(cstate)
+                    t0 = time.perf_counter()
                     if len(devs) > 1:
                         s = 0.0
                         for d in devs:
@@ -350,6 +506,7 @@ def main():
                         s = bench_numba(args.duration, 0,
                                         args.size, args.verbose)
                     vals.append(s)
+                    write_rep(be, 'multi', i + 1, s, time.perf_counter() - t0)
                     if args.verbose:
                         print(
                             f"[numba multi] run {i+1}/{args.repeats}: {s:.3f}")
@@ -376,7 +533,7 @@ def main():
                         vram_pct = (used/total*100.0) if total else 0.0
                 # Fallback numba: pas de per-device détaillé -> flag 0 (ou vide). Ici 0.
                 write_gpu_line('numba', 'multi', threads_count, len(
-                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, 0)
+                    vals), args.duration, avg, std, vmin, vmax, vram_total, vram_used, vram_pct, 0, contam_end(cstate))
                 printed += 1
                 any_ok = True
 
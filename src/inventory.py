@@ -0,0 +1,311 @@
+"""Inventaire des nœuds Slurm mis en cache, partagé par submit, list et status.
+
+Un seul `scontrol show node -o` fournit, pour tout le cluster: CPUTot, nombre
+de GPU (Gres), features, partitions, architecture, mémoire, état et BootTime.
+L'instantané est gardé dans results/.inventory.json (écrit puis renommé) et
+réutilisé tant qu'il a moins de --ttl secondes (défaut 3600).
+
+L'état des nœuds vieillit plus vite que leurs ressources: quand une commande
+en a besoin (--state, champ state, summary) et qu'il date de plus de
+--state-ttl secondes (défaut 60), un seul `sinfo` relève l'état de tous les
+nœuds; seuls les nœuds dont l'état a changé, ou apparus depuis, sont relus
+par un `scontrol show node -o <liste>`. Un changement d'état ou de BootTime
+met à jour la date `changed` du nœud.
+
+Si le contrôleur est injoignable, le dernier instantané est utilisé tel quel.
+
+Usage:
+    python3 inventory.py nodes [--include n1,n2] [--exclude n3] [--limit N]
+                               [--gpu] [--state idle,mix] [--fields node,cpus,gpus]
+    python3 inventory.py summary
+    python3 inventory.py refresh
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from results_store import RESULTS_DIR
+
+FIELDS = ('node', 'cpus', 'gpus', 'partitions', 'features', 'arch', 'sockets', 'memory_mb',
+          'state', 'boot', 'changed')
+DEFAULT_FIELDS = 'node,cpus,gpus,partitions'
+VERSION = 1
+
+_KEY_RE = re.compile(r'(?:^|\s)([A-Za-z][A-Za-z0-9_/]*)=')
+# Vocabulaires sinfo (%T) et scontrol (State=) ramenés à un état de base
+_STATE_ALIASES = {'allocated': 'alloc', 'mixed': 'mix', 'completing': 'comp', 'drained': 'drain',
+                  'draining': 'drain', 'drng': 'drain'}
+
+
+def default_cache(results_dir: str) -> str:
+    return os.path.join(results_dir, '.inventory.json')
+
+
+def norm_state(state: str) -> str:
+    """État de base comparable entre sinfo et scontrol (idle, alloc, mix, drain, down, ...)."""
+    parts = [p.rstrip('*~#!%$@^-') for p in state.lower().split('+') if p]
+    if not parts:
+        return 'unknown'
+    if any(p.startswith('drain') for p in parts[1:]):
+        return 'drain'
+    return _STATE_ALIASES.get(parts[0], parts[0])
+
+
+def gres_gpus(gres: str) -> int:
+    """Somme des entrées gpu[:type]:N d'une chaîne Gres (sockets entre parenthèses ignorés)."""
+    total = 0
+    for ent in re.sub(r'\([^)]*\)', '', gres).split(','):
+        f = ent.split(':')
+        if f[0] == 'gpu' and len(f) > 1:
+            m = re.match(r'\d+', f[-1])
+            total += int(m.group()) if m else 0
+    return total
+
+
+def parse_node_line(line: str) -> tuple[str, dict] | None:
+    """Une ligne de `scontrol show node -o` -> (nœud, entrée d'inventaire)."""
+    keys = list(_KEY_RE.finditer(line))
+    kv = {}
+    for i, m in enumerate(keys):
+        end = keys[i + 1].start() if i + 1 < len(keys) else len(line)
+        kv[m.group(1)] = line[m.end():end].strip()
+    name = kv.get('NodeName')
+    if not name:
+        return None
+
+    def val(key, default=''):
+        v = kv.get(key, default)
+        return default if v in ('', '(null)', 'None') else v
+
+    def num(key):
+        m = re.match(r'\d+', val(key, '0'))
+        return int(m.group()) if m else 0
+
+    return name, {
+        'cpus': num('CPUTot'),
+        'gpus': gres_gpus(val('Gres')),
+        'partitions': val('Partitions'),
+        'features': val('AvailableFeatures', val('Features')),
+        'arch': val('Arch'),
+        'sockets': num('Sockets'),
+        'memory_mb': num('RealMemory'),
+        'state': norm_state(val('State', 'unknown')),
+        'boot': val('BootTime'),
+    }
+
+
+def _run(cmd: list) -> str | None:
+    try:
+        out = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return out.stdout if out.returncode == 0 else None
+
+
+def query_nodes(names: list | None = None) -> dict | None:
+    """Un seul appel scontrol (tous les nœuds, ou la liste donnée); None si échec."""
+    cmd = ['scontrol', 'show', 'node', '-o']
+    if names:
+        cmd.append(','.join(names))
+    out = _run(cmd)
+    if out is None:
+        return None
+    nodes = {}
+    for line in out.splitlines():
+        parsed = parse_node_line(line)
+        if parsed is not None:
+            nodes[parsed[0]] = parsed[1]
+    return nodes
+
+
+def query_states() -> dict | None:
+    """État de base de chaque nœud (un seul sinfo); None si échec."""
+    out = _run(['sinfo', '-h', '-N', '-o', '%N %T'])
+    if out is None:
+        return None
+    states = {}
+    for line in out.splitlines():
+        f = line.split()
+        if len(f) >= 2:
+            states[f[0]] = norm_state(f[1])
+    return states
+
+
+def load(path: str) -> dict | None:
+    try:
+        with open(path) as fh:
+            inv = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return inv if inv.get('version') == VERSION else None
+
+
+def save(path: str, inv: dict) -> None:
+    tmp = f'{path}.tmp.{os.getpid()}'
+    with open(tmp, 'w') as fh:
+        json.dump(inv, fh, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _merge(old: dict, fresh: dict, now: float) -> dict:
+    """Entrées relues: date `changed` avancée si l'état ou le BootTime a changé.
+
+    Sans instantané précédent, aucun changement n'est connu (changed = 0).
+    """
+    for name, ent in fresh.items():
+        prev = old.get(name)
+        if not old:
+            ent['changed'] = 0
+        elif prev and prev['state'] == ent['state'] and prev['boot'] == ent['boot']:
+            ent['changed'] = prev.get('changed', 0)
+        else:
+            ent['changed'] = now
+    return fresh
+
+
+def refresh_full(inv: dict | None, now: float, verbose: bool = False) -> dict | None:
+    fresh = query_nodes()
+    if fresh is None:
+        return None
+    nodes = _merge(inv['nodes'] if inv else {}, fresh, now)
+    if verbose:
+        print(f'[inventory] instantané complet: {len(nodes)} nœud(s)', file=sys.stderr)
+    return {'version': VERSION, 'full': now, 'states': now, 'nodes': nodes}
+
+
+def refresh_states(inv: dict, now: float, verbose: bool = False) -> bool:
+    """Rafraîchit l'état; relit seulement les nœuds changés ou nouveaux. False si échec."""
+    states = query_states()
+    if states is None:
+        return False
+    nodes = inv['nodes']
+    dirty = [n for n, s in states.items() if n not in nodes or nodes[n]['state'] != s]
+    if dirty:
+        fresh = query_nodes(dirty)
+        if fresh is None:
+            return False
+        nodes.update(_merge(nodes, fresh, now))
+    inv['states'] = now
+    if verbose:
+        print(f'[inventory] état relevé: {len(dirty)} nœud(s) relu(s) sur {len(states)}', file=sys.stderr)
+    return True
+
+
+def inventory(cache: str, ttl: float, state_ttl: float | None, force: bool = False,
+              verbose: bool = False) -> dict | None:
+    """Inventaire à jour (état compris si state_ttl n'est pas None); écrit le cache si modifié."""
+    now = time.time()
+    inv = None if force else load(cache)
+    changed = False
+    if inv is None or now - inv['full'] > ttl:
+        fresh = refresh_full(inv, now, verbose)
+        if fresh is not None:
+            inv, changed = fresh, True
+        elif inv is None:
+            inv = load(cache)
+        if inv is None:
+            return None
+        if not changed:
+            print('[inventory] contrôleur injoignable, inventaire en cache utilisé', file=sys.stderr)
+    elif state_ttl is not None and now - inv['states'] > state_ttl:
+        changed = refresh_states(inv, now, verbose)
+    if changed:
+        try:
+            save(cache, inv)
+        except OSError as e:
+            print(f'[inventory] cache non écrit ({e})', file=sys.stderr)
+    return inv
+
+
+def select(inv: dict, include: str = '', exclude: str = '', limit: int | None = None,
+           gpu: bool = False, states: str = '') -> list:
+    """Noms des nœuds retenus, dans l'ordre de l'inventaire."""
+    nodes = inv['nodes']
+    if include:
+        wanted = set(include.split(','))
+        names = [n for n in nodes if n in wanted]
+    else:
+        names = list(nodes)
+    if exclude:
+        drop = set(exclude.split(','))
+        names = [n for n in names if n not in drop]
+    if gpu:
+        names = [n for n in names if nodes[n]['gpus'] > 0]
+    if states:
+        keep = set(states.split(','))
+        names = [n for n in names if nodes[n]['state'] in keep]
+    if limit is not None:
+        names = names[:limit]
+    return names
+
+
+def _fmt(v) -> str:
+    if v is None or v == '':
+        return '-'
+    if isinstance(v, float):
+        return str(int(v))
+    return str(v)
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description='Inventaire des nœuds Slurm en cache.')
+    p.add_argument('--results', default=RESULTS_DIR, help='répertoire des résultats (défaut: results/)')
+    p.add_argument('--cache', default=None, help='fichier du cache (défaut: results/.inventory.json)')
+    p.add_argument('--ttl', type=float, default=3600, help='âge maximal de l\'instantané complet (s, défaut 3600)')
+    p.add_argument('--state-ttl', type=float, default=60, help='âge maximal des états (s, défaut 60)')
+    p.add_argument('--refresh', action='store_true', help='ignorer le cache')
+    p.add_argument('--verbose', action='store_true')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    n = sub.add_parser('nodes', help='nœuds filtrés, un par ligne')
+    n.add_argument('--include', default='')
+    n.add_argument('--exclude', default='')
+    n.add_argument('--limit', type=int, default=None)
+    n.add_argument('--gpu', action='store_true', help='seulement les nœuds avec GPU')
+    n.add_argument('--state', default='', help='états de base retenus (idle,mix,alloc,drain,down,...)')
+    n.add_argument('--fields', default=DEFAULT_FIELDS, help=f'champs affichés parmi {",".join(FIELDS)}')
+    sub.add_parser('summary', help='nombre de nœuds par état et âge du cache')
+    sub.add_parser('refresh', help='instantané complet immédiat')
+    args = p.parse_args()
+
+    cache = args.cache or default_cache(args.results)
+    fields = args.fields.split(',') if args.cmd == 'nodes' else []
+    bad = [f for f in fields if f not in FIELDS]
+    if bad:
+        print(f'Champ inconnu: {",".join(bad)}', file=sys.stderr)
+        return 1
+    needs_state = args.cmd == 'summary' or (args.cmd == 'nodes' and (args.state or 'state' in fields))
+    inv = inventory(cache, 0 if args.cmd == 'refresh' else args.ttl, args.state_ttl if needs_state else None,
+                    args.refresh, args.verbose)
+    if inv is None:
+        print('[inventory] aucun inventaire: scontrol indisponible et pas de cache', file=sys.stderr)
+        return 1
+
+    nodes = inv['nodes']
+    if args.cmd == 'refresh':
+        print(f'{len(nodes)} nœud(s) inventorié(s) -> {cache}')
+        return 0
+    if args.cmd == 'summary':
+        counts = {}
+        for ent in nodes.values():
+            counts[ent['state']] = counts.get(ent['state'], 0) + 1
+        now = time.time()
+        by_state = ', '.join(f'{s} {c}' for s, c in sorted(counts.items(), key=lambda x: (-x[1], x[0])))
+        print(f'{len(nodes)} nœud(s) ({by_state}); instantané il y a {int(now - inv["full"])} s, '
+              f'états il y a {int(now - inv["states"])} s')
+        return 0
+    for name in select(inv, args.include, args.exclude, args.limit, args.gpu, args.state):
+        ent = dict(nodes[name], node=name)
+        print(' '.join(_fmt(ent.get(f)) for f in fields))
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
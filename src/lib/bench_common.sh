@@ -12,8 +12,40 @@ export ROOT_DIR BIN_DIR RES_DIR OUT_DIR
 
 mkdir -p "$BIN_DIR" "$RES_DIR" "$OUT_DIR"
 
+# Inventaire des nœuds (src/inventory.py): instantané `scontrol show node -o`
+# de tout le cluster, en cache dans results/.inventory.json (TTL, état relevé
+# par un seul sinfo). Une ligne "<nœud> <CPUTot> <GPU> <partitions>" par nœud
+# par défaut; arguments de "inventory.py nodes" (--include, --exclude,
+# --limit, --gpu, --state, --fields).
+node_inventory() {
+    python3 "$ROOT_DIR/src/inventory.py" --results "$RES_DIR" nodes "$@"
+}
+
 idle_nodes() {
-    sinfo -h -N -t idle -o '%N'
+    node_inventory --state idle --fields node
+}
+
+# Regroupe des nœuds de même forme (ressources, partitions) en lots d'au plus
+# <taille> nœuds, dans l'ordre de première apparition: une ligne
+# "<forme> <n1,n2,...>" par lot, soumise ensuite en une seule allocation.
+# Un lot ne démarre que lorsque tous ses nœuds sont libres en même temps:
+# seuls les nœuds idle (état de l'inventaire, 3e colonne) sont groupés, les
+# autres (mix, alloc, ...) forment chacun leur propre lot, en fin de liste.
+# Usage: node_batches <taille> < lignes "<nœud> <forme> [<état>]"
+node_batches() {
+    awk -v bs="$1" '
+        NF >= 3 && $3 != "idle" { solo[++m] = $2 " " $1; next }
+        !($2 in cnt) { order[++k] = $2 }
+        {
+            b = int(cnt[$2] / bs); cnt[$2]++; nb[$2] = b + 1
+            key = $2 SUBSEP b
+            if (key in lst) lst[key] = lst[key] "," $1
+            else lst[key] = $1
+        }
+        END {
+            for (j = 1; j <= k; j++) for (b = 0; b < nb[order[j]]; b++) print order[j], lst[order[j] SUBSEP b]
+            for (j = 1; j <= m; j++) print solo[j]
+        }'
 }
 
 check_deps() {
@@ -29,13 +61,16 @@ check_deps() {
             fi
         ;;
         submit)
-            for c in sinfo squeue scontrol sbatch; do command -v "$c" >/dev/null 2>&1 || missing+=("$c"); done
+            for c in squeue scontrol sbatch python3; do command -v "$c" >/dev/null 2>&1 || missing+=("$c"); done
         ;;
         status)
             command -v squeue >/dev/null 2>&1 || missing+=("squeue")
         ;;
         list)
-            command -v sinfo >/dev/null 2>&1 || missing+=("sinfo")
+            for c in scontrol python3; do command -v "$c" >/dev/null 2>&1 || missing+=("$c"); done
+        ;;
+        top)
+            command -v python3 >/dev/null 2>&1 || missing+=("python3")
         ;;
     esac
     if (( ${#missing[@]} > 0 )); then
@@ -44,16 +79,61 @@ check_deps() {
     fi
 }
 
+# Fusionne le spool des jobs (results/spool/) dans les CSV canoniques avant
+# lecture. Sans python3, ou si une autre compaction tourne, les CSV sont lus
+# tels quels.
+compact_results() {
+    command -v python3 >/dev/null 2>&1 || return 0
+    python3 "$ROOT_DIR/src/results_store.py" --results "$RES_DIR" compact >/dev/null 2>&1 || true
+}
+
 # Convertit secondes entières -> HH:MM:SS
 fmt_hms() {
     local s=$1
     printf '%02d:%02d:%02d' $((s/3600)) $(((s%3600)/60)) $((s%60))
 }
 
-# Estimation walltime: 2 modes (mono+multi) * repeats * duration * 1.5 + 60s marge
+# Signature des paramètres d'un job (ses arguments hors --verbose): clé des
+# durées apprises par src/walltime.py, transmise au job par BENCH_PARAMS_SIG.
+# Usage: params_sig <arguments du job...>
+params_sig() {
+    printf '%s\n' "$@" | grep -vx -- '--verbose' | cksum | awk '{printf "%08x", $1}'
+}
+
+# Walltime par nœud appris des durées des jobs passés (src/walltime.py), la
+# formule servant de repli. Lignes "<nœud> <walltime_s> <source>".
+# Usage: learned_walltime <cpu|gpu> <signature> < lignes "<nœud> <forme> <formule_s>"
+learned_walltime() {
+    python3 "$ROOT_DIR/src/walltime.py" --results "$RES_DIR" predict --kind "$1" --params "$2"
+}
+
+# Estimation walltime: phases (mono+multi par défaut) * repeats * duration * 1.5 + 60s marge
 estimate_walltime() {
-    # Usage: estimate_walltime <repeats> <duration>
+    # Usage: estimate_walltime <repeats> <duration> [phases]
     local repeats=${1:-3}
     local duration=${2:-2.0}
-    awk -v r="$repeats" -v d="$duration" 'BEGIN{s=int((2*r*d*1.5)+60); if(s<60)s=60; print s}'
+    local phases=${3:-2}
+    awk -v r="$repeats" -v d="$duration" -v p="$phases" 'BEGIN{s=int((p*r*d*1.5)+60); if(s<60)s=60; print s}'
+}
+
+# Nombre de paliers d'un balayage --sweep auto sur <cpus> CPU (1,2,4,...,cpus)
+count_sweep_steps() {
+    awk -v n="${1:-1}" 'BEGIN{c=0; for(t=1;t<n;t*=2) c++; print c+1}'
+}
+
+# Nombre de kernels mémoire correspondant à une valeur de --mem-kernels
+count_mem_kernels() {
+    case "${1:-}" in
+        none|"") echo 0 ;;
+        all) echo 4 ;;
+        *) awk -F, '{print NF}' <<<"$1" ;;
+    esac
+}
+
+# Nombre de kernels d'une liste --sweep-kernels (none = 0)
+count_sweep_kernels() {
+    case "${1:-}" in
+        none|"") echo 0 ;;
+        *) awk -F, '{print NF}' <<<"$1" ;;
+    esac
 }
@@ -0,0 +1,132 @@
+#!/bin/bash
+# Fonctions communes aux scripts de job (bench_job_cpu.sh, bench_job_gpu.sh):
+# verrou par nœud lié au job Slurm, spool des résultats, répétitions et durée
+# du job.
+# Prérequis: HOST et RES_DIR définis avant le source.
+
+JOB_ID=${SLURM_JOB_ID:-local-$(date +%Y%m%dT%H%M%S)-$$}
+SPOOL_DIR="$RES_DIR/spool"
+SPOOL_FILE="$SPOOL_DIR/${HOST}_${JOB_ID}.jsonl"
+# début du job (allocation) pour la durée enregistrée par record_elapsed et l'ETA
+JOB_T0=${SLURM_JOB_START_TIME:-$(date +%s)}
+
+# Un verrou est vivant si son job est encore dans la file Slurm (squeue), ou,
+# hors Slurm, si son processus existe encore sur ce nœud. Un verrou vide
+# (ancien format) n'est considéré périmé qu'au bout de 24 h.
+# Usage: lock_alive <contenu du verrou> <fichier>
+lock_alive() {
+    local held=$1 lock=$2 job host pid out rc
+    if [[ -z "$held" ]]; then
+        [[ -z "$(find "$lock" -mmin +1440 2>/dev/null)" ]]
+        return
+    fi
+    job=$(sed -n 's/.*job=\([^ ]*\).*/\1/p' <<<"$held")
+    host=$(sed -n 's/.*host=\([^ ]*\).*/\1/p' <<<"$held")
+    pid=$(sed -n 's/.*pid=\([0-9]*\).*/\1/p' <<<"$held")
+    if [[ -n "$job" ]]; then
+        # même identifiant que nous: instance précédente d'un job relancé (requeue)
+        [[ "$job" == "${SLURM_JOB_ID:-}" ]] && return 1
+        if command -v squeue >/dev/null 2>&1; then
+            out=$(squeue -h -j "$job" -o %T 2>&1); rc=$?
+            if (( rc == 0 )); then
+                [[ -n "$out" ]]
+                return
+            fi
+            # identifiant purgé par slurmctld = job terminé; autre erreur = contrôleur injoignable
+            grep -qi 'invalid job id' <<<"$out" && return 1
+        fi
+    fi
+    if [[ "$host" == "$HOST" && -n "$pid" ]]; then
+        kill -0 "$pid" 2>/dev/null
+        return
+    fi
+    return 0
+}
+
+# Prise atomique d'un verrou sur répertoire partagé (lien physique, sûr sur
+# NFS). Le fichier contient job Slurm, hôte, PID et date de prise. Un verrou
+# périmé (job tué par kill -9 ou walltime) est écarté par renommage puis la
+# prise est retentée. Retour 1 si un job vivant détient le verrou.
+# Usage: acquire_lock <fichier>
+acquire_lock() {
+    local lock=$1 tmp="$1.$HOST.$$" held stale
+    printf 'job=%s host=%s pid=%s start=%s\n' "${SLURM_JOB_ID:-}" "$HOST" "$$" "$(date +%s)" >"$tmp"
+    for _ in 1 2 3; do
+        if ln "$tmp" "$lock" 2>/dev/null; then
+            rm -f "$tmp"
+            return 0
+        fi
+        held=$(cat "$lock" 2>/dev/null) || continue
+        if lock_alive "$held" "$lock"; then
+            rm -f "$tmp"
+            echo "Verrou détenu: $lock (${held:-ancien format})" >&2
+            return 1
+        fi
+        echo "[lock] verrou périmé écarté: $lock (${held:-ancien format})" >&2
+        stale="$lock.stale.$HOST.$$"
+        mv -f "$lock" "$stale" 2>/dev/null || continue
+        # un autre job a pu écarter le même verrou et prendre le sien entre-temps
+        if [[ "$(cat "$stale" 2>/dev/null)" != "$held" ]]; then
+            ln "$stale" "$lock" 2>/dev/null || true
+            rm -f "$stale" "$tmp"
+            return 1
+        fi
+        rm -f "$stale"
+    done
+    rm -f "$tmp"
+    return 1
+}
+
+# Ajoute des lignes CSV (stdin) au fichier de spool du job, un enregistrement
+# JSON par ligne (famille, nœud, job, hôte, colonnes, valeurs). Le fichier est
+# réécrit puis renommé: il ne contient jamais de ligne tronquée et seul ce job
+# l'écrit. La compaction (results_store.py compact) le fusionne dans
+# results/<famille>_<nœud>.csv.
+# Usage: spool_rows <famille> <en-tête CSV>
+spool_rows() {
+    local family=$1 header=$2
+    local tmp="$SPOOL_FILE.tmp.$$"
+    mkdir -p "$SPOOL_DIR"
+    {
+        [[ -f "$SPOOL_FILE" ]] && cat "$SPOOL_FILE"
+        awk -F, -v fam="$family" -v hdr="$header" -v job="$JOB_ID" -v host="$HOST" -v pid="$$" -v ts="$(date -Iseconds)" '
+            function q(s){ gsub(/[\\"[:cntrl:]]/, "", s); return "\"" s "\"" }
+            BEGIN{ n=split(hdr, h, ","); cols=""; for(i=1;i<=n;i++) cols=cols (i>1 ? "," : "") q(h[i]) }
+            NF{
+                vals=""; for(i=1;i<=n;i++) vals=vals (i>1 ? "," : "") q($i)
+                printf "{\"family\":%s,\"node\":%s,\"job_id\":%s,\"host\":%s,\"pid\":%s,\"written\":%s,\"columns\":[%s],\"values\":[%s]}\n", q(fam), q($1), q(job), q(host), pid, q(ts), cols, vals
+            }'
+    } >"$tmp" && mv -f "$tmp" "$SPOOL_FILE"
+}
+
+# Enregistre la durée du job (famille "jobs", apprise par src/walltime.py pour
+# le walltime des soumissions suivantes): signature des paramètres transmise
+# par submit (BENCH_PARAMS_SIG), classe matérielle et forme du nœud (CPU ou
+# GPU), code de retour. À appeler depuis le trap EXIT; une sortie sur SIGTERM
+# (walltime atteint, rc 143) est une durée censurée, traitée comme borne basse.
+# Usage: record_elapsed <cpu|gpu> <classe> <forme> <rc>
+record_elapsed() {
+    printf '%s,%s,%s,%s,%s,%s,%s,%s,%s\n' "$HOST" "$1" "${BENCH_PARAMS_SIG:--}" "${2//,/;}" "$3" \
+        "$(( $(date +%s) - JOB_T0 ))" "$4" "$JOB_ID" "$(date -Iseconds)" |
+        spool_rows jobs "node,kind,params,class,shape,elapsed_s,rc,job_id,timestamp"
+}
+
+# Enregistre une répétition de mesure dès sa fin (famille "reps"): un job tué
+# par le walltime ou par une panne du nœud garde ses répétitions terminées, et
+# status.sh en tire la progression et l'ETA des jobs en cours (src/progress.py).
+# Début du job et signature des paramètres servent à l'ETA.
+# Usage: record_rep <cpu|gpu> <mode> <variante> <rep> <répétitions> <score> <durée_s>
+record_rep() {
+    printf '%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s\n' "$HOST" "$JOB_ID" "$1" "$2" "${3//,/;}" "$4" "$5" "$6" "$7" \
+        "$JOB_T0" "${BENCH_PARAMS_SIG:--}" "$(date -Iseconds)" |
+        spool_rows reps "node,job_id,kind,mode,variant,rep,repeats,score,run_s,job_start,params,timestamp"
+}
+
+# Marque le début d'une phase de mesure (ligne "reps" de rep 0, sans score):
+# status.sh affiche la phase en cours même si elle n'écrit ses lignes qu'à la
+# fin (mémoire, latence, NUMA, ...), et en estime la durée d'après les jobs
+# passés.
+# Usage: record_phase <cpu|gpu> <mode> <variante> [<répétitions prévues>]
+record_phase() {
+    record_rep "$1" "$2" "$3" 0 "${4:-}" "" ""
+}
@@ -0,0 +1,182 @@
+"""Progression et ETA des jobs de bench à partir des répétitions reçues.
+
+Les jobs écrivent chaque répétition de mesure dans leur spool dès qu'elle se
+termine (famille "reps": record_rep dans lib/job_common.sh pour le CPU,
+write_rep dans gpu_bench.py pour le GPU). La compaction et l'ingestion étant
+incrémentales, la base suit les jobs pendant qu'ils tournent. Pour chaque job
+sans durée enregistrée (famille "jobs", écrite à la sortie):
+- phase courante (type, mode, build ou backend) et répétitions faites / prévues,
+- temps écoulé depuis le début du job,
+- ETA de la phase: durée moyenne de ses répétitions × répétitions restantes;
+  pour une phase sans répétition reçue (marqueur de début, rep 0: mémoire,
+  latence, NUMA, ...), médiane de sa durée dans les jobs réussis de même
+  signature moins le temps passé depuis son début; rien si la dernière phase
+  est terminée,
+- ETA du job: médiane des durées des jobs réussis de même type et même
+  signature de paramètres (du nœud, sinon de tous les nœuds), moins le temps
+  écoulé.
+Un job arrêté par le walltime (rc 143 ou 137) ou disparu de la file sans
+durée enregistrée (--jobs: nœud perdu, SIGKILL) est signalé avec le nombre
+de répétitions conservées, s'il a commencé dans les --recent dernières heures.
+
+Usage:
+    python3 progress.py [--jobs ID,ID,...] [--recent H]
+"""
+import argparse
+from datetime import datetime
+import os
+import statistics
+import sys
+import time
+
+from results_store import RESULTS_DIR, compact, connect, create_views, default_db, ingest
+from walltime import CENSORED_RC
+
+
+def fmt_s(s: float) -> str:
+    s = int(max(s, 0))
+    if s >= 3600:
+        return f'{s // 3600}h{s % 3600 // 60:02d}m'
+    if s >= 60:
+        return f'{s // 60}m{s % 60:02d}s'
+    return f'{s}s'
+
+
+def jobs_reps(con) -> dict[tuple[str, str], list[dict]]:
+    """Répétitions reçues par (nœud, job), dans l'ordre d'écriture."""
+    cols = ('node', 'job_id', 'kind', 'mode', 'variant', 'rep', 'repeats', 'run_s', 'job_start', 'params',
+            'timestamp')
+    out: dict[tuple[str, str], list[dict]] = {}
+    for r in con.execute(f'SELECT {", ".join(cols)} FROM v_reps ORDER BY rid'):
+        rec = dict(zip(cols, r))
+        out.setdefault((rec['node'], rec['job_id']), []).append(rec)
+    return out
+
+
+def epoch(ts: str | None) -> float | None:
+    """Date ISO 8601 (date -Iseconds, datetime.isoformat) en secondes epoch."""
+    try:
+        return datetime.fromisoformat(ts).timestamp() if ts else None
+    except ValueError:
+        return None
+
+
+def median_eta(xs: list[float], elapsed: float, scope: str) -> str:
+    med = statistics.median(xs)
+    if elapsed > med:
+        return f'au-delà de la médiane {fmt_s(med)} ({scope}, {len(xs)} jobs)'
+    return f'~{fmt_s(med - elapsed)} (médiane {scope}, {len(xs)} jobs)'
+
+
+def job_eta(con, node: str, kind: str, params: str, elapsed: float) -> str:
+    """ETA du job d'après les durées des jobs réussis de même type et signature."""
+    for where, args, scope in (('AND node = ?', (node,), 'nœud'), ('', (), 'flotte')):
+        xs = [r[0] for r in con.execute(
+            f'SELECT elapsed_s FROM v_jobs WHERE kind = ? AND params = ? AND rc = 0 AND elapsed_s > 0 {where}',
+            (kind, params) + args)]
+        if xs:
+            return median_eta(xs, elapsed, scope)
+    return 'inconnue (aucun job terminé de même signature)'
+
+
+def phase_eta(con, node: str, last: dict, since: float) -> str:
+    """ETA d'une phase commencée (marqueur rep 0) d'après sa durée dans les jobs réussis.
+
+    Durée d'une phase passée: du marqueur au marqueur suivant du même job, ou
+    à la fin du job pour la dernière.
+    """
+    ends = {(n, str(j)): epoch(ts) for n, j, ts in con.execute(
+        'SELECT node, job_id, timestamp FROM v_jobs WHERE kind = ? AND params = ? AND rc = 0',
+        (last['kind'], last['params']))}
+    marks: dict[tuple[str, str], list[tuple]] = {}
+    for n, j, mode, variant, ts in con.execute(
+            'SELECT node, job_id, mode, variant, timestamp FROM v_reps WHERE rep = 0 AND kind = ? AND params = ? '
+            'ORDER BY rid', (last['kind'], last['params'])):
+        if (n, str(j)) in ends:
+            marks.setdefault((n, str(j)), []).append((mode, variant, epoch(ts)))
+    durations: dict[str, list[float]] = {}
+    for key, ms in marks.items():
+        for i, (mode, variant, t0) in enumerate(ms):
+            t1 = ms[i + 1][2] if i + 1 < len(ms) else ends[key]
+            if (mode, variant) == (last['mode'], last['variant']) and t0 is not None and t1 is not None:
+                durations.setdefault(key[0], []).append(t1 - t0)
+    for xs, scope in ((durations.get(node, []), 'nœud'), ([x for v in durations.values() for x in v], 'flotte')):
+        if xs:
+            return median_eta(xs, since, scope)
+    return 'inconnue'
+
+
+def phase(reps: list[dict]) -> str:
+    """Phase courante: « <type> <mode>/<variante> [<rep>/<prévues>] » de la dernière ligne reçue."""
+    last = reps[-1]
+    out = f'{last["kind"]} {last["mode"]}/{last["variant"]}'
+    if last['rep'] and last['repeats']:
+        out += f' {int(last["rep"])}/{int(last["repeats"])}'
+    return out
+
+
+def done(reps: list[dict]) -> int:
+    """Répétitions mesurées (hors marqueurs de début de phase)."""
+    return sum(1 for r in reps if r['rep'])
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description='Progression et ETA des jobs de bench (répétitions reçues).')
+    p.add_argument('--results', default=RESULTS_DIR, help='répertoire des résultats (défaut: results/)')
+    p.add_argument('--db', default=None, help='fichier SQLite (défaut: BENCH_STORE ou results/.store.sqlite)')
+    p.add_argument('--jobs', default=None,
+                   help='identifiants des jobs encore dans la file (squeue); les autres jobs sans durée '
+                        'enregistrée sont signalés disparus')
+    p.add_argument('--recent', type=float, default=24.0,
+                   help='jobs interrompus signalés s\'ils ont commencé dans les H dernières heures (défaut 24)')
+    args = p.parse_args()
+
+    compact(args.results)
+    con = connect(args.db or default_db(args.results))
+    ingest(con, args.results)
+    create_views(con, None, None)
+    ended = {(node, str(job)): int(rc or 0) for node, job, rc in con.execute('SELECT node, job_id, rc FROM v_jobs')}
+    queued = None if args.jobs is None else {j for j in args.jobs.split(',') if j}
+    now = time.time()
+    running, stopped = [], []
+    for (node, job), reps in sorted(jobs_reps(con).items()):
+        rc = ended.get((node, job))
+        if rc is None and (queued is None or job in queued):
+            running.append((node, job, reps))
+        elif (rc in CENSORED_RC or rc is None) and now - (reps[-1]['job_start'] or 0) < args.recent * 3600:
+            stopped.append((node, job, reps, rc))
+
+    print('=== Jobs en cours (répétitions reçues) ===')
+    if not running:
+        print('aucun')
+    for node, job, reps in running:
+        last = reps[-1]
+        elapsed = now - (last['job_start'] or now)
+        if not last['rep']:
+            # phase sans répétition reçue: durée passée d'après l'historique
+            since = now - (epoch(last['timestamp']) or now)
+            eta = f', phase depuis {fmt_s(since)}, ETA phase {phase_eta(con, node, last, since)}'
+        elif last['rep'] < (last['repeats'] or 0):
+            same = [r for r in reps if r['rep'] and
+                    (r['kind'], r['mode'], r['variant']) == (last['kind'], last['mode'], last['variant'])]
+            mean_s = sum(r['run_s'] or 0.0 for r in same) / len(same)
+            eta = f', ETA phase ~{fmt_s(mean_s * (last["repeats"] - last["rep"]))}'
+        else:
+            eta = ''
+        print(f'{node} job {job}: {phase(reps)}, {done(reps)} rép., écoulé {fmt_s(elapsed)}{eta}, '
+              f'ETA job {job_eta(con, node, last["kind"], last["params"], elapsed)}')
+    if stopped:
+        print()
+        print('=== Jobs interrompus (répétitions conservées) ===')
+        for node, job, reps, rc in stopped:
+            why = f'arrêté par le walltime (rc {rc})' if rc is not None else 'disparu de la file sans durée enregistrée'
+            print(f'{node} job {job}: {why}, {done(reps)} répétitions conservées, dernière {phase(reps)}')
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
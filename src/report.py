@@ -0,0 +1,366 @@
+"""Rapport statique (HTML + SVG) des résultats, sans notebook.
+
+Ce script gère:
+- la mise à jour de la base des résultats (compaction du spool puis ingestion
+  incrémentale, voir results_store.py: seules les lignes nouvelles sont lues),
+- un cache du rapport: empreinte des fichiers ingérés (taille, mtime, offset)
+  et des options; rapport régénéré seulement si elle change,
+- les vues du notebook visualisation_runs.ipynb: meilleur run par nœud,
+  distributions, évolution dans le temps, corrélations entre backends,
+- l'écriture de report/index.html et d'un fichier SVG par figure (aucune
+  dépendance hors bibliothèque standard).
+
+Usage:
+    python3 report.py [--results DIR] [--out DIR] [--max-contam PCT] [--force]
+"""
+import argparse
+import hashlib
+import html
+import math
+import os
+import sys
+from datetime import datetime
+
+from results_store import RESULTS_DIR, compact, connect, create_views, default_db, ingest
+
+REPORT_DIR = os.path.join(os.path.dirname(RESULTS_DIR), 'report')
+PALETTE = ['#4C78A8', '#F58518', '#54A24B', '#E45756', '#72B7B2', '#EECA3B',
+           '#B279A2', '#FF9DA6', '#9D755D', '#BAB0AC', '#2F4B7C', '#A05195']
+FONT = 'font-family="sans-serif" font-size="11"'
+
+
+# ---------------------------------------------------------------------------
+# Figures SVG
+# ---------------------------------------------------------------------------
+
+def _fmt(v: float) -> str:
+    """Valeur courte pour les axes (1.2e+08 -> 120M)."""
+    for div, suf in ((1e12, 'T'), (1e9, 'G'), (1e6, 'M'), (1e3, 'k')):
+        if abs(v) >= div:
+            return f'{v / div:.3g}{suf}'
+    return f'{v:.3g}'
+
+
+def _ticks(lo: float, hi: float, n: int = 5) -> list[float]:
+    if hi <= lo:
+        return [lo]
+    step = 10 ** math.floor(math.log10((hi - lo) / n))
+    for m in (1, 2, 5, 10):
+        if (hi - lo) / (step * m) <= n:
+            step *= m
+            break
+    start = math.ceil(lo / step) * step
+    return [start + i * step for i in range(int((hi - start) / step) + 1)]
+
+
+def _svg(width: int, height: int, title: str, body: list[str]) -> str:
+    return '\n'.join([
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">',
+        '<rect width="100%" height="100%" fill="white"/>',
+        f'<text x="{width / 2}" y="16" text-anchor="middle" font-family="sans-serif" font-size="13" '
+        f'font-weight="bold">{html.escape(title)}</text>',
+        *body, '</svg>'])
+
+
+def _legend(names: list[str], x: float, y: float) -> list[str]:
+    out = []
+    for i, n in enumerate(names):
+        out.append(f'<rect x="{x}" y="{y + i * 14 - 8}" width="10" height="10" fill="{PALETTE[i % len(PALETTE)]}"/>')
+        out.append(f'<text x="{x + 14}" y="{y + i * 14}" {FONT}>{html.escape(n)}</text>')
+    return out
+
+
+def svg_bars(title: str, items: list[tuple[str, float, float]], unit: str) -> str:
+    """Barres horizontales (libellé, valeur, écart-type), triées par valeur décroissante."""
+    items = sorted(items, key=lambda x: -x[1])
+    left, right, top, row = 140, 30, 30, 16
+    width = 720
+    height = top + row * len(items) + 30
+    vmax = max((v + (s or 0) for _, v, s in items), default=1.0) or 1.0
+    scale = (width - left - right) / vmax
+    body = []
+    for t in _ticks(0, vmax):
+        x = left + t * scale
+        body.append(f'<line x1="{x:.1f}" y1="{top}" x2="{x:.1f}" y2="{height - 25}" stroke="#ddd"/>')
+        body.append(f'<text x="{x:.1f}" y="{height - 12}" text-anchor="middle" {FONT}>{_fmt(t)}</text>')
+    for i, (label, v, s) in enumerate(items):
+        y = top + i * row
+        body.append(f'<text x="{left - 6}" y="{y + 11}" text-anchor="end" {FONT}>{html.escape(label)}</text>')
+        body.append(f'<rect x="{left}" y="{y + 2}" width="{max(v * scale, 0):.1f}" height="{row - 4}" fill="{PALETTE[0]}">'
+                    f'<title>{html.escape(label)}: {v:.3f} ± {s or 0:.3f} {html.escape(unit)}</title></rect>')
+        if s:
+            x1, x2 = left + max(v - s, 0) * scale, left + (v + s) * scale
+            body.append(f'<line x1="{x1:.1f}" y1="{y + row / 2}" x2="{x2:.1f}" y2="{y + row / 2}" stroke="#333"/>')
+    body.append(f'<text x="{width - right}" y="{height - 12}" text-anchor="end" {FONT}>{html.escape(unit)}</text>')
+    return _svg(width, height, title, body)
+
+
+def svg_hist(title: str, series: dict[str, list[float]], unit: str, bins: int = 20) -> str:
+    """Histogrammes superposés (densité par série, contour en escalier)."""
+    allv = [v for vs in series.values() for v in vs]
+    lo, hi = min(allv), max(allv)
+    if hi <= lo:
+        hi = lo + 1.0
+    width, height, left, right, top, bottom = 720, 300, 50, 160, 30, 30
+    w = (hi - lo) / bins
+    dens = {}
+    for name, vs in series.items():
+        counts = [0] * bins
+        for v in vs:
+            counts[min(int((v - lo) / w), bins - 1)] += 1
+        dens[name] = [c / len(vs) for c in counts]
+    dmax = max(max(d) for d in dens.values()) or 1.0
+    sx = (width - left - right) / (hi - lo)
+    sy = (height - top - bottom) / dmax
+    body = []
+    for t in _ticks(lo, hi):
+        x = left + (t - lo) * sx
+        body.append(f'<line x1="{x:.1f}" y1="{top}" x2="{x:.1f}" y2="{height - bottom}" stroke="#eee"/>')
+        body.append(f'<text x="{x:.1f}" y="{height - bottom + 14}" text-anchor="middle" {FONT}>{_fmt(t)}</text>')
+    for i, (name, d) in enumerate(dens.items()):
+        pts = [f'{left:.1f},{height - bottom}']
+        for b, f in enumerate(d):
+            x0, x1 = left + b * w * sx, left + (b + 1) * w * sx
+            y = height - bottom - f * sy
+            pts += [f'{x0:.1f},{y:.1f}', f'{x1:.1f},{y:.1f}']
+        pts.append(f'{width - right:.1f},{height - bottom}')
+        c = PALETTE[i % len(PALETTE)]
+        body.append(f'<polyline points="{" ".join(pts)}" fill="{c}" fill-opacity="0.25" stroke="{c}"/>')
+    body.append(f'<line x1="{left}" y1="{height - bottom}" x2="{width - right}" y2="{height - bottom}" stroke="#333"/>')
+    body.append(f'<text x="{width - right}" y="{height - 4}" text-anchor="end" {FONT}>{html.escape(unit)}</text>')
+    body += _legend(list(dens), width - right + 10, top + 10)
+    return _svg(width, height, title, body)
+
+
+def svg_lines(title: str, series: dict[str, list[tuple[float, float]]], unit: str) -> str:
+    """Courbes (horodatage epoch, valeur) par série."""
+    xs = [t for pts in series.values() for t, _ in pts]
+    ys = [v for pts in series.values() for _, v in pts]
+    x0, x1 = min(xs), max(xs)
+    if x1 <= x0:
+        x1 = x0 + 86400
+    y0, y1 = 0.0, max(ys) * 1.05 or 1.0
+    width, height, left, right, top, bottom = 720, 320, 60, 160, 30, 40
+    sx = (width - left - right) / (x1 - x0)
+    sy = (height - top - bottom) / (y1 - y0)
+    body = []
+    for t in _ticks(y0, y1):
+        y = height - bottom - (t - y0) * sy
+        body.append(f'<line x1="{left}" y1="{y:.1f}" x2="{width - right}" y2="{y:.1f}" stroke="#eee"/>')
+        body.append(f'<text x="{left - 4}" y="{y + 4:.1f}" text-anchor="end" {FONT}>{_fmt(t)}</text>')
+    for k in range(5):
+        t = x0 + k * (x1 - x0) / 4
+        x = left + (t - x0) * sx
+        body.append(f'<text x="{x:.1f}" y="{height - bottom + 14}" text-anchor="middle" {FONT}>'
+                    f'{datetime.fromtimestamp(t).strftime("%Y-%m-%d")}</text>')
+    for i, (name, pts) in enumerate(series.items()):
+        c = PALETTE[i % len(PALETTE)]
+        path = ' '.join(f'{left + (t - x0) * sx:.1f},{height - bottom - (v - y0) * sy:.1f}' for t, v in sorted(pts))
+        body.append(f'<polyline points="{path}" fill="none" stroke="{c}" stroke-width="1.5"/>')
+        for t, v in pts:
+            body.append(f'<circle cx="{left + (t - x0) * sx:.1f}" cy="{height - bottom - (v - y0) * sy:.1f}" r="2" fill="{c}">'
+                        f'<title>{html.escape(name)} {datetime.fromtimestamp(t).isoformat(timespec="minutes")}: {v:.3f}</title></circle>')
+    body.append(f'<line x1="{left}" y1="{height - bottom}" x2="{width - right}" y2="{height - bottom}" stroke="#333"/>')
+    body.append(f'<text x="{left}" y="{top - 4}" {FONT}>{html.escape(unit)}</text>')
+    body += _legend(list(series), width - right + 10, top + 10)
+    return _svg(width, height, title, body)
+
+
+# ---------------------------------------------------------------------------
+# Données
+# ---------------------------------------------------------------------------
+
+def _epoch(ts: str | None) -> float | None:
+    try:
+        return datetime.fromisoformat(ts).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def _pearson(a: list[float], b: list[float]) -> float | None:
+    n = len(a)
+    if n < 3:
+        return None
+    ma, mb = sum(a) / n, sum(b) / n
+    sab = sum((x - ma) * (y - mb) for x, y in zip(a, b))
+    saa = sum((x - ma) ** 2 for x in a)
+    sbb = sum((y - mb) ** 2 for y in b)
+    return sab / math.sqrt(saa * sbb) if saa > 0 and sbb > 0 else None
+
+
+def _best(con, table: str, key_sql: str, where: str) -> dict[str, list[tuple[str, float, float]]]:
+    """Meilleur run par nœud pour chaque clé (mode, backend + mode)."""
+    out: dict[str, list] = {}
+    sql = (f'SELECT k, node, v, s FROM (SELECT {key_sql} AS k, node, avg_events_per_s AS v, stddev_events_per_s AS s, '
+           f'ROW_NUMBER() OVER (PARTITION BY {key_sql}, node ORDER BY avg_events_per_s DESC) AS rn '
+           f'FROM {table} WHERE {where}) WHERE rn = 1 ORDER BY k, v DESC')
+    for k, node, v, s in con.execute(sql):
+        out.setdefault(k, []).append((node, v, s))
+    return out
+
+
+def fingerprint(con, args) -> str:
+    """Empreinte des données ingérées et des options du rapport."""
+    h = hashlib.sha1()
+    for row in con.execute('SELECT path, size, mtime_ns, offset FROM files ORDER BY path'):
+        h.update(repr(row).encode())
+    h.update(repr((args.max_contam, args.max_nodes)).encode())
+    return h.hexdigest()
+
+
+def build(con, out_dir: str, max_nodes: int) -> list[str]:
+    """Écrit les SVG et index.html; retourne la liste des figures."""
+    sections: list[tuple[str, list[str]]] = []
+    figs: list[str] = []
+
+    def fig(name: str, svg: str) -> str:
+        path = os.path.join(out_dir, name)
+        tmp = f'{path}.tmp.{os.getpid()}'
+        with open(tmp, 'w') as f:
+            f.write(svg)
+        os.replace(tmp, path)
+        figs.append(name)
+        return f'<img src="{html.escape(name)}" alt="{html.escape(name)}">'
+
+    def table(head: list[str], rows: list[list[str]]) -> str:
+        th = ''.join(f'<th>{html.escape(h)}</th>' for h in head)
+        trs = ''.join('<tr>' + ''.join(f'<td>{c}</td>' for c in r) + '</tr>' for r in rows)
+        return f'<table><tr>{th}</tr>{trs}</table>'
+
+    # 1. Meilleur run par nœud
+    parts = []
+    best_cpu = _best(con, 'v_cpu', 'mode', "mode IN ('mono', 'multi')")
+    best_gpu = _best(con, 'v_gpu', "backend || ' ' || mode", 'backend IS NOT NULL')
+    for k, items in list(best_cpu.items()) + list(best_gpu.items()):
+        kind = 'CPU' if k in best_cpu else 'GPU'
+        slug = f'best_{kind.lower()}_{k.replace(" ", "_")}.svg'
+        parts.append(fig(slug, svg_bars(f'{kind} {k} — meilleur run par nœud', items, 'events/s')))
+        parts.append(table(['#', 'nœud', 'events/s', 'écart-type'],
+                           [[str(i), html.escape(n), f'{v:.3f}', f'{s or 0:.3f}'] for i, (n, v, s) in enumerate(items, 1)]))
+    sections.append(('Meilleur run par nœud', parts))
+
+    # 2. Distributions (toutes les runs)
+    parts = []
+    dist_cpu: dict[str, list[float]] = {}
+    for m, v in con.execute("SELECT mode, avg_events_per_s FROM v_cpu WHERE avg_events_per_s > 0 AND mode IN ('mono', 'multi')"):
+        dist_cpu.setdefault(m, []).append(v)
+    for m, vs in sorted(dist_cpu.items()):
+        parts.append(fig(f'dist_cpu_{m}.svg', svg_hist(f'CPU {m} — distribution des runs ({len(vs)})', {m: vs}, 'events/s')))
+    dist_gpu: dict[str, list[float]] = {}
+    for k, v in con.execute("SELECT backend || ' ' || mode, avg_events_per_s FROM v_gpu WHERE avg_events_per_s > 0"):
+        dist_gpu.setdefault(k, []).append(v)
+    if dist_gpu:
+        parts.append(fig('dist_gpu.svg', svg_hist('GPU — distribution des runs par backend', dist_gpu, 'events/s')))
+    sections.append(('Distributions', parts))
+
+    # 3. Évolution dans le temps (CPU multi, nœuds les plus mesurés)
+    parts = []
+    evo: dict[str, list[tuple[float, float]]] = {}
+    for node, v, ts in con.execute("SELECT node, avg_events_per_s, timestamp FROM v_cpu WHERE mode = 'multi' ORDER BY rid"):
+        t = _epoch(ts)
+        if t is not None and v:
+            evo.setdefault(node, []).append((t, v))
+    if evo:
+        keep = sorted(evo, key=lambda n: (-len(evo[n]), n))[:max_nodes]
+        parts.append(fig('evolution_cpu_multi.svg',
+                         svg_lines(f'CPU multi — évolution ({len(keep)}/{len(evo)} nœuds les plus mesurés)',
+                                   {n: evo[n] for n in sorted(keep)}, 'events/s')))
+    evo_gpu: dict[str, list[tuple[float, float]]] = {}
+    for node, be, v, ts in con.execute("SELECT node, backend, avg_events_per_s, timestamp FROM v_gpu WHERE mode = 'mono' ORDER BY rid"):
+        t = _epoch(ts)
+        if t is not None and v:
+            evo_gpu.setdefault(f'{node} {be}', []).append((t, v))
+    if evo_gpu:
+        keep = sorted(evo_gpu, key=lambda n: (-len(evo_gpu[n]), n))[:max_nodes]
+        parts.append(fig('evolution_gpu_mono.svg', svg_lines('GPU mono — évolution par nœud et backend',
+                                                             {n: evo_gpu[n] for n in sorted(keep)}, 'events/s')))
+    sections.append(('Évolution dans le temps', parts))
+
+    # 4. Corrélations entre backends (meilleur run par nœud, CPU multi inclus)
+    parts = []
+    cols: dict[str, dict[str, float]] = {}
+    for k, items in best_gpu.items():
+        cols[k] = {n: v for n, v, _ in items}
+    if 'multi' in best_cpu and cols:
+        cols['cpu multi'] = {n: v for n, v, _ in best_cpu['multi']}
+    names = sorted(cols)
+    if len(names) >= 2:
+        rows = []
+        for a in names:
+            row = [html.escape(a)]
+            for b in names:
+                common = sorted(set(cols[a]) & set(cols[b]))
+                r = _pearson([cols[a][n] for n in common], [cols[b][n] for n in common])
+                if r is None:
+                    row.append('-')
+                else:
+                    c = f'rgba(228,87,86,{abs(r):.2f})' if r < 0 else f'rgba(76,120,168,{abs(r):.2f})'
+                    row.append(f'<span style="background:{c};padding:2px 6px">{r:+.2f}</span> <small>({len(common)})</small>')
+            rows.append(row)
+        parts.append('<p>Coefficient de Pearson entre meilleurs runs par nœud (nombre de nœuds communs entre parenthèses, au moins 3).</p>')
+        parts.append(table([''] + names, rows))
+    else:
+        parts.append('<p>Moins de deux backends mesurés : pas de corrélation.</p>')
+    sections.append(('Corrélations entre backends', parts))
+
+    n_cpu = con.execute('SELECT COUNT(*), COUNT(DISTINCT node) FROM v_cpu').fetchone()
+    n_gpu = con.execute('SELECT COUNT(*), COUNT(DISTINCT node) FROM v_gpu').fetchone()
+    page = [
+        '<!DOCTYPE html>', '<html lang="fr"><head><meta charset="utf-8"><title>Rapport bench Slurm</title>',
+        '<style>body{font-family:sans-serif;margin:2em;max-width:1000px}table{border-collapse:collapse;margin:1em 0}'
+        'td,th{border:1px solid #ccc;padding:3px 8px;text-align:right}img{display:block;margin:1em 0}</style></head><body>',
+        '<h1>Rapport bench Slurm</h1>',
+        f'<p>Généré le {datetime.now().isoformat(timespec="seconds")} — CPU : {n_cpu[0]} runs sur {n_cpu[1]} nœuds ; '
+        f'GPU : {n_gpu[0]} runs sur {n_gpu[1]} nœuds.</p>',
+    ]
+    for title, parts in sections:
+        page.append(f'<h2>{html.escape(title)}</h2>')
+        page += parts or ['<p>Aucune donnée.</p>']
+    page.append('</body></html>')
+    path = os.path.join(out_dir, 'index.html')
+    tmp = f'{path}.tmp.{os.getpid()}'
+    with open(tmp, 'w') as f:
+        f.write('\n'.join(page) + '\n')
+    os.replace(tmp, path)
+    return figs
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description='Rapport HTML statique des résultats CPU/GPU.')
+    p.add_argument('--results', default=RESULTS_DIR, help='répertoire des CSV (défaut: results/)')
+    p.add_argument('--out', default=REPORT_DIR, help='répertoire du rapport (défaut: report/)')
+    p.add_argument('--db', default=None, help='fichier SQLite (défaut: BENCH_STORE ou results/.store.sqlite)')
+    p.add_argument('--max-contam', type=float, default=None, help='contamination maximale (%%)')
+    p.add_argument('--max-nodes', type=int, default=12, help='nœuds tracés dans les courbes d\'évolution (défaut 12)')
+    p.add_argument('--force', action='store_true', help='régénérer même si les données n\'ont pas changé')
+    p.add_argument('--verbose', action='store_true')
+    args = p.parse_args()
+
+    results_dir = os.path.abspath(args.results)
+    compact(results_dir, verbose=args.verbose)
+    con = connect(args.db or default_db(results_dir))
+    added = ingest(con, results_dir, args.verbose)
+    if args.verbose:
+        print(f'[report] {added} lignes nouvelles ingérées', file=sys.stderr)
+    os.makedirs(args.out, exist_ok=True)
+    stamp_path = os.path.join(args.out, '.stamp')
+    stamp = fingerprint(con, args)
+    index = os.path.join(args.out, 'index.html')
+    if not args.force and os.path.exists(index):
+        try:
+            with open(stamp_path) as f:
+                if f.read().strip() == stamp:
+                    print(f'[report] rapport à jour: {index}')
+                    return 0
+        except FileNotFoundError:
+            pass
+    create_views(con, None, args.max_contam)
+    figs = build(con, args.out, args.max_nodes)
+    with open(stamp_path, 'w') as f:
+        f.write(stamp + '\n')
+    print(f'[report] {index} ({len(figs)} figures)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
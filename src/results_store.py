@@ -0,0 +1,803 @@
+"""Stockage indexé des résultats et classements du « top ».
+
+Ce module gère:
+- le spool des jobs: chaque job écrit ses lignes dans son propre fichier
+  results/spool/<nœud>_<job>.jsonl (enregistrements JSON, fichier réécrit puis
+  renommé à chaque ajout: jamais de ligne tronquée ni d'écrivains concurrents;
+  les répétitions de mesure y sont écrites dès qu'elles se terminent, famille
+  « reps », et survivent à un job tué),
+- la compaction du spool dans les CSV canoniques results/<famille>_<nœud>.csv
+  (un seul compacteur à la fois, lignes déjà présentes ignorées),
+- l'ingestion incrémentale des CSV results/<famille>_<nœud>.csv dans une base
+  SQLite locale (offset, taille, mtime et inode mémorisés par fichier: seules
+  les lignes ajoutées depuis la dernière ingestion sont lues; un fichier
+  réécrit, tronqué ou dont l'en-tête a changé est réingéré entièrement),
+- une table par famille (cpu, gpu, mem, flops, ...), colonnes ajoutées au fil
+  des schémas, index sur le nœud et le mode,
+- les classements du « top » (unique, unique-last, top10, by-node-mean,
+  by-build), chacun répondu par une requête SQL,
+- la détection de régressions (« regress »): dernier résultat de chaque nœud
+  comparé à son historique et aux nœuds de même classe matérielle.
+
+Usage:
+    python3 results_store.py compact [--wait]
+    python3 results_store.py pending
+    python3 results_store.py ingest [--results DIR] [--db FICHIER]
+    python3 results_store.py top [--mode M] [--build B] [--max-contam PCT]
+    python3 results_store.py regress [--threshold PCT] [--days D]
+    python3 results_store.py sql "SELECT ..."
+
+La base est results/.store.sqlite par défaut (BENCH_STORE pour la déplacer,
+par exemple hors d'un système de fichiers partagé).
+"""
+import argparse
+import csv
+import fcntl
+import io
+import json
+import math
+import os
+import re
+import socket
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'results')
+
+# En-têtes courants des familles (colonnes toujours présentes dans la base,
+# même si aucun fichier ne les contient encore). Les colonnes listées dans
+# TEXT_COLUMNS ont l'affinité TEXT, les autres REAL (SQLite convertit les
+# valeurs numériques et laisse le reste en texte).
+SCHEMAS = {
+    'cpu': 'node,mode,threads,runs,duration_s,avg_events_per_s,stddev_events_per_s,min_events_per_s,'
+           'max_events_per_s,median_events_per_s,p5_events_per_s,p95_events_per_s,robust_mean_events_per_s,'
+           'work_iters,build,compiler,isa,cflags,counters,ipc,cache_mpki,branch_mpki,eff_mhz,'
+           'stall_frontend_pct,stall_backend_pct,governor,freq_mhz,pkg_w,events_per_j,pkg_limit_w,'
+           'series_ms,drop_pct,cv_pct,throttle_s,series_file,load1,steal_pct,foreign_cpu_pct,foreign_top,'
+           'contamination,hw_class,timestamp',
+    'gpu': 'node,backend,mode,nb_gpu,runs,duration_s,avg_events_per_s,stddev_events_per_s,min_events_per_s,'
+           'max_events_per_s,vram_total_MB,vram_used_MB,vram_used_pct,heterogeneous,load1,steal_pct,'
+           'foreign_cpu_pct,foreign_gpu_procs,contamination,timestamp',
+    'mem': 'node,kernel,mode,threads,size_bytes,runs,avg_GBps,stddev_GBps,min_GBps,max_GBps,median_GBps,'
+           'p5_GBps,p95_GBps,robust_mean_GBps,contamination,timestamp',
+    'lat': 'node,size_bytes,ns_per_load,hugepages,timestamp',
+    'flops': 'node,isa,precision,mode,threads,runs,avg_GFLOPs,stddev_GFLOPs,min_GFLOPs,max_GFLOPs,'
+             'median_GFLOPs,p5_GFLOPs,p95_GFLOPs,robust_mean_GFLOPs,contamination,timestamp',
+    'work': 'node,workload,variant,mode,threads,size_bytes,unit,runs,avg,stddev,min,max,median,p5,p95,'
+            'robust_mean,blas_lib,contamination,timestamp',
+    'numa': 'node,cpu_node,mem_node,GBps,ns_per_load,bw_ratio_local,lat_ratio_local,placement,threads,'
+            'numa_nodes,sockets,timestamp',
+    'cores': 'node,cpu,thread,core_type,events_per_s,type_median_events_per_s,deficit_pct,slow,'
+             'slow_threshold_pct,timestamp',
+    'scaling': 'node,kernel,threads,score,speedup,efficiency,unit,size_bytes,timestamp',
+    'jobs': 'node,kind,params,class,shape,elapsed_s,rc,job_id,timestamp',
+    'reps': 'node,job_id,kind,mode,variant,rep,repeats,score,run_s,job_start,params,timestamp',
+}
+TEXT_COLUMNS = {
+    'node', 'mode', 'build', 'compiler', 'isa', 'cflags', 'counters', 'governor', 'series_file',
+    'foreign_top', 'timestamp', 'backend', 'kernel', 'workload', 'variant', 'unit', 'blas_lib',
+    'core_type', 'placement', 'precision', 'hw_class', 'kind', 'params', 'class', 'job_id',
+}
+# Colonnes indexées quand la famille les possède
+INDEXED = ('node', 'mode')
+
+FILE_RE = re.compile(r'^(%s)_(.+)\.csv$' % '|'.join(SCHEMAS))
+NODE_RE = re.compile(r'^[A-Za-z0-9._-]+$')
+# Un fichier de spool entièrement compacté n'est supprimé qu'après ce délai
+# sans modification (le job peut encore y ajouter des lignes)
+SPOOL_GRACE_S = 600
+
+
+# ---------------------------------------------------------------------------
+# Spool par job et compaction
+# ---------------------------------------------------------------------------
+
+def job_id() -> str:
+    """Identifiant du job courant: SLURM_JOB_ID, sinon local-<horodatage>-<pid>."""
+    return os.environ.get('SLURM_JOB_ID') or f"local-{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+
+def spool_path(results_dir: str, node: str, job: str) -> str:
+    return os.path.join(results_dir, 'spool', f'{node}_{job}.jsonl')
+
+
+def spool_append(path: str, job: str, family: str, header: str, lines: list[str]) -> None:
+    """Ajoute des lignes CSV au fichier de spool d'un job (réécriture + renommage atomique)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cols = header.split(',')
+    meta = {'job_id': job,
+            'host': socket.gethostname().split('.')[0], 'pid': os.getpid(),
+            'written': datetime.now().isoformat(timespec='seconds')}
+    try:
+        with open(path, 'rb') as f:
+            old = f.read()
+    except FileNotFoundError:
+        old = b''
+    tmp = f'{path}.tmp.{os.getpid()}'
+    with open(tmp, 'wb') as f:
+        f.write(old)
+        for line in lines:
+            vals = line.rstrip('\n').split(',')
+            rec = {'family': family, 'node': vals[0], **meta, 'columns': cols, 'values': vals}
+            f.write((json.dumps(rec, ensure_ascii=False) + '\n').encode())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _merged_header(old: list[str], new: list[str]) -> list[str]:
+    """En-tête commun: le plus récent s'il contient l'ancien, sinon l'ancien
+    complété des colonnes nouvelles (avant timestamp)."""
+    if set(old) <= set(new):
+        return new
+    extra = [c for c in new if c not in old]
+    if not extra:
+        return old
+    if old and old[-1] == 'timestamp':
+        return old[:-1] + extra + ['timestamp']
+    return old + extra
+
+
+def _merge_csv(csv_path: str, recs: list[tuple[list[str], list[str]]], clean: int | None = None) -> tuple[int, int]:
+    """Ajoute des enregistrements (colonnes, valeurs) à un CSV canonique.
+
+    Les colonnes sont alignées par nom; un en-tête élargi réécrit le fichier
+    (tmp + renommage), sinon les lignes sont ajoutées en fin de fichier. Les
+    lignes déjà présentes (compaction interrompue, fichier de spool relu) sont
+    ignorées: seule la fin du fichier au-delà de `clean` (taille mémorisée par
+    le ledger après la dernière compaction complète) est relue, le fichier
+    entier si elle est inconnue ou incohérente. Retourne le nombre de lignes
+    écrites et la nouvelle taille du fichier.
+    """
+    old_header: list[str] = []
+    tail: list[list[str]] = []
+    head_len = 0
+    if os.path.exists(csv_path):
+        with open(csv_path, 'rb') as f:
+            first = f.readline()
+            head_len = len(first)
+            old_header = first.decode('utf-8', 'replace').rstrip('\n').split(',') if first.strip() else []
+            size = os.fstat(f.fileno()).st_size
+            f.seek(clean if clean is not None and head_len <= clean <= size else head_len)
+            tail = [l.split(',') for l in f.read().decode('utf-8', 'replace').split('\n') if l.strip()]
+    header = old_header
+    for cols, _ in recs:
+        header = _merged_header(header, cols)
+    def fmt(cols, vals):
+        v = dict(zip(cols, vals))
+        return ','.join(v.get(c, '') for c in header)
+    if header != old_header and os.path.exists(csv_path):
+        # en-tête élargi: tout le fichier est relu et réécrit
+        with open(csv_path, 'r') as f:
+            f.readline()
+            tail = [l.rstrip('\n').split(',') for l in f if l.strip()]
+    existing = [fmt(old_header, r) for r in tail]
+    seen = set(existing)
+    new_lines = []
+    for cols, vals in recs:
+        line = fmt(cols, vals)
+        if line not in seen:
+            seen.add(line)
+            new_lines.append(line)
+    if header != old_header:
+        tmp = f'{csv_path}.tmp.{os.getpid()}'
+        with open(tmp, 'w') as f:
+            f.write(','.join(header) + '\n')
+            f.writelines(l + '\n' for l in existing + new_lines)
+        os.replace(tmp, csv_path)
+    elif new_lines:
+        with open(csv_path, 'a') as f:
+            f.write(''.join(l + '\n' for l in new_lines))
+    return len(new_lines), os.path.getsize(csv_path)
+
+
+def _read_ledger(ledger_path: str) -> tuple[dict[str, int], dict[str, int]]:
+    """spool/.ledger: enregistrements fusionnés par fichier de spool, taille des CSV."""
+    ledger: dict[str, int] = {}
+    clean: dict[str, int] = {}
+    try:
+        with open(ledger_path) as f:
+            for line in f:
+                name, _, n = line.strip().rpartition(' ')
+                if name and n.isdigit():
+                    (clean if name.endswith('.csv') else ledger)[name] = int(n)
+    except FileNotFoundError:
+        pass
+    return ledger, clean
+
+
+def spool_pending(results_dir: str) -> int:
+    """Fichiers de spool ayant des enregistrements complets pas encore fusionnés.
+
+    Les fichiers entièrement fusionnés qui attendent SPOOL_GRACE_S avant leur
+    suppression ne sont pas comptés.
+    """
+    spool = os.path.join(results_dir, 'spool')
+    ledger, _ = _read_ledger(os.path.join(spool, '.ledger'))
+    try:
+        names = [n for n in os.listdir(spool) if n.endswith('.jsonl')]
+    except OSError:
+        return 0
+    n = 0
+    for name in names:
+        try:
+            with open(os.path.join(spool, name), 'rb') as f:
+                records = f.read().count(b'\n')
+        except OSError:
+            continue
+        if ledger.get(name, 0) != records:
+            n += 1
+    return n
+
+
+def compact(results_dir: str, wait: bool = False, verbose: bool = False) -> int:
+    """Fusionne le spool dans les CSV canoniques; retourne le nombre de lignes écrites.
+
+    Un seul compacteur à la fois (flock sur spool/.compact.lock): sans --wait,
+    l'appel est sauté si une compaction est déjà en cours. spool/.ledger
+    mémorise le nombre d'enregistrements déjà fusionnés par fichier de spool
+    et la taille de chaque CSV canonique après la dernière compaction: seules
+    les lignes écrites au-delà sont relues pour écarter les doublons.
+    """
+    spool = os.path.join(results_dir, 'spool')
+    if not os.path.isdir(spool):
+        return 0
+    lock = open(os.path.join(spool, '.compact.lock'), 'a')
+    try:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return 0
+        ledger_path = os.path.join(spool, '.ledger')
+        ledger, clean = _read_ledger(ledger_path)
+        pending: dict[tuple[str, str], list] = {}
+        consumed = {}
+        for name in sorted(os.listdir(spool)):
+            if not name.endswith('.jsonl'):
+                continue
+            path = os.path.join(spool, name)
+            try:
+                st = os.stat(path)
+                with open(path, 'rb') as f:
+                    lines = f.read().split(b'\n')
+            except OSError:
+                continue
+            lines = lines[:-1]  # dernière ligne complète terminée par \n
+            done = ledger.get(name, 0)
+            if done > len(lines):
+                done = 0  # fichier recréé (job relancé avec le même identifiant)
+            for raw in lines[done:]:
+                try:
+                    rec = json.loads(raw)
+                    fam, node = rec['family'], rec['node']
+                    cols, vals = rec['columns'], rec['values']
+                except (ValueError, KeyError, TypeError):
+                    print(f'[compact] enregistrement illisible ignoré dans {name}', file=sys.stderr)
+                    continue
+                if fam not in SCHEMAS or not NODE_RE.match(str(node)):
+                    continue
+                pending.setdefault((fam, node), []).append(([str(c) for c in cols], [str(v) for v in vals]))
+            consumed[name] = (len(lines), st.st_mtime_ns, st.st_ino)
+        written = 0
+        for (fam, node), recs in sorted(pending.items()):
+            csv_name = f'{fam}_{node}.csv'
+            n, clean[csv_name] = _merge_csv(os.path.join(results_dir, csv_name), recs, clean.get(csv_name))
+            written += n
+            if verbose and n:
+                print(f'[compact] {fam}_{node}.csv: +{n} lignes', file=sys.stderr)
+        # fichiers inactifs depuis SPOOL_GRACE_S et entièrement fusionnés: supprimés
+        now = time.time_ns()
+        keep = {}
+        for name, (n, mtime_ns, ino) in consumed.items():
+            path = os.path.join(spool, name)
+            try:
+                st = os.stat(path)
+                if (now - mtime_ns) / 1e9 > SPOOL_GRACE_S and st.st_mtime_ns == mtime_ns and st.st_ino == ino:
+                    os.unlink(path)
+                    continue
+            except OSError:
+                continue
+            keep[name] = n
+        keep.update((name, size) for name, size in clean.items() if os.path.exists(os.path.join(results_dir, name)))
+        tmp = f'{ledger_path}.tmp.{os.getpid()}'
+        with open(tmp, 'w') as f:
+            f.writelines(f'{name} {n}\n' for name, n in sorted(keep.items()))
+        os.replace(tmp, ledger_path)
+        return written
+    finally:
+        lock.close()
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Ouvre (et initialise au besoin) la base de résultats."""
+    con = sqlite3.connect(db_path, timeout=60)
+    con.execute('CREATE TABLE IF NOT EXISTS files ('
+                'id INTEGER PRIMARY KEY, path TEXT UNIQUE, family TEXT, header TEXT, '
+                'offset INTEGER, size INTEGER, mtime_ns INTEGER, inode INTEGER)')
+    for family, header in SCHEMAS.items():
+        _ensure_table(con, family, header.split(','))
+    return con
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _table_columns(con: sqlite3.Connection, table: str) -> list[str]:
+    return [r[1] for r in con.execute(f'PRAGMA table_info({_quote(table)})')]
+
+
+def _ensure_table(con: sqlite3.Connection, family: str, cols: list[str]) -> None:
+    """Crée la table d'une famille ou lui ajoute les colonnes manquantes."""
+    def decl(c):
+        return f'{_quote(c)} {"TEXT" if c in TEXT_COLUMNS else "REAL"}'
+    have = _table_columns(con, family)
+    if not have:
+        body = ', '.join(['file_id INTEGER'] + [decl(c) for c in cols if c])
+        con.execute(f'CREATE TABLE {_quote(family)} ({body})')
+        con.execute(f'CREATE INDEX IF NOT EXISTS {_quote(family + "_file")} ON {_quote(family)} (file_id)')
+        have = _table_columns(con, family)
+    for c in cols:
+        if c and c not in have:
+            con.execute(f'ALTER TABLE {_quote(family)} ADD COLUMN {decl(c)}')
+            have.append(c)
+    idx = [c for c in INDEXED if c in have]
+    if idx:
+        name = family + '_' + '_'.join(idx)
+        con.execute(f'CREATE INDEX IF NOT EXISTS {_quote(name)} ON {_quote(family)} '
+                    f'({", ".join(_quote(c) for c in idx)})')
+
+
+def _ingest_file(con: sqlite3.Connection, path: str, family: str, known: dict | None) -> int:
+    """Ingère les lignes nouvelles d'un CSV; retourne le nombre de lignes ajoutées."""
+    st = os.stat(path)
+    if known and known['mtime_ns'] == st.st_mtime_ns and known['size'] == st.st_size \
+            and known['inode'] == st.st_ino:
+        return 0
+    with open(path, 'rb') as f:
+        header_raw = f.readline()
+        if not header_raw.endswith(b'\n'):
+            return 0  # en-tête en cours d'écriture
+        header = header_raw.decode('utf-8', 'replace').rstrip('\r\n')
+        full = (known is None or known['header'] != header or known['inode'] != st.st_ino
+                or st.st_size < known['offset'])
+        start = len(header_raw) if full else known['offset']
+        f.seek(start)
+        data = f.read()
+    # lignes complètes seulement: une ligne en cours d'écriture sera lue au prochain passage
+    end = data.rfind(b'\n') + 1
+    chunk = data[:end].decode('utf-8', 'replace')
+    cols = header.split(',')
+    _ensure_table(con, family, cols)
+    if known is None:
+        cur = con.execute('INSERT INTO files (path, family, header, offset, size, mtime_ns, inode) '
+                          'VALUES (?, ?, ?, 0, 0, 0, 0)', (path, family, header))
+        file_id = cur.lastrowid
+    else:
+        file_id = known['id']
+    if full:
+        con.execute(f'DELETE FROM {_quote(family)} WHERE file_id = ?', (file_id,))
+    rows = []
+    for rec in csv.reader(io.StringIO(chunk)):
+        if not rec:
+            continue
+        rec = (rec + [''] * len(cols))[:len(cols)]
+        rows.append([file_id] + [v if v != '' else None for v in rec])
+    if rows:
+        names = ', '.join(['file_id'] + [_quote(c) for c in cols])
+        marks = ', '.join('?' * (len(cols) + 1))
+        con.executemany(f'INSERT INTO {_quote(family)} ({names}) VALUES ({marks})', rows)
+    con.execute('UPDATE files SET header = ?, offset = ?, size = ?, mtime_ns = ?, inode = ? WHERE id = ?',
+                (header, start + end, st.st_size, st.st_mtime_ns, st.st_ino, file_id))
+    return len(rows)
+
+
+def ingest(con: sqlite3.Connection, results_dir: str, verbose: bool = False) -> int:
+    """Synchronise la base avec les CSV du répertoire de résultats."""
+    known = {r[1]: {'id': r[0], 'header': r[2], 'offset': r[3], 'size': r[4], 'mtime_ns': r[5], 'inode': r[6]}
+             for r in con.execute('SELECT id, path, header, offset, size, mtime_ns, inode FROM files')}
+    seen = set()
+    added = 0
+    with con:
+        try:
+            names = sorted(os.listdir(results_dir))
+        except OSError:
+            names = []
+        for name in names:
+            m = FILE_RE.match(name)
+            if not m:
+                continue
+            path = os.path.join(results_dir, name)
+            seen.add(path)
+            try:
+                n = _ingest_file(con, path, m.group(1), known.get(path))
+            except OSError:
+                continue
+            added += n
+            if verbose and n:
+                print(f'[store] {name}: +{n} lignes', file=sys.stderr)
+        # fichiers disparus (nettoyage, renommage en .bak): lignes retirées
+        for path, k in known.items():
+            if path not in seen and os.path.dirname(path) == results_dir:
+                fam = con.execute('SELECT family FROM files WHERE id = ?', (k['id'],)).fetchone()[0]
+                con.execute(f'DELETE FROM {_quote(fam)} WHERE file_id = ?', (k['id'],))
+                con.execute('DELETE FROM files WHERE id = ?', (k['id'],))
+    return added
+
+
+def default_db(results_dir: str) -> str:
+    return os.environ.get('BENCH_STORE') or os.path.join(results_dir, '.store.sqlite')
+
+
+# ---------------------------------------------------------------------------
+# Classements
+# ---------------------------------------------------------------------------
+
+def create_views(con: sqlite3.Connection, build: str | None, max_contam: float | None) -> None:
+    """Vues filtrées v_<famille> (build CPU, contamination maximale)."""
+    for family in SCHEMAS:
+        conds = []
+        params = []
+        if family == 'cpu' and build:
+            conds.append("COALESCE(NULLIF(build, ''), 'unknown') = ?")
+            params.append(build)
+        if max_contam is not None and 'contamination' in _table_columns(con, family):
+            conds.append(f'(contamination IS NULL OR contamination <= {float(max_contam)!r})')
+        where = (' WHERE ' + ' AND '.join(conds)) if conds else ''
+        # paramètres littéraux: les vues n'acceptent pas de paramètres liés
+        for p in params:
+            where = where.replace('?', "'" + p.replace("'", "''") + "'", 1)
+        con.execute(f'DROP VIEW IF EXISTS {_quote("v_" + family)}')
+        con.execute(f'CREATE TEMP VIEW {_quote("v_" + family)} AS SELECT rowid AS rid, * FROM {_quote(family)}{where}')
+
+
+def _ranked(con: sqlite3.Connection, source: str, agg: str, params: tuple = ()) -> list[tuple]:
+    """Agrège une source (node, v, s, ord, label) selon best | last | all | mean.
+
+    best/last: une ligne par nœud (meilleure valeur / plus récente), all: top 10
+    toutes runs, mean: moyenne ± écart-type des valeurs par nœud. Résultat trié
+    par valeur décroissante.
+    """
+    if agg == 'all':
+        sql = f'SELECT node, v, s, label FROM ({source}) ORDER BY v DESC, node LIMIT 10'
+    elif agg in ('best', 'last'):
+        order = 'v DESC, ord' if agg == 'best' else 'ord DESC'
+        sql = (f'SELECT node, v, s, label FROM (SELECT *, ROW_NUMBER() OVER '
+               f'(PARTITION BY node ORDER BY {order}) AS rn FROM ({source})) WHERE rn = 1 ORDER BY v DESC, node')
+    else:
+        # écart-type en deux passes (v - moyenne): pas d'annulation sur des scores ~1e8
+        sql = (f'WITH src AS ({source}), mu AS (SELECT node, AVG(v) AS m FROM src GROUP BY node) '
+               'SELECT src.node, mu.m, AVG((v - mu.m) * (v - mu.m)), NULL FROM src JOIN mu ON mu.node = src.node '
+               'GROUP BY src.node ORDER BY mu.m DESC, src.node')
+        return [(n, m, math.sqrt(max(var or 0.0, 0.0)), None) for n, m, var, _ in con.execute(sql, params)]
+    return list(con.execute(sql, params))
+
+
+def _print_ranking(title: str, rows: list[tuple], label_fmt: str = ' ({})') -> None:
+    print(f'=== {title} ===')
+    for i, (node, v, s, label) in enumerate(rows, 1):
+        extra = label_fmt.format(label) if label else ''
+        print(f'{i:2d}. {node} {v or 0.0:.3f} ± {s or 0.0:.3f}{extra}')
+
+
+def _count(con: sqlite3.Connection, view: str, where: str = '1', params: tuple = ()) -> int:
+    return con.execute(f'SELECT COUNT(*) FROM {view} WHERE {where}', params).fetchone()[0]
+
+
+AGG_TITLES = {
+    'best': 'meilleur run par nœud',
+    'last': 'dernier run par nœud',
+    'all': 'toutes runs',
+    'mean': 'moyenne de toutes les runs par nœud',
+}
+
+
+def top(con: sqlite3.Connection, mode: str) -> int:
+    """Affiche les classements d'un mode du « top » (mêmes sections que top.sh)."""
+    if mode == 'by-build':
+        _top_by_build(con)
+    else:
+        agg = {'unique': 'best', 'unique-last': 'last', 'top10': 'all', 'by-node-mean': 'mean'}.get(mode)
+        if agg is None:
+            print(f'TOP_MODE inconnu: {mode}', file=sys.stderr)
+            return 1
+        _top_main(con, agg)
+    _top_extras(con)
+    return 0
+
+
+def _top_main(con: sqlite3.Connection, agg: str) -> None:
+    sub = AGG_TITLES[agg]
+    first = True
+    for m, name in (('mono', 'Monothread'), ('multi', 'Multithread')):
+        if not first:
+            print()
+        first = False
+        if agg == 'mean':
+            # poids 1 / (1 + contamination / 5) par run, 1 sans mesure
+            sql = ('WITH src AS (SELECT node, avg_events_per_s AS v, '
+                   'CASE WHEN contamination IS NULL THEN 1.0 ELSE 1.0 / (1.0 + contamination / 5.0) END AS w '
+                   'FROM v_cpu WHERE mode = ?), mu AS (SELECT node, SUM(w * v) / SUM(w) AS m FROM src GROUP BY node) '
+                   'SELECT src.node, mu.m, SUM(w * (v - mu.m) * (v - mu.m)) / SUM(w) FROM src '
+                   'JOIN mu ON mu.node = src.node GROUP BY src.node ORDER BY mu.m DESC, src.node')
+            rows = [(n, mu, math.sqrt(max(var or 0.0, 0.0)), None) for n, mu, var in con.execute(sql, (m,))]
+            _print_ranking(f'Classement {name} par moyenne de toutes les runs (par nœud, pondérée par la contamination)', rows)
+            continue
+        src = ('SELECT node, avg_events_per_s AS v, stddev_events_per_s AS s, rid AS ord, NULL AS label '
+               f"FROM v_cpu WHERE mode = '{m}'")
+        title = f'TOP 10 {name} ({sub})' if agg == 'all' else f'TOP {name} ({sub})'
+        _print_ranking(title, _ranked(con, src, agg))
+    # GPU: un classement par backend et par mode (une ligne par backend/mode dans gpu_<node>.csv)
+    for backend, m in con.execute('SELECT DISTINCT backend, mode FROM v_gpu WHERE backend IS NOT NULL '
+                                  'ORDER BY backend, mode').fetchall():
+        src = ('SELECT node, avg_events_per_s AS v, stddev_events_per_s AS s, rid AS ord, NULL AS label '
+               "FROM v_gpu WHERE backend = '{}' AND mode = '{}'".format(backend.replace("'", "''"), m.replace("'", "''")))
+        print()
+        _print_ranking(f'TOP GPU {backend} {m} ({sub})', _ranked(con, src, agg))
+    if _count(con, 'v_mem', "kernel = 'triad' AND mode = 'multi'"):
+        # plus grand working set de chaque nœud = DRAM
+        src = ('SELECT m.node, avg_GBps AS v, stddev_GBps AS s, rid AS ord, NULL AS label FROM v_mem m '
+               "JOIN (SELECT node, MAX(size_bytes) AS big FROM v_mem WHERE kernel = 'triad' AND mode = 'multi' "
+               'GROUP BY node) b ON b.node = m.node AND m.size_bytes = b.big '
+               "WHERE kernel = 'triad' AND mode = 'multi'")
+        print()
+        _print_ranking(f'TOP Bande passante mémoire triad multi, GB/s ({sub})', _ranked(con, src, agg))
+    if _count(con, 'v_flops', "precision = 'fp64' AND mode = 'multi'"):
+        # par job (nœud + horodatage), meilleure ISA mesurée
+        src = ('SELECT node, v, s, ord, label FROM (SELECT node, avg_GFLOPs AS v, stddev_GFLOPs AS s, '
+               'MIN(rid) OVER (PARTITION BY node, timestamp) AS ord, isa AS label, '
+               'ROW_NUMBER() OVER (PARTITION BY node, timestamp ORDER BY avg_GFLOPs DESC) AS jr '
+               "FROM v_flops WHERE precision = 'fp64' AND mode = 'multi') WHERE jr = 1")
+        rows = _ranked(con, src, agg)
+        print()
+        _print_ranking(f'TOP Débit crête fp64 multi, GFLOP/s ({sub})', rows)
+    pairs = con.execute("SELECT workload, variant, MIN(unit) FROM v_work WHERE mode = 'multi' "
+                        'GROUP BY workload, variant ORDER BY workload, variant').fetchall()
+    for w, var, unit in pairs:
+        src = ('SELECT node, avg AS v, stddev AS s, rid AS ord, NULL AS label FROM v_work '
+               "WHERE workload = '{}' AND variant = '{}' AND mode = 'multi'".format(
+                   w.replace("'", "''"), var.replace("'", "''")))
+        print()
+        _print_ranking(f'TOP {w}/{var} multi, {unit} ({sub})', _ranked(con, src, agg))
+
+
+def _top_by_build(con: sqlite3.Connection) -> None:
+    for m in ('mono', 'multi'):
+        print(f'=== Speedup natif/générique {m} (moyenne des runs par nœud et par build) ===')
+        sql = ('SELECT node, AVG(CASE WHEN b = \'generic\' THEN v END) AS g, AVG(CASE WHEN b = \'native\' THEN v END) AS n, '
+               "SUM(b = 'generic'), SUM(b = 'native') FROM (SELECT node, avg_events_per_s AS v, "
+               "COALESCE(NULLIF(build, ''), 'unknown') AS b FROM v_cpu WHERE mode = ?) GROUP BY node "
+               'HAVING g > 0 AND n IS NOT NULL ORDER BY n / g DESC, node')
+        for i, (node, g, n, ng, nn) in enumerate(con.execute(sql, (m,)), 1):
+            print(f'{i:2d}. {node} {n / g:.3f} (générique {g:.3f}, natif {n:.3f}, {ng}/{nn} runs)')
+        print()
+
+
+def _top_extras(con: sqlite3.Connection) -> None:
+    """Sections communes à tous les modes: efficacité, throttling, NUMA, cœurs lents."""
+    # efficacité énergétique: dernier run multi de chaque nœud ayant pu lire RAPL
+    rows = con.execute('SELECT node, events_per_j, pkg_w, freq_mhz, governor FROM (SELECT *, ROW_NUMBER() OVER '
+                       '(PARTITION BY node ORDER BY rid DESC) AS rn FROM v_cpu '
+                       "WHERE mode = 'multi' AND events_per_j IS NOT NULL) WHERE rn = 1 "
+                       'ORDER BY events_per_j DESC, node').fetchall()
+    if rows:
+        print()
+        print('=== Efficacité multi, events/J (dernier run par nœud) ===')
+        for i, (node, e, w, mhz, gov) in enumerate(rows, 1):
+            print(f'{i:2d}. {node} {e:.3f} ({w or 0.0:.1f} W, {mhz if mhz is not None else "-"} MHz, {gov or "-"})')
+    # stabilité intra-run: dernier run multi/soak de chaque nœud avec chute durable
+    rows = con.execute('SELECT node, drop_pct, mode, throttle_s FROM (SELECT *, ROW_NUMBER() OVER '
+                       '(PARTITION BY node, mode ORDER BY rid DESC) AS rn FROM v_cpu '
+                       "WHERE mode IN ('multi', 'soak')) WHERE rn = 1 AND throttle_s IS NOT NULL "
+                       'ORDER BY drop_pct DESC, node').fetchall()
+    if rows:
+        print()
+        print('=== Throttling intra-run (dernier run multi/soak par nœud, chute premier -> dernier intervalle) ===')
+        for i, (node, d, m, t) in enumerate(rows, 1):
+            print(f'{i:2d}. {node} {d or 0.0:.2f} % ({m}, chute durable à {t:.3f} s)')
+    # NUMA: pire lien inter-domaines du dernier job (ratio à la bande passante locale)
+    if _count(con, 'numa'):
+        sql = ('WITH last AS (SELECT node, timestamp FROM (SELECT node, timestamp, ROW_NUMBER() OVER '
+               '(PARTITION BY node ORDER BY rid DESC) AS rn FROM v_numa) WHERE rn = 1), '
+               'job AS (SELECT n.* FROM v_numa n JOIN last l ON l.node = n.node AND l.timestamp = n.timestamp) '
+               'SELECT node, MIN(CASE WHEN cpu_node != mem_node THEN bw_ratio_local END), MAX(numa_nodes), MAX(sockets), '
+               '(SELECT CAST(CAST(j2.cpu_node AS INT) AS TEXT) || \'->\' || CAST(CAST(j2.mem_node AS INT) AS TEXT) FROM job j2 '
+               'WHERE j2.node = job.node AND j2.cpu_node != j2.mem_node ORDER BY j2.bw_ratio_local LIMIT 1) '
+               'FROM job GROUP BY node')
+        rows = []
+        for node, worst, nn, so, link in con.execute(sql):
+            if worst is not None:
+                rows.append((worst, node, f'{node} {worst:.3f} (cpu->mem {link})'))
+            elif (so or 0) > (nn or 0):
+                rows.append((-1.0, node, f'{node} - ({int(so)} sockets, {int(nn)} domaine NUMA: interleaving ?)'))
+        if rows:
+            print()
+            print('=== NUMA: pire lien inter-domaines (dernier job par nœud, bande passante / locale) ===')
+        for i, (_, _, text) in enumerate(sorted(rows), 1):
+            print(f'{i:2d}. {text}')
+    # cœurs signalés lents lors du dernier job de chaque nœud
+    if _count(con, 'cores'):
+        sql = ('WITH last AS (SELECT node, timestamp FROM (SELECT node, timestamp, ROW_NUMBER() OVER '
+               '(PARTITION BY node ORDER BY rid DESC) AS rn FROM v_cores) WHERE rn = 1) '
+               'SELECT c.node, CAST(c.cpu AS INT), c.core_type, c.deficit_pct FROM v_cores c '
+               'JOIN last l ON l.node = c.node AND l.timestamp = c.timestamp '
+               'WHERE c.slow = 1 ORDER BY c.deficit_pct DESC, c.node')
+        rows = con.execute(sql).fetchall()
+        if rows:
+            print()
+            print('=== Cœurs lents (dernier job par nœud, % sous la médiane du type) ===')
+        for i, (node, cpu, ty, d) in enumerate(rows, 1):
+            print(f'{i:2d}. {node} cpu{cpu} ({ty}) {d:.1f} %')
+
+
+# ---------------------------------------------------------------------------
+# Détection de régressions
+# ---------------------------------------------------------------------------
+
+def _median(xs: list[float]) -> float:
+    xs = sorted(xs)
+    n = len(xs)
+    return xs[n // 2] if n % 2 else (xs[n // 2 - 1] + xs[n // 2]) / 2
+
+
+def _robust(xs: list[float]) -> tuple[float, float]:
+    """Médiane et MAD normalisé (1.4826 × MAD, écart-type équivalent)."""
+    m = _median(xs)
+    return m, 1.4826 * _median([abs(x - m) for x in xs])
+
+
+def _score(latest: float, ref: list[float], threshold: float, z_min: float) -> tuple[float, float | None, bool]:
+    """Écart relatif (%) et z robuste du dernier résultat; dégradé si les deux
+    dépassent leur seuil (MAD nul: seuil relatif seul)."""
+    m, s = _robust(ref)
+    pct = 100.0 * (latest - m) / m if m else 0.0
+    z = (latest - m) / s if s > 0 else None
+    return pct, z, pct < -threshold and (z is None or z < -z_min)
+
+
+def _series(con: sqlite3.Connection, days: float | None) -> dict[tuple, list[tuple]]:
+    """Séries chronologiques (valeur, horodatage) par (famille, nœud, clé, classe)."""
+    out: dict[tuple, list[tuple]] = {}
+    cpu = con.execute("SELECT node, mode, COALESCE(NULLIF(build, ''), 'unknown'), hw_class, avg_events_per_s, timestamp "
+                      "FROM v_cpu WHERE mode IN ('mono', 'multi') AND avg_events_per_s > 0 ORDER BY rid")
+    for node, mode, build, cls, v, ts in cpu:
+        out.setdefault(('cpu', node, f'{mode} [{build}]', cls), []).append((v, ts))
+    # classe GPU approchée: nombre de GPU et VRAM totale (Go) du nœud
+    gpu = con.execute("SELECT node, backend, mode, nb_gpu, vram_total_MB, avg_events_per_s, timestamp "
+                      "FROM v_gpu WHERE avg_events_per_s > 0 ORDER BY rid")
+    for node, backend, mode, nb, vram, v, ts in gpu:
+        cls = f'{int(nb or 0)}x{round((vram or 0) / 1024)}G' if vram else None
+        out.setdefault(('gpu', node, f'{backend} {mode}', cls), []).append((v, ts))
+    if days:
+        for k, pts in out.items():
+            try:
+                last = datetime.fromisoformat(pts[-1][1])
+                out[k] = [p for p in pts[:-1] if (last - datetime.fromisoformat(p[1])).total_seconds() <= days * 86400] + [pts[-1]]
+            except (TypeError, ValueError):
+                pass
+    return out
+
+
+def regress(con: sqlite3.Connection, threshold: float, fleet_threshold: float, z_min: float,
+            min_history: int, history: int, days: float | None) -> int:
+    """Compare le dernier résultat de chaque nœud à son historique et à sa flotte.
+
+    Historique: les `history` runs précédentes (au plus `days` jours avant la
+    dernière), médiane/MAD. Flotte: dernier résultat des nœuds de même classe
+    matérielle (au moins 3 nœuds). Retourne le nombre de dégradations.
+    """
+    series = _series(con, days)
+    own = []
+    for (fam, node, key, cls), pts in sorted(series.items()):
+        ref = [v for v, _ in pts[:-1][-history:]]
+        if len(ref) < min_history:
+            continue
+        latest = pts[-1][0]
+        pct, z, bad = _score(latest, ref, threshold, z_min)
+        if bad:
+            own.append((pct, f'{node} {fam} {key} {latest:.3f} vs médiane {_median(ref):.3f} '
+                             f'({pct:+.1f} %, z={"-" if z is None else f"{z:.1f}"}, {len(ref)} runs)'))
+    fleets: dict[tuple, list[tuple[str, float]]] = {}
+    for (fam, node, key, cls), pts in series.items():
+        if cls:
+            fleets.setdefault((fam, key, cls), []).append((node, pts[-1][0]))
+    fleet = []
+    for (fam, key, cls), members in sorted(fleets.items()):
+        if len(members) < 3:
+            continue
+        for node, latest in members:
+            ref = [v for n, v in members if n != node]
+            pct, z, bad = _score(latest, ref, fleet_threshold, z_min)
+            if bad:
+                fleet.append((pct, f'{node} {fam} {key} {latest:.3f} vs médiane {_median(ref):.3f} '
+                                   f'({pct:+.1f} %, z={"-" if z is None else f"{z:.1f}"}, classe {cls}, {len(ref)} nœuds)'))
+    print(f"=== Régressions par rapport à l'historique du nœud (médiane/MAD, seuil {threshold:g} %, |z| > {z_min:g}) ===")
+    for i, (_, text) in enumerate(sorted(own), 1):
+        print(f'{i:2d}. {text}')
+    print()
+    print(f'=== Écarts à la flotte (même classe matérielle, seuil {fleet_threshold:g} %, |z| > {z_min:g}) ===')
+    for i, (_, text) in enumerate(sorted(fleet), 1):
+        print(f'{i:2d}. {text}')
+    n = len(own) + len(fleet)
+    print(f'[regress] {n} dégradation(s) sur {len(series)} séries', file=sys.stderr)
+    return n
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description='Base de résultats indexée (SQLite) et classements du top.')
+    p.add_argument('--results', default=RESULTS_DIR, help='répertoire des CSV (défaut: results/)')
+    p.add_argument('--db', default=None, help='fichier SQLite (défaut: BENCH_STORE ou results/.store.sqlite)')
+    p.add_argument('--verbose', action='store_true')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    c = sub.add_parser('compact', help='fusion du spool dans les CSV')
+    c.add_argument('--wait', action='store_true', help='attendre une compaction en cours au lieu de passer')
+    c.add_argument('--verbose', dest='sub_verbose', action='store_true')
+    sub.add_parser('pending', help='nombre de fichiers de spool non entièrement fusionnés')
+    i = sub.add_parser('ingest', help='ingestion incrémentale des CSV')
+    i.add_argument('--verbose', dest='sub_verbose', action='store_true')
+    t = sub.add_parser('top', help='classements (ingestion incrémentale préalable)')
+    t.add_argument('--mode', default='unique')
+    for flag, mode in (('--unique', 'unique'), ('--unique-last', 'unique-last'), ('--top10', 'top10'),
+                       ('--by-node-mean', 'by-node-mean'), ('--by-build', 'by-build')):
+        t.add_argument(flag, dest='mode', action='store_const', const=mode)
+    t.add_argument('--build', default=None, help='generic | native | unknown')
+    t.add_argument('--max-contam', type=float, default=None, help='contamination maximale (%%)')
+    t.add_argument('--verbose', dest='sub_verbose', action='store_true')
+    r = sub.add_parser('regress', help='nœuds dégradés par rapport à leur historique et à leur flotte')
+    r.add_argument('--threshold', type=float, default=5.0, help='baisse relative minimale vs historique (%%, défaut 5)')
+    r.add_argument('--fleet-threshold', type=float, default=10.0, help='baisse relative minimale vs flotte (%%, défaut 10)')
+    r.add_argument('--z', type=float, default=3.0, help='écart robuste minimal en MAD normalisés (défaut 3)')
+    r.add_argument('--min-history', type=int, default=3, help='runs antérieures minimales (défaut 3)')
+    r.add_argument('--history', type=int, default=20, help='runs antérieures prises en compte (défaut 20)')
+    r.add_argument('--days', type=float, default=None, help='historique limité aux D jours avant le dernier run')
+    r.add_argument('--max-contam', type=float, default=None, help='contamination maximale (%%)')
+    r.add_argument('--verbose', dest='sub_verbose', action='store_true')
+    q = sub.add_parser('sql', help='requête SQL libre sur la base')
+    q.add_argument('query')
+    args = p.parse_args()
+
+    verbose = args.verbose or getattr(args, 'sub_verbose', False)
+    results_dir = os.path.abspath(args.results)
+    merged = compact(results_dir, getattr(args, 'wait', False), verbose)
+    if args.cmd == 'compact':
+        print(f'[compact] {merged} lignes fusionnées', file=sys.stderr)
+        return 0
+    if args.cmd == 'pending':
+        print(spool_pending(results_dir))
+        return 0
+    con = connect(args.db or default_db(results_dir))
+    added = ingest(con, results_dir, verbose)
+    if verbose:
+        print(f'[store] {added} lignes ingérées', file=sys.stderr)
+    if args.cmd == 'ingest':
+        return 0
+    if args.cmd == 'sql':
+        cur = con.execute(args.query)
+        if cur.description:
+            print(','.join(d[0] for d in cur.description))
+            for row in cur:
+                print(','.join('' if v is None else str(v) for v in row))
+        return 0
+    if _count(con, 'cpu') == 0 and _count(con, 'gpu') == 0:
+        print(f'Aucun résultat trouvé dans {results_dir}', file=sys.stderr)
+        return 1 if args.cmd == 'top' else 2
+    if args.cmd == 'regress':
+        create_views(con, None, args.max_contam)
+        n = regress(con, args.threshold, args.fleet_threshold, args.z, args.min_history, args.history, args.days)
+        return 1 if n else 0
+    if _count(con, 'cpu') == 0:
+        print(f'Aucun résultat trouvé dans {results_dir}', file=sys.stderr)
+        return 1
+    create_views(con, args.build, args.max_contam)
+    return top(con, args.mode)
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # sortie coupée (| head): pas de trace
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
@@ -0,0 +1,244 @@
+"""Ordonnanceur des re-benchmarks: quels nœuds mesurer maintenant.
+
+Chaque nœud candidat (lignes "<nœud> <walltime_s>" sur l'entrée standard,
+fournies par submit_cpu.sh / submit_gpu.sh) reçoit une priorité, somme de
+termes bornés:
+- âge du dernier résultat de la famille, rapporté à --stale-days (plafonné à
+  2; jamais mesuré: 2),
+- incertitude: demi-largeur relative de l'intervalle de confiance à 95 % de la
+  moyenne des --window dernières runs (CPU multi; GPU: série backend/mode la
+  moins précise), rapportée à --ci-target % (plafonnée à 2; moins de 2 runs: 2),
+- changement d'état ou de BootTime depuis le dernier résultat (inventaire): 1,
+- nœud idle maintenant (inventaire): 1; un job --exclusive ne prend alors
+  rien aux utilisateurs.
+Les nœuds down, drain ou en maintenance sont écartés, ainsi que ceux soumis
+depuis leur dernier résultat (moins de 24 h). Les K premiers (--top)
+sont retenus tant que le budget (--budget, en nœuds-heures par jour) le
+permet: walltime réservé par les soumissions des dernières 24 h, relevé dans
+results/.schedule.jsonl (« record » après chaque soumission), plus celui des
+nœuds retenus.
+
+Usage:
+    python3 schedule.py pick --family cpu|gpu [--top K] [--budget H] < candidats
+    python3 schedule.py record --family cpu|gpu < lignes "<nœud> <walltime_s> <job>"
+    python3 schedule.py usage
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from datetime import datetime
+
+from inventory import default_cache, inventory
+from results_store import RESULTS_DIR, compact, connect, create_views, default_db, ingest
+
+# quantiles t de Student à 97,5 % pour 1..10 degrés de liberté, puis loi normale
+T975 = (12.71, 4.30, 3.18, 2.78, 2.57, 2.45, 2.36, 2.31, 2.26, 2.23)
+# états (inventaire) où un job ne peut pas démarrer
+UNAVAILABLE = {'down', 'drain', 'fail', 'failing', 'maint', 'reboot', 'future', 'unknown', 'inval', 'npc',
+               'power_down', 'powered_down', 'powering_down'}
+LEDGER_KEEP_S = 7 * 86400
+DAY_S = 86400
+
+
+def ledger_path(results_dir: str) -> str:
+    return os.path.join(results_dir, '.schedule.jsonl')
+
+
+def _ts(s: str | None) -> float | None:
+    try:
+        return datetime.fromisoformat(s).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def ci_pct(xs: list[float]) -> float | None:
+    """Demi-largeur relative (%) de l'IC à 95 % de la moyenne; None si moins de 2 valeurs."""
+    n = len(xs)
+    if n < 2:
+        return None
+    mean = sum(xs) / n
+    if mean <= 0:
+        return None
+    sd = math.sqrt(sum((x - mean) ** 2 for x in xs) / (n - 1))
+    t = T975[n - 2] if n - 1 <= len(T975) else 1.96
+    return 100.0 * t * sd / math.sqrt(n) / mean
+
+
+def history(con, family: str, window: int) -> dict[str, tuple[float | None, float | None]]:
+    """(horodatage du dernier résultat, IC relatif %) par nœud pour la famille."""
+    series: dict[str, dict[tuple, list[float]]] = {}
+    last: dict[str, float | None] = {}
+    if family == 'cpu':
+        rows = con.execute("SELECT node, mode, NULL, avg_events_per_s, timestamp FROM v_cpu ORDER BY rid")
+    else:
+        rows = con.execute("SELECT node, mode, backend, avg_events_per_s, timestamp FROM v_gpu ORDER BY rid")
+    for node, mode, backend, v, ts in rows:
+        t = _ts(ts)
+        last[node] = max(t, last.get(node) or 0) if t is not None else last.get(node)
+        if v and v > 0 and (family == 'gpu' or mode == 'multi'):
+            series.setdefault(node, {}).setdefault((backend, mode), []).append(v)
+    out = {}
+    for node in last:
+        cis = [ci_pct(xs[-window:]) for xs in series.get(node, {}).values()]
+        # une série trop courte laisse l'incertitude au maximum
+        out[node] = (last[node], max(cis) if cis and None not in cis else None)
+    return out
+
+
+def recent(path: str, now: float) -> list[dict]:
+    """Soumissions des dernières 24 h du registre."""
+    out = []
+    try:
+        with open(path) as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if now - rec.get('ts', 0) <= DAY_S:
+                    out.append(rec)
+    except OSError:
+        pass
+    return out
+
+
+def used_node_hours(path: str, now: float) -> float:
+    """Walltime réservé (nœuds-heures) par les soumissions des dernières 24 h."""
+    return sum(float(rec.get('wall_s', 0)) for rec in recent(path, now)) / 3600
+
+
+def record(path: str, family: str, lines: list[str], now: float) -> int:
+    """Ajoute les soumissions au registre (entrées de plus de 7 jours purgées)."""
+    keep = []
+    try:
+        with open(path) as fh:
+            for line in fh:
+                try:
+                    if now - json.loads(line).get('ts', 0) <= LEDGER_KEEP_S:
+                        keep.append(line if line.endswith('\n') else line + '\n')
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    n = 0
+    for line in lines:
+        f = line.split()
+        if len(f) < 2:
+            continue
+        keep.append(json.dumps({'ts': now, 'family': family, 'node': f[0], 'wall_s': float(f[1]),
+                                'job': f[2] if len(f) > 2 else ''}) + '\n')
+        n += 1
+    tmp = f'{path}.tmp.{os.getpid()}'
+    with open(tmp, 'w') as fh:
+        fh.writelines(keep)
+    os.replace(tmp, path)
+    return n
+
+
+def priorities(candidates: list[tuple[str, float]], hist: dict, nodes: dict, pending: dict, now: float,
+               stale_days: float, ci_target: float) -> list[tuple]:
+    """(priorité, nœud, walltime_s, détail) des candidats disponibles, par priorité décroissante.
+
+    Un nœud soumis depuis son dernier résultat (job en attente, en cours ou
+    perdu depuis moins de 24 h, voir `pending`) n'est pas candidat.
+    """
+    out = []
+    for node, wall in candidates:
+        ent = nodes.get(node, {})
+        state = ent.get('state', 'unknown')
+        if state in UNAVAILABLE:
+            continue
+        last, ci = hist.get(node, (None, None))
+        if node in pending and (last is None or last < pending[node]):
+            continue
+        age = 2.0 if last is None else min((now - last) / (stale_days * DAY_S), 2.0)
+        unc = 2.0 if ci is None else min(ci / ci_target, 2.0)
+        chg = 1.0 if last is not None and ent.get('changed', 0) > last else 0.0
+        idle = 1.0 if state == 'idle' else 0.0
+        detail = (f'âge {"-" if last is None else f"{(now - last) / DAY_S:.1f} j"}, '
+                  f'IC {"-" if ci is None else f"±{ci:.1f} %"}, état {state}{", changé" if chg else ""}')
+        out.append((age + unc + chg + idle, node, wall, detail))
+    out.sort(key=lambda x: (-x[0], x[1]))
+    return out
+
+
+def pick(ranked: list[tuple], top: int | None, budget: float | None, used: float) -> list[tuple]:
+    """K premiers candidats dont le walltime cumulé tient dans le budget restant."""
+    chosen = []
+    for item in ranked:
+        if top is not None and len(chosen) >= top:
+            break
+        need = item[2] / 3600
+        if budget is not None and used + need > budget:
+            continue
+        used += need
+        chosen.append(item)
+    return chosen
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description='Ordonnanceur des re-benchmarks (priorité, budget nœuds-heures/jour).')
+    p.add_argument('--results', default=RESULTS_DIR, help='répertoire des résultats (défaut: results/)')
+    p.add_argument('--db', default=None, help='fichier SQLite (défaut: BENCH_STORE ou results/.store.sqlite)')
+    p.add_argument('--verbose', action='store_true')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    k = sub.add_parser('pick', help='nœuds à mesurer, par priorité décroissante (candidats sur stdin)')
+    k.add_argument('--family', choices=('cpu', 'gpu'), required=True)
+    k.add_argument('--top', type=int, default=None, help='nombre maximal de nœuds retenus')
+    k.add_argument('--budget', type=float, default=None, help='nœuds-heures par jour (walltime réservé)')
+    k.add_argument('--stale-days', type=float, default=7.0, help='âge d\'un résultat jugé périmé (j, défaut 7)')
+    k.add_argument('--ci-target', type=float, default=2.0, help='IC relatif visé (%%, défaut 2)')
+    k.add_argument('--window', type=int, default=10, help='runs récentes pour l\'IC (défaut 10)')
+    r = sub.add_parser('record', help='enregistre des soumissions (lignes "<nœud> <walltime_s> <job>" sur stdin)')
+    r.add_argument('--family', choices=('cpu', 'gpu'), required=True)
+    sub.add_parser('usage', help='nœuds-heures réservés sur les dernières 24 h')
+    args = p.parse_args()
+
+    results_dir = args.results
+    ledger = ledger_path(results_dir)
+    now = time.time()
+    if args.cmd == 'record':
+        n = record(ledger, args.family, sys.stdin.read().splitlines(), now)
+        if args.verbose:
+            print(f'[schedule] {n} soumission(s) enregistrée(s)', file=sys.stderr)
+        return 0
+    if args.cmd == 'usage':
+        print(f'{used_node_hours(ledger, now):.2f} nœud(s)-heure(s) réservé(s) sur 24 h')
+        return 0
+
+    candidates = []
+    for line in sys.stdin:
+        f = line.split()
+        if len(f) >= 2:
+            candidates.append((f[0], float(f[1])))
+    compact(results_dir)
+    con = connect(args.db or default_db(results_dir))
+    ingest(con, results_dir)
+    create_views(con, None, None)
+    hist = history(con, args.family, args.window)
+    inv = inventory(default_cache(results_dir), 3600, 60)
+    nodes = inv['nodes'] if inv else {}
+    pending = {}
+    for rec in recent(ledger, now):
+        if rec.get('family') == args.family:
+            pending[rec['node']] = max(rec['ts'], pending.get(rec['node'], 0))
+    ranked = priorities(candidates, hist, nodes, pending, now, args.stale_days, args.ci_target)
+    used = used_node_hours(ledger, now)
+    chosen = pick(ranked, args.top, args.budget, used)
+    print(f'[schedule] {len(chosen)} nœud(s) retenu(s) sur {len(candidates)} candidat(s)'
+          + (f', budget {used + sum(c[2] for c in chosen) / 3600:.1f}/{args.budget:g} nœuds-heures sur 24 h'
+             if args.budget is not None else ''), file=sys.stderr)
+    if args.verbose:
+        for prio, node, wall, detail in ranked:
+            mark = '*' if any(c[1] == node for c in chosen) else ' '
+            print(f'  {mark} {node} priorité {prio:.2f} ({detail}, walltime {wall / 3600:.2f} h)', file=sys.stderr)
+    for _, node, _, _ in chosen:
+        print(node)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""Temps de soumission et d'agrégation en fonction de la taille de la flotte.
+
+Pour chaque taille (--sizes), dans une copie temporaire du dépôt (les
+résultats et l'inventaire du vrai dépôt ne sont pas touchés):
+1. flotte simulée de N nœuds (deux formes CPU, --gpu-frac de nœuds GPU),
+   jobs en mode noop (terminés dès la soumission) et --latency-ms par appel
+   Slurm simulé,
+2. ./main.sh build (chronométré à part), puis ./main.sh submit_cpu,
+   inventaire froid puis en cache: durée, appels sbatch / scontrol / sinfo;
+   conda est masqué (PATH, CONDA_EXE, HOME) pour que l'étape Conda facultative
+   du build ne pèse pas sur la mesure,
+3. --runs runs CPU synthétiques (mono + multi) par nœud écrites dans le
+   spool, puis compaction, premier top (ingestion complète) et second top
+   (ingestion incrémentale, sans nouvelle ligne).
+
+Usage:
+    python3 src/slurmsim/scale.py [--sizes 100,300,1000] [--batch-size 16] [--latency-ms 0]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+SIM_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(SIM_DIR))
+sys.path.insert(0, os.path.dirname(SIM_DIR))
+
+from results_store import SCHEMAS, spool_append, spool_path  # noqa: E402
+
+CALLS = ('sbatch', 'scontrol', 'sinfo')
+
+
+def copy_tree(dst: str) -> None:
+    """main.sh, src/ et le binaire générique (dates conservées: make n'a rien à refaire)."""
+    shutil.copy2(os.path.join(ROOT_DIR, 'main.sh'), dst)
+    shutil.copytree(os.path.join(ROOT_DIR, 'src'), os.path.join(dst, 'src'), symlinks=True,
+                    ignore=shutil.ignore_patterns('__pycache__'))
+    binary = os.path.join(ROOT_DIR, 'bin', 'cpu_bench')
+    if os.path.exists(binary):
+        os.makedirs(os.path.join(dst, 'bin'))
+        shutil.copy2(binary, os.path.join(dst, 'bin'))
+
+
+def timed(cmd: list[str], env: dict) -> float:
+    t0 = time.perf_counter()
+    out = subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    dt = time.perf_counter() - t0
+    if out.returncode != 0:
+        raise RuntimeError(f'{" ".join(cmd)} (code {out.returncode}): {out.stderr.strip()[-500:]}')
+    return dt
+
+
+def bench_env(tmp: str, sim: str) -> dict:
+    """Environnement de la copie: shims en tête du PATH, conda masqué."""
+    path = [d for d in os.environ['PATH'].split(os.pathsep)
+            if d and not os.path.exists(os.path.join(d, 'conda'))]
+    env = dict(os.environ, PATH=os.pathsep.join([os.path.join(tmp, 'src', 'slurmsim', 'bin')] + path),
+               SLURMSIM_DIR=sim, HOME=tmp)
+    for k in ('BENCH_STORE', 'CONDA_EXE'):
+        env.pop(k, None)
+    return env
+
+
+def calls(sim: str) -> dict[str, int]:
+    con = sqlite3.connect(os.path.join(sim, 'state.sqlite'))
+    try:
+        return dict(con.execute('SELECT cmd, n FROM rpc').fetchall())
+    finally:
+        con.close()
+
+
+def synthetic_runs(results: str, node_names: list[str], runs: int, rng: random.Random) -> int:
+    """Runs CPU mono + multi par nœud, écrites dans le spool comme par un job."""
+    header = SCHEMAS['cpu']
+    cols = header.split(',')
+    n = 0
+    for node in node_names:
+        base = rng.uniform(5e6, 2e7)
+        lines = []
+        for r in range(runs):
+            for mode, threads, k in (('mono', 1, 1.0), ('multi', 64, 40.0)):
+                avg = base * k * rng.uniform(0.97, 1.03)
+                vals = dict.fromkeys(cols, '')
+                vals.update(node=node, mode=mode, threads=threads, runs=5, duration_s=3.0,
+                            avg_events_per_s=f'{avg:.3f}', stddev_events_per_s=f'{avg * 0.01:.3f}',
+                            min_events_per_s=f'{avg * 0.98:.3f}', max_events_per_s=f'{avg * 1.02:.3f}',
+                            median_events_per_s=f'{avg:.3f}', build='generic', hw_class='sim',
+                            timestamp=f'2026-01-01T00:{r // 60:02d}:{r % 60:02d}')
+                lines.append(','.join(str(vals[c]) for c in cols))
+        spool_append(spool_path(results, node, 'scale'), 'scale', 'cpu', header, lines)
+        n += len(lines)
+    return n
+
+
+def run_size(n: int, args: argparse.Namespace, rng: random.Random) -> dict:
+    tmp = tempfile.mkdtemp(prefix=f'slurmsim-scale-{n}-')
+    try:
+        copy_tree(tmp)
+        sim = os.path.join(tmp, 'sim')
+        results = os.path.join(tmp, 'results')
+        env = bench_env(tmp, sim)
+        n_gpu = round(n * args.gpu_frac)
+        n_cpu = n - n_gpu
+        groups = [f'c:{n_cpu - n_cpu // 2}:64', f'd:{n_cpu // 2}:128'] + ([f'g:{n_gpu}:32:4'] if n_gpu else [])
+        init = [sys.executable, os.path.join(tmp, 'src', 'slurmsim', 'slurmsim.py'), 'init', '--exec', 'noop',
+                '--latency-ms', str(args.latency_ms)]
+        for g in groups:
+            init += ['--group', g]
+        timed(init, env)
+        main = ['bash', os.path.join(tmp, 'main.sh')]
+        submit = main + ['--batch-size', str(args.batch_size), 'submit_cpu']
+        row = {'nodes': n, 'build': timed(main + ['build'], env)}
+        row['submit_cold'] = timed(submit, env)
+        cold = calls(sim)
+        row['submit_warm'] = timed(submit, env)
+        row.update({c: cold.get(c, 0) for c in CALLS})
+        con = sqlite3.connect(os.path.join(sim, 'state.sqlite'))
+        names = [r[0] for r in con.execute('SELECT name FROM nodes ORDER BY idx')]
+        con.close()
+        row['rows'] = synthetic_runs(results, names, args.runs, rng)
+        row['compact'] = timed([sys.executable, os.path.join(tmp, 'src', 'results_store.py'), '--results', results,
+                                'compact', '--wait'], env)
+        row['top'] = timed(main + ['top'], env)
+        row['top_incr'] = timed(main + ['top'], env)
+        return row
+    finally:
+        if args.keep:
+            print(f'[scale] arbre conservé: {tmp}', file=sys.stderr)
+        else:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description='Temps de soumission et d\'agrégation selon la taille de la flotte.')
+    p.add_argument('--sizes', default='100,300,1000', help='tailles de flotte (défaut 100,300,1000)')
+    p.add_argument('--batch-size', type=int, default=16, help='--batch-size de submit_cpu (défaut 16)')
+    p.add_argument('--gpu-frac', type=float, default=0.1, help='part de nœuds GPU (défaut 0.1)')
+    p.add_argument('--latency-ms', type=float, default=0, help='délai par appel Slurm simulé (défaut 0)')
+    p.add_argument('--runs', type=int, default=3, help='runs CPU synthétiques par nœud (défaut 3)')
+    p.add_argument('--keep', action='store_true', help='conserver les arbres temporaires')
+    args = p.parse_args()
+
+    rng = random.Random(0)
+    print(f'{"nœuds":>6} {"build":>7} {"sbatch":>7} {"scontrol":>9} {"sinfo":>6} {"soumission":>11} {"(cache)":>8} '
+          f'{"lignes":>7} {"compaction":>11} {"top":>7} {"top incr.":>10}')
+    for n in (int(s) for s in args.sizes.split(',')):
+        try:
+            r = run_size(n, args, rng)
+        except RuntimeError as e:
+            print(f'[scale] {n} nœuds: échec de {e}', file=sys.stderr)
+            return 1
+        print(f'{r["nodes"]:>6} {r["build"]:>6.2f}s {r["sbatch"]:>7} {r["scontrol"]:>9} {r["sinfo"]:>6} '
+              f'{r["submit_cold"]:>10.2f}s {r["submit_warm"]:>7.2f}s {r["rows"]:>7} {r["compact"]:>10.2f}s {r["top"]:>6.2f}s '
+              f'{r["top_incr"]:>9.2f}s', flush=True)
+    print('(soumission: build à jour compris; « (cache) »: second passage, inventaire réutilisé)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,787 @@
+#!/usr/bin/env python3
+"""Simulateur Slurm local: une flotte fictive et des jobs exécutés sur cette machine.
+
+Les exécutables sbatch, squeue, scontrol, sinfo, srun et scancel de
+src/slurmsim/bin/ sont des liens vers ce fichier (commande choisie d'après le
+nom d'appel). Mis en tête du PATH, ils remplacent Slurm pour tout le pipeline
+(main.sh submit -> submit_cpu.sh / submit_gpu.sh -> bench_job_*.sh -> CSV ->
+top), sans contrôleur:
+
+- la flotte (nœuds, CPUTot, GPU, partitions, état) et la file des jobs sont
+  dans une base SQLite ($SLURMSIM_DIR/state.sqlite, défaut outputs/slurmsim/),
+- sbatch vérifie la demande (nœuds connus, CPU et GPU disponibles), met le job
+  en file puis lance au besoin le répartiteur: un processus détaché qui
+  démarre les jobs dont tous les nœuds sont libres, au plus --workers à la
+  fois, et les arrête au bout de leur --time (SIGTERM, puis SIGKILL 5 s plus
+  tard),
+- chaque job voit l'environnement d'une allocation (SLURM_JOB_ID,
+  SLURM_JOB_NODELIST, SLURM_CPUS_ON_NODE, SLURM_GPUS_ON_NODE, ...) et
+  BENCH_HOST = son premier nœud, nom sous lequel les scripts de job écrivent
+  leurs résultats; srun lance une tâche par nœud de l'allocation (au plus
+  --workers en parallèle), chacune avec son BENCH_HOST,
+- mode d'exécution (--exec): run (script du job), noop (job terminé dès la
+  soumission, pour mesurer la soumission seule) ou sleep:S,
+- --latency-ms: délai ajouté à chaque commande, coût d'un appel au contrôleur;
+  le nombre d'appels par commande est compté (stats).
+
+Usage:
+    python3 slurmsim.py init [--group PRÉFIXE:N:CPU[:GPU[:TYPE]]]... [--workers N] [--exec run|noop|sleep:S]
+    python3 slurmsim.py node <n1,n2> down|drain|resume|reboot
+    python3 slurmsim.py jobs [--state S]
+    python3 slurmsim.py stats
+    python3 slurmsim.py wait [--timeout S]
+    PATH="$PWD/src/slurmsim/bin:$PATH" ./main.sh submit_cpu
+"""
+import argparse
+import fcntl
+import getpass
+import json
+import os
+import re
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+SIM_DIR = os.path.dirname(os.path.realpath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(SIM_DIR))
+BIN_DIR = os.path.join(SIM_DIR, 'bin')
+SHIMS = ('sbatch', 'squeue', 'scontrol', 'sinfo', 'srun', 'scancel')
+DEFAULT_GROUPS = ('node:16:16', 'gpu:4:32:2:sim')
+KILL_GRACE_S = 5
+POLL_S = 0.2
+ACTIVE = ('PENDING', 'RUNNING')
+SHORT_STATES = {'PENDING': 'PD', 'RUNNING': 'R', 'COMPLETED': 'CD', 'FAILED': 'F', 'TIMEOUT': 'TO',
+                'CANCELLED': 'CA'}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS nodes (name TEXT PRIMARY KEY, idx INTEGER, cpus INTEGER, gpus INTEGER,
+    gpu_type TEXT, partition TEXT, sockets INTEGER, memory_mb INTEGER, admin TEXT, boot TEXT);
+CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, user TEXT,
+    partition TEXT, nodelist TEXT, n_nodes INTEGER, cpus_per_task INTEGER, gpus INTEGER,
+    time_limit INTEGER, state TEXT, submit REAL, start REAL, end REAL, rc INTEGER, pid INTEGER,
+    argv TEXT, env TEXT, workdir TEXT, output TEXT, error TEXT);
+CREATE TABLE IF NOT EXISTS rpc (cmd TEXT PRIMARY KEY, n INTEGER);
+'''
+
+
+class SimError(Exception):
+    pass
+
+
+def state_dir() -> str:
+    return os.environ.get('SLURMSIM_DIR') or os.path.join(ROOT_DIR, 'outputs', 'slurmsim')
+
+
+def connect(path: str | None = None) -> sqlite3.Connection:
+    d = state_dir()
+    path = path or os.path.join(d, 'state.sqlite')
+    if not os.path.exists(path):
+        raise SimError(f'flotte simulée absente ({path}): lancer "slurmsim.py init"')
+    con = sqlite3.connect(path, timeout=60, isolation_level=None)
+    con.execute('PRAGMA busy_timeout = 60000')
+    return con
+
+
+def meta(con: sqlite3.Connection, key: str, default: str = '') -> str:
+    env = os.environ.get(f'SLURMSIM_{key.upper()}')
+    if env:
+        return env
+    row = con.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else default
+
+
+def rpc(con: sqlite3.Connection, cmd: str) -> None:
+    """Compte l'appel et simule la latence du contrôleur."""
+    con.execute('INSERT INTO rpc (cmd, n) VALUES (?, 1) ON CONFLICT(cmd) DO UPDATE SET n = n + 1', (cmd,))
+    latency = float(meta(con, 'latency_ms', '0') or 0)
+    if latency > 0:
+        time.sleep(latency / 1000)
+
+
+# ---------------------------------------------------------------------------
+# Flotte
+# ---------------------------------------------------------------------------
+
+def parse_group(spec: str) -> tuple[str, int, int, int, str]:
+    f = spec.split(':')
+    if len(f) < 3 or not f[1].isdigit() or not f[2].isdigit():
+        raise SimError(f'groupe invalide: {spec} (attendu PRÉFIXE:N:CPU[:GPU[:TYPE]])')
+    gpus = int(f[3]) if len(f) > 3 and f[3] else 0
+    return f[0], int(f[1]), int(f[2]), gpus, f[4] if len(f) > 4 else 'sim'
+
+
+def init(groups: list[str], workers: int, exec_mode: str, latency_ms: float) -> int:
+    d = state_dir()
+    os.makedirs(d, exist_ok=True)
+    path = os.path.join(d, 'state.sqlite')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    con = sqlite3.connect(path, isolation_level=None)
+    con.execute('PRAGMA journal_mode = WAL')
+    con.executescript(SCHEMA)
+    boot = datetime.now().isoformat(timespec='seconds')
+    rows = []
+    for spec in groups:
+        prefix, count, cpus, gpus, gpu_type = parse_group(spec)
+        width = max(4, len(str(count)))
+        for i in range(1, count + 1):
+            rows.append((f'{prefix}{i:0{width}d}', len(rows), cpus, gpus, gpu_type, 'gpu' if gpus else 'cpu',
+                         2 if cpus >= 32 else 1, cpus * 4096, '', boot))
+    con.executemany('INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+    con.executemany('INSERT INTO meta VALUES (?, ?)', (('workers', str(workers)), ('exec', exec_mode),
+                                                        ('latency_ms', str(latency_ms))))
+    print(f'[slurmsim] {len(rows)} nœud(s) simulé(s) dans {d} (workers {workers}, exec {exec_mode})')
+    print(f'[slurmsim] export PATH="{BIN_DIR}:$PATH" SLURMSIM_DIR="{d}"')
+    return 0
+
+
+def nodes(con: sqlite3.Connection, names: list[str] | None = None) -> list[dict]:
+    cols = ('name', 'cpus', 'gpus', 'gpu_type', 'partition', 'sockets', 'memory_mb', 'admin', 'boot')
+    rows = [dict(zip(cols, r)) for r in con.execute(f'SELECT {", ".join(cols)} FROM nodes ORDER BY idx')]
+    busy = {}
+    for nodelist, cpt in con.execute("SELECT nodelist, cpus_per_task FROM jobs WHERE state = 'RUNNING'"):
+        for n in nodelist.split(','):
+            busy[n] = busy.get(n, 0) + (cpt or 1)
+    for r in rows:
+        alloc = min(busy.get(r['name'], 0), r['cpus'])
+        base = 'allocated' if alloc >= r['cpus'] else 'mixed' if alloc else 'idle'
+        r['alloc'] = alloc
+        r['state'] = {'down': 'down', 'drain': 'drained' if base == 'idle' else 'draining'}.get(r['admin'], base)
+    if names is not None:
+        by_name = {r['name']: r for r in rows}
+        missing = [n for n in names if n not in by_name]
+        if missing:
+            raise SimError(f'Node {missing[0]} not found')
+        rows = [by_name[n] for n in names]
+    return rows
+
+
+def expand(spec: str) -> list[str]:
+    """Liste de nœuds "a,b,c[01-03,07]" -> noms."""
+    out = []
+    for m in re.finditer(r'([^,\[]+)(?:\[([^\]]+)\])?', spec):
+        prefix, ranges = m.group(1), m.group(2)
+        if not ranges:
+            out.append(prefix)
+            continue
+        for part in ranges.split(','):
+            lo, _, hi = part.partition('-')
+            for i in range(int(lo), int(hi or lo) + 1):
+                out.append(f'{prefix}{i:0{len(lo)}d}')
+    return [n for n in out if n]
+
+
+def set_node_state(names: list[str], action: str) -> int:
+    con = connect()
+    nodes(con, names)
+    if action == 'reboot':
+        con.executemany('UPDATE nodes SET boot = ? WHERE name = ?',
+                        [(datetime.now().isoformat(timespec='seconds'), n) for n in names])
+    else:
+        admin = {'down': 'down', 'drain': 'drain', 'resume': '', 'idle': ''}[action]
+        con.executemany('UPDATE nodes SET admin = ? WHERE name = ?', [(admin, n) for n in names])
+        if not admin:
+            spawn_dispatcher()
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Jobs
+# ---------------------------------------------------------------------------
+
+def parse_time(s: str) -> int:
+    """Durée Slurm (M, M:S, H:M:S, J-H, J-H:M, J-H:M:S) -> secondes."""
+    days, _, rest = s.rpartition('-') if '-' in s else ('', '', s)
+    f = [int(x) for x in rest.split(':')]
+    if days:
+        f += [0] * (3 - len(f))
+        return int(days) * 86400 + f[0] * 3600 + f[1] * 60 + f[2]
+    if len(f) == 1:
+        return f[0] * 60
+    if len(f) == 2:
+        return f[0] * 60 + f[1]
+    return f[0] * 3600 + f[1] * 60 + f[2]
+
+
+def gres_gpus(gres: str) -> int:
+    m = re.match(r'gpu(?::[^:,]+)?:(\d+)$', gres or '')
+    return int(m.group(1)) if m else 0
+
+
+# options à valeur (longue, courte) -> clé
+_OPT_KEYS = {'--job-name': 'name', '-J': 'name', '--nodelist': 'nodelist', '-w': 'nodelist',
+             '--nodes': 'nodes', '-N': 'nodes', '--ntasks': 'ntasks', '-n': 'ntasks',
+             '--ntasks-per-node': 'ntasks_per_node', '--cpus-per-task': 'cpus_per_task', '-c': 'cpus_per_task',
+             '--gres': 'gres', '--mem': 'mem', '--time': 'time', '-t': 'time', '--export': 'export',
+             '--output': 'output', '-o': 'output', '--error': 'error', '-e': 'error',
+             '--partition': 'partition', '-p': 'partition', '--account': 'account', '-A': 'account',
+             '--qos': 'qos', '--constraint': 'constraint', '-C': 'constraint', '--kill-on-bad-exit': 'kill',
+             '-K': 'kill', '--exclude': 'exclude', '-x': 'exclude', '--chdir': 'chdir', '-D': 'chdir'}
+_FLAGS = {'--exclusive', '--parsable', '--requeue', '--no-requeue', '--hold', '-H', '--overcommit', '--contiguous',
+          '--spread-job', '--use-min-nodes'}
+
+
+def parse_opts(argv: list[str], opts: dict) -> list[str]:
+    """Options sbatch/srun jusqu'au premier argument positionnel; reste renvoyé.
+
+    Les options longues non simulées (--mail-type, --comment, ...) sont
+    acceptées et ignorées; une option courte inconnue est une erreur.
+    """
+    i = 0
+    while i < len(argv):
+        a = argv[i]
+        if not a.startswith('-') or a == '--':
+            return argv[i + (a == '--'):]
+        key, eq, val = a.partition('=')
+        if key in _FLAGS:
+            opts[key.lstrip('-')] = True
+            i += 1
+            continue
+        if key not in _OPT_KEYS and not key.startswith('--'):
+            raise SimError(f'option non simulée: {key}')
+        if key in ('--kill-on-bad-exit', '-K') and not eq:
+            opts['kill'] = '1'
+            i += 1
+            continue
+        if not eq:
+            if i + 1 >= len(argv):
+                raise SimError(f'valeur manquante pour {key}')
+            i += 1
+            val = argv[i]
+        opts[_OPT_KEYS.get(key, key)] = val
+        i += 1
+    return []
+
+
+def script_directives(path: str) -> list[str]:
+    """Options des lignes #SBATCH en tête du script."""
+    out = []
+    try:
+        with open(path, errors='replace') as fh:
+            for line in fh:
+                if line.startswith('#SBATCH'):
+                    out += line.split()[1:]
+                elif line.strip() and not line.startswith('#'):
+                    break
+    except OSError:
+        pass
+    return out
+
+
+def job_env(opts: dict) -> dict:
+    exp = opts.get('export', 'ALL')
+    parts = exp.split(',')
+    env = {} if parts[0] == 'NONE' else dict(os.environ)
+    for p in parts:
+        if '=' in p:
+            k, _, v = p.partition('=')
+            env[k] = v
+        elif p not in ('ALL', 'NONE') and p in os.environ:
+            env[p] = os.environ[p]
+    env['PATH'] = BIN_DIR + os.pathsep + env.get('PATH', os.environ.get('PATH', ''))
+    env['SLURMSIM_DIR'] = state_dir()
+    return env
+
+
+def sbatch(argv: list[str]) -> int:
+    opts: dict = {}
+    rest = parse_opts(argv, opts)
+    if not rest:
+        raise SimError('script de job manquant')
+    if not os.path.isfile(rest[0]):
+        raise SimError(f'Unable to open file {rest[0]}')
+    cli = dict(opts)
+    opts = {}
+    parse_opts(script_directives(rest[0]), opts)
+    opts.update(cli)
+    con = connect()
+    rpc(con, 'sbatch')
+    fleet = nodes(con)
+    by_name = {n['name']: n for n in fleet}
+    wanted = expand(opts['nodelist']) if opts.get('nodelist') else []
+    for n in wanted:
+        if n not in by_name:
+            raise SimError('Batch job submission failed: Invalid node name specified')
+    n_nodes = max(int(opts.get('nodes', '1').split('-')[0]), len(wanted), 1)
+    cpt = int(opts.get('cpus_per_task', 1)) * int(opts.get('ntasks_per_node', 1))
+    gpus = gres_gpus(opts.get('gres', ''))
+    part = opts.get('partition', '')
+    pool = [by_name[n] for n in wanted] or [n for n in fleet if not part or n['partition'] == part]
+    fit = [n for n in pool if n['cpus'] >= cpt and n['gpus'] >= gpus]
+    if len(fit) < (len(pool) if wanted else n_nodes):
+        raise SimError('Batch job submission failed: Requested node configuration is not available')
+    if opts.get('exclusive'):
+        cpt = max(n['cpus'] for n in fit)
+    limit = parse_time(opts['time']) if opts.get('time') else 365 * 86400
+    exec_mode = meta(con, 'exec', 'run')
+    now = time.time()
+    state, start, end, rc = ('COMPLETED', now, now, 0) if exec_mode == 'noop' else ('PENDING', None, None, None)
+    cur = con.execute(
+        'INSERT INTO jobs (name, user, partition, nodelist, n_nodes, cpus_per_task, gpus, time_limit, state, '
+        'submit, start, end, rc, argv, env, workdir, output, error) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (opts.get('name') or os.path.basename(rest[0]), getpass.getuser(),
+         part or (by_name[wanted[0]]['partition'] if wanted else fit[0]['partition']),
+         ','.join(wanted), n_nodes, cpt, gpus, limit, state, now, start, end, rc,
+         json.dumps([os.path.abspath(rest[0])] + rest[1:]), json.dumps(job_env(opts)),
+         opts.get('chdir') or os.getcwd(), opts.get('output', ''), opts.get('error', '')))
+    job = cur.lastrowid
+    print(job if opts.get('parsable') else f'Submitted batch job {job}')
+    if state == 'PENDING':
+        spawn_dispatcher()
+    return 0
+
+
+def spawn_dispatcher() -> None:
+    subprocess.Popen([sys.executable, os.path.join(SIM_DIR, 'slurmsim.py'), 'dispatch'], start_new_session=True,
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     env=dict(os.environ, SLURMSIM_DIR=state_dir()))
+
+
+def out_path(pattern: str, default: str, job: int, node: str, name: str, task: int = 0) -> str:
+    p = pattern or default
+    for k, v in (('%j', str(job)), ('%N', node), ('%x', name), ('%t', str(task)), ('%%', '%')):
+        p = p.replace(k, v)
+    return p
+
+
+def start_job(con: sqlite3.Connection, job: dict, alloc: list[str], fleet: dict, exec_mode: str) -> subprocess.Popen:
+    env = json.loads(job['env'])
+    first = fleet[alloc[0]]
+    now = time.time()
+    env.update({
+        'SLURM_JOB_ID': str(job['id']), 'SLURM_JOBID': str(job['id']), 'SLURM_JOB_NAME': job['name'],
+        'SLURM_JOB_NODELIST': ','.join(alloc), 'SLURM_NODELIST': ','.join(alloc),
+        'SLURM_JOB_NUM_NODES': str(len(alloc)), 'SLURM_NNODES': str(len(alloc)),
+        'SLURM_JOB_PARTITION': job['partition'], 'SLURM_SUBMIT_DIR': job['workdir'],
+        'SLURM_JOB_START_TIME': str(int(now)), 'SLURM_CPUS_ON_NODE': str(first['cpus']),
+        'SLURMD_NODENAME': alloc[0], 'BENCH_HOST': alloc[0],
+    })
+    if job['cpus_per_task'] and job['cpus_per_task'] < first['cpus']:
+        env['SLURM_CPUS_PER_TASK'] = str(job['cpus_per_task'])
+    if job['gpus']:
+        env['SLURM_GPUS_ON_NODE'] = str(job['gpus'])
+    argv = json.loads(job['argv'])
+    if exec_mode.startswith('sleep:'):
+        argv = ['sleep', exec_mode.split(':', 1)[1]]
+    elif not os.access(argv[0], os.X_OK):
+        argv = ['bash'] + argv
+    default = os.path.join(job['workdir'], 'slurm-%j.out')
+    out = out_path(job['output'], default, job['id'], alloc[0], job['name'])
+    err = out_path(job['error'], out, job['id'], alloc[0], job['name'])
+    with open(out, 'ab') as fo, open(err, 'ab') as fe:
+        proc = subprocess.Popen(argv, cwd=job['workdir'], env=env, stdin=subprocess.DEVNULL, stdout=fo,
+                                stderr=subprocess.STDOUT if err == out else fe, start_new_session=True)
+    con.execute("UPDATE jobs SET state = 'RUNNING', start = ?, nodelist = ?, pid = ? WHERE id = ?",
+                (now, ','.join(alloc), proc.pid, job['id']))
+    return proc
+
+
+def _pending(con: sqlite3.Connection) -> list[dict]:
+    cols = ('id', 'name', 'partition', 'nodelist', 'n_nodes', 'cpus_per_task', 'gpus', 'time_limit', 'argv', 'env',
+            'workdir', 'output', 'error')
+    return [dict(zip(cols, r)) for r in
+            con.execute(f"SELECT {', '.join(cols)} FROM jobs WHERE state = 'PENDING' ORDER BY id")]
+
+
+def run_pool(con: sqlite3.Connection) -> set:
+    """Démarre et surveille les jobs jusqu'à ce qu'aucun ne tourne ni ne puisse démarrer.
+
+    Renvoie les identifiants des jobs restés en attente (nœuds down ou drain).
+    """
+    running: dict[int, tuple[subprocess.Popen, float, float | None]] = {}
+    while True:
+        workers = max(1, int(meta(con, 'workers', '4')))
+        exec_mode = meta(con, 'exec', 'run')
+        now = time.time()
+        for job, (proc, deadline, killed) in list(running.items()):
+            rc = proc.poll()
+            if rc is None:
+                if killed is None and now > deadline:
+                    os.killpg(proc.pid, signal.SIGTERM)
+                    running[job] = (proc, deadline, now)
+                elif killed is not None and now - killed > KILL_GRACE_S:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                continue
+            rc = 128 - rc if rc < 0 else rc
+            state = 'TIMEOUT' if killed is not None else 'COMPLETED' if rc == 0 else 'FAILED'
+            con.execute("UPDATE jobs SET state = CASE state WHEN 'CANCELLED' THEN state ELSE ? END, end = ?, rc = ? "
+                        "WHERE id = ?", (state, now, rc, job))
+            del running[job]
+        fleet = {n['name']: n for n in nodes(con)}
+        free = {n for n, ent in fleet.items() if ent['alloc'] == 0 and not ent['admin']}
+        stuck = set()
+        for job in _pending(con):
+            if len(running) >= workers:
+                stuck.add(job['id'])
+                continue
+            if job['nodelist']:
+                alloc = job['nodelist'].split(',')
+                alloc += [n for n in fleet if n in free and n not in alloc
+                          and fleet[n]['partition'] == job['partition']][:job['n_nodes'] - len(alloc)]
+            else:
+                alloc = [n for n in fleet if n in free and fleet[n]['partition'] == job['partition']
+                         and fleet[n]['cpus'] >= job['cpus_per_task'] and fleet[n]['gpus'] >= job['gpus']]
+                alloc = alloc[:job['n_nodes']]
+            if len(alloc) < job['n_nodes'] or not set(alloc) <= free:
+                stuck.add(job['id'])
+                continue
+            free -= set(alloc)
+            proc = start_job(con, job, alloc, fleet, exec_mode)
+            running[job['id']] = (proc, time.time() + job['time_limit'], None)
+        if not running:
+            return stuck
+        time.sleep(POLL_S)
+
+
+def dispatch() -> int:
+    lock_path = os.path.join(state_dir(), 'dispatch.lock')
+    while True:
+        con = connect()
+        with open(lock_path, 'w') as lk:
+            try:
+                fcntl.flock(lk, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            stuck = run_pool(con)
+        # verrou relâché: un sbatch a pu mettre un job en file entre-temps
+        if {j['id'] for j in _pending(con)} <= stuck:
+            return 0
+
+
+def scancel(argv: list[str]) -> int:
+    con = connect()
+    rpc(con, 'scancel')
+    for job in (j for a in argv if not a.startswith('-') for j in a.split(',')):
+        row = con.execute('SELECT state, pid FROM jobs WHERE id = ?', (job,)).fetchone()
+        if row is None:
+            print(f'scancel: error: Kill job error on job id {job}: Invalid job id specified', file=sys.stderr)
+            continue
+        if row[0] in ACTIVE:
+            con.execute("UPDATE jobs SET state = 'CANCELLED', end = COALESCE(end, ?) WHERE id = ?", (time.time(), job))
+            if row[0] == 'RUNNING' and row[1]:
+                try:
+                    os.killpg(row[1], signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# srun: une tâche par nœud de l'allocation
+# ---------------------------------------------------------------------------
+
+def srun(argv: list[str]) -> int:
+    opts: dict = {}
+    cmd = parse_opts(argv, opts)
+    if not cmd:
+        raise SimError('commande manquante')
+    job = os.environ.get('SLURM_JOB_ID')
+    if not job:
+        raise SimError('srun hors allocation non simulé (lancer le script par sbatch)')
+    con = connect()
+    rpc(con, 'srun')
+    alloc = os.environ.get('SLURM_JOB_NODELIST', '').split(',')
+    alloc = alloc[:int(str(opts.get('nodes', len(alloc))).split('-')[0])]
+    per_node = int(opts.get('ntasks_per_node', 1))
+    ntasks = int(opts.get('ntasks', len(alloc) * per_node))
+    tasks = [(t, alloc[t % len(alloc)]) for t in range(ntasks)]
+    fleet = {n['name']: n for n in nodes(con, alloc)}
+    workers = max(1, int(meta(con, 'workers', '4')))
+    kill = opts.get('kill', '0') not in ('0', '')
+    con.close()
+    procs: dict[int, subprocess.Popen] = {}
+    rcs: dict[int, int] = {}
+    for t, node in tasks:
+        while len(procs) >= workers:
+            _reap(procs, rcs, kill)
+            time.sleep(POLL_S)
+        env = dict(os.environ, SLURMD_NODENAME=node, BENCH_HOST=node, SLURM_PROCID=str(t),
+                   SLURM_NODEID=str(alloc.index(node)), SLURM_STEP_ID='0', SLURM_NTASKS=str(ntasks),
+                   SLURM_CPUS_ON_NODE=str(fleet[node]['cpus']))
+        if opts.get('cpus_per_task'):
+            env['SLURM_CPUS_PER_TASK'] = opts['cpus_per_task']
+        out = out_path(opts.get('output', ''), '', int(job), node, os.environ.get('SLURM_JOB_NAME', ''), t)
+        err = out_path(opts.get('error', ''), out, int(job), node, os.environ.get('SLURM_JOB_NAME', ''), t)
+        fo = open(out, 'ab') if out else None
+        fe = open(err, 'ab') if err and err != out else None
+        procs[t] = subprocess.Popen(cmd, env=env, stdin=subprocess.DEVNULL, stdout=fo,
+                                    stderr=subprocess.STDOUT if fo and not fe else fe)
+        for fh in (fo, fe):
+            if fh:
+                fh.close()
+    while procs:
+        _reap(procs, rcs, kill)
+        time.sleep(POLL_S)
+    return max(rcs.values(), default=0)
+
+
+def _reap(procs: dict, rcs: dict, kill: bool) -> None:
+    for t, proc in list(procs.items()):
+        rc = proc.poll()
+        if rc is None:
+            continue
+        rcs[t] = 128 - rc if rc < 0 else rc
+        del procs[t]
+        if kill and rcs[t]:
+            for other in procs.values():
+                other.terminate()
+
+
+# ---------------------------------------------------------------------------
+# squeue, sinfo, scontrol
+# ---------------------------------------------------------------------------
+
+_FMT_RE = re.compile(r'%(\.)?(\d*)([a-zA-Z])')
+SQUEUE_HEADER = {'i': 'JOBID', 'P': 'PARTITION', 'j': 'NAME', 'u': 'USER', 't': 'ST', 'T': 'STATE', 'M': 'TIME',
+                 'D': 'NODES', 'N': 'NODELIST', 'R': 'NODELIST(REASON)', 'l': 'TIME_LIMIT', 'S': 'START_TIME'}
+SINFO_HEADER = {'N': 'NODELIST', 'D': 'NODES', 'P': 'PARTITION', 'T': 'STATE', 't': 'STATE', 'a': 'AVAIL',
+                'l': 'TIMELIMIT', 'c': 'CPUS', 'G': 'GRES', 'C': 'CPUS(A/I/O/T)', 'm': 'MEMORY'}
+
+
+def render(fmt: str, fields: dict) -> str:
+    def one(m):
+        v = str(fields.get(m.group(3), ''))
+        w = int(m.group(2) or 0)
+        return v.rjust(w) if m.group(1) else v.ljust(w)
+    return _FMT_RE.sub(one, fmt)
+
+
+def _hms(s: float) -> str:
+    s = int(max(s, 0))
+    d, s = divmod(s, 86400)
+    out = f'{s // 3600}:{s % 3600 // 60:02d}:{s % 60:02d}'
+    return f'{d}-{out}' if d else out
+
+
+def squeue(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(prog='squeue', add_help=False)
+    p.add_argument('-h', '--noheader', action='store_true')
+    p.add_argument('-j', '--jobs', default='')
+    p.add_argument('-u', '--user', default='')
+    p.add_argument('-n', '--name', default='')
+    p.add_argument('-p', '--partition', default='')
+    p.add_argument('-t', '--states', default='')
+    p.add_argument('-o', '--format', default='%.18i %.9P %.8j %.8u %.2t %.10M %.6D %R')
+    a = p.parse_args(argv)
+    con = connect()
+    rpc(con, 'squeue')
+    cols = ('id', 'name', 'user', 'partition', 'nodelist', 'n_nodes', 'time_limit', 'state', 'submit', 'start')
+    where, params = ["state IN ('PENDING', 'RUNNING')"], []
+    if a.jobs:
+        ids = a.jobs.split(',')
+        known = {str(r[0]) for r in con.execute(
+            f'SELECT id FROM jobs WHERE id IN ({",".join("?" * len(ids))})', ids)}
+        if not known:
+            print('slurm_load_jobs error: Invalid job id specified', file=sys.stderr)
+            return 1
+        where.append(f'id IN ({",".join("?" * len(ids))})')
+        params += ids
+    for opt, col in ((a.user, 'user'), (a.name, 'name'), (a.partition, 'partition')):
+        if opt:
+            vals = opt.split(',')
+            where.append(f'{col} IN ({",".join("?" * len(vals))})')
+            params += vals
+    if a.states:
+        states = [s.upper() for s in a.states.split(',')]
+        states = [next((k for k, v in SHORT_STATES.items() if v == s), s) for s in states]
+        where[0] = f'state IN ({",".join("?" * len(states))})'
+        params = states + params
+    if not a.noheader:
+        print(render(a.format, SQUEUE_HEADER).rstrip())
+    now = time.time()
+    for r in con.execute(f'SELECT {", ".join(cols)} FROM jobs WHERE {" AND ".join(where)} ORDER BY id', params):
+        j = dict(zip(cols, r))
+        running = j['state'] == 'RUNNING'
+        print(render(a.format, {
+            'i': j['id'], 'P': j['partition'], 'j': j['name'], 'u': j['user'], 't': SHORT_STATES[j['state']],
+            'T': j['state'], 'M': _hms(now - j['start']) if running else '0:00', 'D': j['n_nodes'],
+            'N': j['nodelist'] if running else '', 'R': j['nodelist'] if running else '(Resources)',
+            'l': _hms(j['time_limit']), 'S': datetime.fromtimestamp(j['start']).isoformat(timespec='seconds')
+            if running else 'N/A'}).rstrip())
+    return 0
+
+
+_SHORT_NODE = {'idle': 'idle', 'allocated': 'alloc', 'mixed': 'mix', 'down': 'down', 'drained': 'drain',
+               'draining': 'drng'}
+
+
+def sinfo(argv: list[str]) -> int:
+    p = argparse.ArgumentParser(prog='sinfo', add_help=False)
+    p.add_argument('-h', '--noheader', action='store_true')
+    p.add_argument('-N', '--Node', action='store_true')
+    p.add_argument('-n', '--nodes', default='')
+    p.add_argument('-p', '--partition', default='')
+    p.add_argument('-t', '--states', default='')
+    p.add_argument('-o', '--format', default=None)
+    a = p.parse_args(argv)
+    con = connect()
+    rpc(con, 'sinfo')
+    rows = nodes(con, expand(a.nodes) if a.nodes else None)
+    if a.partition:
+        rows = [r for r in rows if r['partition'] in a.partition.split(',')]
+    if a.states:
+        keep = set(a.states.lower().split(','))
+        rows = [r for r in rows if r['state'] in keep or _SHORT_NODE[r['state']] in keep]
+    fmt = a.format or ('%N %.6D %.9P %.11T' if a.Node else '%.9P %.5a %.10l %.6D %.6t %N')
+    if not a.noheader:
+        print(render(fmt, SINFO_HEADER).rstrip())
+    groups: dict[tuple, list[dict]] = {}
+    for r in rows:
+        groups.setdefault((r['name'],) if a.Node else (r['partition'], r['state']), []).append(r)
+    for members in groups.values():
+        r = members[0]
+        idle = sum(m['cpus'] - m['alloc'] for m in members if not m['admin'])
+        other = sum(m['cpus'] for m in members if m['admin'])
+        total = sum(m['cpus'] for m in members)
+        print(render(fmt, {
+            'N': ','.join(m['name'] for m in members), 'D': len(members), 'P': r['partition'], 'T': r['state'],
+            't': _SHORT_NODE[r['state']], 'a': 'up', 'l': 'infinite', 'c': r['cpus'], 'm': r['memory_mb'],
+            'G': f'gpu:{r["gpu_type"]}:{r["gpus"]}' if r['gpus'] else '(null)',
+            'C': f'{total - idle - other}/{idle}/{other}/{total}'}).rstrip())
+    return 0
+
+
+def node_record(r: dict) -> list[str]:
+    cores = r['cpus'] // r['sockets']
+    state = {'drained': 'IDLE+DRAIN', 'draining': 'ALLOCATED+DRAIN'}.get(r['state'], r['state'].upper())
+    features = f'{r["partition"]},sim'
+    return [f'NodeName={r["name"]} Arch=x86_64 CoresPerSocket={cores}',
+            f'CPUAlloc={r["alloc"]} CPUTot={r["cpus"]} CPULoad=0.00',
+            f'AvailableFeatures={features}', f'ActiveFeatures={features}',
+            f'Gres={"gpu:" + r["gpu_type"] + ":" + str(r["gpus"]) if r["gpus"] else "(null)"}',
+            f'NodeAddr={r["name"]} NodeHostName={r["name"]}',
+            f'RealMemory={r["memory_mb"]} AllocMem=0 FreeMem={r["memory_mb"]} Sockets={r["sockets"]} Boards=1',
+            f'State={state} ThreadsPerCore=1 Weight=1',
+            f'Partitions={r["partition"]}', f'BootTime={r["boot"]} SlurmdStartTime={r["boot"]}']
+
+
+def scontrol(argv: list[str]) -> int:
+    oneliner = '-o' in argv or '--oneliner' in argv
+    args = [a for a in argv if a not in ('-o', '--oneliner')]
+    con = connect()
+    rpc(con, 'scontrol')
+    if len(args) >= 2 and args[0] == 'show' and args[1] in ('node', 'nodes'):
+        rows = nodes(con, expand(args[2]) if len(args) > 2 else None)
+        for r in rows:
+            rec = node_record(r)
+            print(' '.join(rec) if oneliner else '\n   '.join(rec) + '\n')
+        return 0
+    if len(args) >= 3 and args[0] == 'show' and args[1] == 'job':
+        cols = ('id', 'name', 'user', 'state', 'partition', 'nodelist', 'n_nodes', 'time_limit', 'rc')
+        row = con.execute(f'SELECT {", ".join(cols)} FROM jobs WHERE id = ?', (args[2],)).fetchone()
+        if row is None:
+            raise SimError('Invalid job id specified')
+        j = dict(zip(cols, row))
+        rec = [f'JobId={j["id"]} JobName={j["name"]}', f'UserId={j["user"]}', f'JobState={j["state"]}',
+               f'ExitCode={j["rc"] if j["rc"] is not None else 0}:0', f'Partition={j["partition"]}',
+               f'NodeList={j["nodelist"] or "(null)"} NumNodes={j["n_nodes"]}',
+               f'TimeLimit={_hms(j["time_limit"])}']
+        print(' '.join(rec) if oneliner else '\n   '.join(rec))
+        return 0
+    if args and args[0] == 'update':
+        kv = dict(a.split('=', 1) for a in args[1:] if '=' in a)
+        kv = {k.lower(): v for k, v in kv.items()}
+        names = expand(kv.get('nodename', ''))
+        action = kv.get('state', '').lower()
+        if not names or action not in ('down', 'drain', 'resume', 'idle'):
+            raise SimError('update: NodeName=<liste> State=DOWN|DRAIN|RESUME attendus')
+        con.close()
+        return set_node_state(names, action)
+    raise SimError(f'commande scontrol non simulée: {" ".join(argv)}')
+
+
+# ---------------------------------------------------------------------------
+# Commandes du simulateur
+# ---------------------------------------------------------------------------
+
+def list_jobs(state: str) -> int:
+    con = connect()
+    now = time.time()
+    cols = ('id', 'name', 'state', 'nodelist', 'submit', 'start', 'end', 'rc')
+    where, params = ('WHERE state = ?', (state.upper(),)) if state else ('', ())
+    for r in con.execute(f'SELECT {", ".join(cols)} FROM jobs {where} ORDER BY id', params):
+        j = dict(zip(cols, r))
+        elapsed = (j['end'] or now) - j['start'] if j['start'] else 0
+        print(f'{j["id"]} {j["name"]} {j["state"]} {j["nodelist"] or "-"} '
+              f'{_hms(elapsed)} rc={"-" if j["rc"] is None else j["rc"]}')
+    return 0
+
+
+def stats() -> int:
+    con = connect()
+    counts: dict[str, int] = {}
+    for r in nodes(con):
+        counts[r['state']] = counts.get(r['state'], 0) + 1
+    print('nœuds: ' + ', '.join(f'{s} {n}' for s, n in sorted(counts.items())))
+    print('jobs: ' + ', '.join(f'{s} {n}' for s, n in con.execute(
+        'SELECT state, COUNT(*) FROM jobs GROUP BY state ORDER BY state')))
+    print('appels: ' + ', '.join(f'{c} {n}' for c, n in con.execute('SELECT cmd, n FROM rpc ORDER BY cmd')))
+    return 0
+
+
+def wait(timeout: float | None) -> int:
+    con = connect()
+    t0 = time.time()
+    while con.execute("SELECT 1 FROM jobs WHERE state IN ('PENDING', 'RUNNING') LIMIT 1").fetchone():
+        if timeout is not None and time.time() - t0 > timeout:
+            print('[slurmsim] délai dépassé, jobs encore actifs', file=sys.stderr)
+            return 1
+        time.sleep(POLL_S)
+    return 0
+
+
+def main() -> int:
+    prog = os.path.basename(sys.argv[0])
+    try:
+        if prog in SHIMS:
+            return {'sbatch': sbatch, 'squeue': squeue, 'scontrol': scontrol, 'sinfo': sinfo, 'srun': srun,
+                    'scancel': scancel}[prog](sys.argv[1:])
+        p = argparse.ArgumentParser(description='Simulateur Slurm local (flotte fictive, jobs exécutés ici).')
+        sub = p.add_subparsers(dest='cmd', required=True)
+        i = sub.add_parser('init', help='crée la flotte simulée (remplace la précédente)')
+        i.add_argument('--group', action='append', default=None,
+                       help=f'PRÉFIXE:N:CPU[:GPU[:TYPE]], répétable (défaut: {" ".join(DEFAULT_GROUPS)})')
+        i.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                       help='jobs simultanés et tâches srun simultanées (défaut: nombre de CPU)')
+        i.add_argument('--exec', dest='exec_mode', default='run', help='run | noop | sleep:S (défaut: run)')
+        i.add_argument('--latency-ms', type=float, default=0, help='délai ajouté à chaque commande Slurm')
+        n = sub.add_parser('node', help='change l\'état de nœuds simulés')
+        n.add_argument('nodes')
+        n.add_argument('action', choices=('down', 'drain', 'resume', 'reboot'))
+        j = sub.add_parser('jobs', help='jobs soumis')
+        j.add_argument('--state', default='')
+        sub.add_parser('stats', help='nœuds et jobs par état, appels par commande')
+        w = sub.add_parser('wait', help='attend la fin des jobs')
+        w.add_argument('--timeout', type=float, default=None)
+        sub.add_parser('dispatch', help=argparse.SUPPRESS)
+        args = p.parse_args()
+        if args.cmd == 'init':
+            if not re.fullmatch(r'run|noop|sleep:\d+(\.\d+)?', args.exec_mode):
+                raise SimError(f'--exec invalide: {args.exec_mode}')
+            return init(args.group or list(DEFAULT_GROUPS), args.workers, args.exec_mode, args.latency_ms)
+        if args.cmd == 'node':
+            return set_node_state(expand(args.nodes), args.action)
+        if args.cmd == 'jobs':
+            return list_jobs(args.state)
+        if args.cmd == 'stats':
+            return stats()
+        if args.cmd == 'wait':
+            return wait(args.timeout)
+        return dispatch()
+    except SimError as e:
+        print(f'{prog}: error: {e}', file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
@@ -0,0 +1,125 @@
+"""Walltime des jobs de bench appris des durées passées.
+
+Chaque job enregistre sa durée à la sortie (famille "jobs" du spool, voir
+record_elapsed dans lib/job_common.sh): nœud, type (cpu/gpu), signature des
+paramètres, classe matérielle, forme (CPU ou GPU du nœud), durée, code de
+retour. Pour un nœud à soumettre avec la même signature, les durées de
+référence sont prises, dans l'ordre, parmi les --window derniers jobs:
+- du nœud lui-même,
+- des nœuds de sa classe matérielle (classe de son dernier job),
+- des nœuds de même forme,
+dès qu'un niveau compte au moins --min-jobs durées. Walltime prédit: quantile
+--quantile des durées, majoré de --margin, plus 60 s, arrondi à la minute
+supérieure. Une durée censurée (job arrêté par le walltime, rc 143 ou 137)
+compte pour 1,5 fois sa valeur; les autres échecs sont ignorés. Sans
+historique suffisant: walltime de la formule (fourni par submit).
+
+Usage:
+    python3 walltime.py predict --kind cpu|gpu --params SIG < lignes "<nœud> <forme> <formule_s>"
+    python3 walltime.py show [--kind cpu|gpu]
+"""
+import argparse
+import math
+import os
+import sys
+
+from results_store import RESULTS_DIR, compact, connect, create_views, default_db, ingest
+
+# codes de retour d'un job arrêté à l'échéance (SIGTERM, puis SIGKILL)
+CENSORED_RC = (143, 137)
+CENSORED_FACTOR = 1.5
+
+
+def quantile(xs: list[float], q: float) -> float:
+    """Quantile par rang le plus proche (q = 1: maximum)."""
+    s = sorted(xs)
+    return s[min(len(s) - 1, max(0, math.ceil(q * len(s)) - 1))]
+
+
+def samples(con, kind: str, params: str, window: int) -> tuple[dict, dict, dict, dict]:
+    """Durées de référence par nœud, classe et forme; classe du dernier job de chaque nœud."""
+    by_node: dict[str, list[float]] = {}
+    by_class: dict[str, list[float]] = {}
+    by_shape: dict[str, list[float]] = {}
+    node_class: dict[str, str] = {}
+    rows = con.execute('SELECT node, class, shape, elapsed_s, rc FROM v_jobs WHERE kind = ? AND params = ? '
+                       'AND elapsed_s > 0 ORDER BY rid', (kind, params))
+    for node, cls, shape, elapsed, rc in rows:
+        rc = int(rc or 0)
+        if rc in CENSORED_RC:
+            v = elapsed * CENSORED_FACTOR
+        elif rc == 0:
+            v = float(elapsed)
+        else:
+            continue
+        by_node.setdefault(node, []).append(v)
+        if cls and cls != '-':
+            by_class.setdefault(cls, []).append(v)
+            node_class[node] = cls
+        by_shape.setdefault(str(int(shape or 0)), []).append(v)
+    by_node, by_class, by_shape = ({k: v[-window:] for k, v in d.items()} for d in (by_node, by_class, by_shape))
+    return by_node, by_class, by_shape, node_class
+
+
+def predict(con, kind: str, params: str, nodes: list[tuple[str, str, float]], q: float, margin: float,
+            min_jobs: int, window: int) -> list[tuple[str, int, str]]:
+    """(nœud, walltime_s, source) pour chaque (nœud, forme, walltime de la formule)."""
+    by_node, by_class, by_shape, node_class = samples(con, kind, params, window)
+    out = []
+    for node, shape, fallback in nodes:
+        levels = (('nœud', by_node.get(node)), ('classe', by_class.get(node_class.get(node, ''))),
+                  ('forme', by_shape.get(shape)))
+        for source, xs in levels:
+            if xs and len(xs) >= min_jobs:
+                wall = math.ceil((quantile(xs, q) * (1 + margin) + 60) / 60) * 60
+                out.append((node, wall, f'{source}, {len(xs)} jobs'))
+                break
+        else:
+            out.append((node, int(fallback), 'formule'))
+    return out
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description='Walltime des jobs de bench appris des durées passées.')
+    p.add_argument('--results', default=RESULTS_DIR, help='répertoire des résultats (défaut: results/)')
+    p.add_argument('--db', default=None, help='fichier SQLite (défaut: BENCH_STORE ou results/.store.sqlite)')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    k = sub.add_parser('predict', help='walltime par nœud (lignes "<nœud> <forme> <formule_s>" sur stdin)')
+    k.add_argument('--kind', choices=('cpu', 'gpu'), required=True)
+    k.add_argument('--params', required=True, help='signature des paramètres du job')
+    k.add_argument('--quantile', type=float, default=0.95, help='quantile des durées (défaut 0.95)')
+    k.add_argument('--margin', type=float, default=0.2, help='marge relative ajoutée (défaut 0.2)')
+    k.add_argument('--min-jobs', type=int, default=3, help='durées minimales par niveau (défaut 3)')
+    k.add_argument('--window', type=int, default=20, help='derniers jobs pris en compte (défaut 20)')
+    s = sub.add_parser('show', help='durées enregistrées par type, signature et classe')
+    s.add_argument('--kind', choices=('cpu', 'gpu'), default=None)
+    args = p.parse_args()
+
+    compact(args.results)
+    con = connect(args.db or default_db(args.results))
+    ingest(con, args.results)
+    create_views(con, None, None)
+    if args.cmd == 'show':
+        where, params = ('WHERE kind = ?', (args.kind,)) if args.kind else ('', ())
+        for kind, sig, cls, n, avg, mx in con.execute(
+                f'SELECT kind, params, class, COUNT(*), AVG(elapsed_s), MAX(elapsed_s) FROM v_jobs {where} '
+                'GROUP BY kind, params, class ORDER BY kind, params, class', params):
+            print(f'{kind} {sig} {cls}: {n} job(s), moyenne {avg:.0f} s, max {mx:.0f} s')
+        return 0
+    nodes = []
+    for line in sys.stdin:
+        f = line.split()
+        if len(f) >= 3:
+            nodes.append((f[0], f[1], float(f[2])))
+    for node, wall, source in predict(con, args.kind, args.params, nodes, args.quantile, args.margin,
+                                      args.min_jobs, args.window):
+        print(f'{node} {wall} {source}')
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)